@@ -0,0 +1,130 @@
+import json
+import logging
+import numpy as np
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+LETTERS = np.array(list('abcdefghijklmnopqrstuvwxyz'))
+PUNCTUATION = ['.', ',', '!', '?', ';', ' (see)', ' - ', '&', '  ']
+
+
+class CorpusGenerator:
+    def __init__(self, vocabulary_size: int = 50000, zipf_exponent: float = 1.1,
+                 label_length: int = 8, abstract_length: int = 60,
+                 duplicate_rate: float = 0.05, same_label_rate: float = 0.02, seed: int = 0):
+        """
+        Generate synthetic raw petitions with the same nested layout as the real input data, e.g.
+            {"abstract": {"_value": "..."}, "label": {"_value": "..."}, "numberOfSignatures": 123}
+        Words are drawn from a Zipfian distribution over a random vocabulary, texts contain upper case letters and
+        punctuation, and some records repeat an earlier label (and abstract) like the real data.
+        The output only depends on the parameters and the seed.
+        Parameters
+        ----------
+        vocabulary_size:
+            Number of distinct words.
+        zipf_exponent:
+            Exponent s of the word distribution, the probability of the word of rank r is proportional to 1 / r^s.
+        label_length:
+            Mean number of words of a label.
+        abstract_length:
+            Mean number of words of an abstract.
+        duplicate_rate:
+            Fraction of records which repeat the label and abstract of an earlier record.
+        same_label_rate:
+            Fraction of records which repeat the label of an earlier record with a different abstract.
+        seed:
+            Random seed.
+        """
+        if duplicate_rate < 0 or same_label_rate < 0 or duplicate_rate + same_label_rate > 1:
+            logger.error('duplicate_rate and same_label_rate must be positive and sum to at most 1')
+            raise ValueError('duplicate_rate and same_label_rate must be positive and sum to at most 1')
+        self.vocabulary_size = vocabulary_size
+        self.zipf_exponent = zipf_exponent
+        self.label_length = label_length
+        self.abstract_length = abstract_length
+        self.duplicate_rate = duplicate_rate
+        self.same_label_rate = same_label_rate
+        self.seed = seed
+        self.vocabulary = self._build_vocabulary()
+        weights = 1 / np.arange(1, vocabulary_size + 1) ** zipf_exponent
+        self.probabilities = weights / weights.sum()
+
+    def _build_vocabulary(self) -> List[str]:
+        rng = np.random.default_rng(self.seed)
+        vocabulary = set()
+        while len(vocabulary) < self.vocabulary_size:
+            # English-like word lengths, 2 to 14 letters
+            for length in np.clip(rng.poisson(6, size=self.vocabulary_size), 2, 14):
+                vocabulary.add(''.join(rng.choice(LETTERS, size=length)))
+                if len(vocabulary) == self.vocabulary_size:
+                    break
+        # the same vocabulary in a random order, so frequent words are not the alphabetically smallest
+        vocabulary = sorted(vocabulary)
+        rng.shuffle(vocabulary)
+        return vocabulary
+
+    def _texts(self, rng: np.random.Generator, n_texts: int, mean_length: int) -> List[str]:
+        lengths = np.maximum(rng.poisson(mean_length, size=n_texts), 1)
+        word_ids = rng.choice(self.vocabulary_size, size=int(lengths.sum()), p=self.probabilities)
+        words = np.array(self.vocabulary, dtype=object)[word_ids]
+        texts = []
+        start = 0
+        for length in lengths:
+            text = words[start:start + length].tolist()
+            start += length
+            text[0] = text[0].capitalize()
+            position = rng.integers(length)
+            text[position] += PUNCTUATION[rng.integers(len(PUNCTUATION))]
+            texts.append(' '.join(text) + '.')
+        return texts
+
+    def generate(self, n_records: int) -> List[Dict]:
+        """
+        Generate raw records.
+        Parameters
+        ----------
+        n_records:
+            Number of records.
+        Returns
+        -------
+            A list of nested raw records.
+        """
+        rng = np.random.default_rng([self.seed, n_records])
+        labels = self._texts(rng, n_records, self.label_length)
+        abstracts = self._texts(rng, n_records, self.abstract_length)
+        signatures = rng.zipf(1.5, size=n_records).clip(max=10 ** 7)
+
+        kind = rng.random(n_records)
+        sources = (rng.random(n_records) * np.arange(n_records)).astype(np.int64)
+        for i in range(1, n_records):
+            if kind[i] < self.duplicate_rate:
+                labels[i], abstracts[i] = labels[sources[i]], abstracts[sources[i]]
+            elif kind[i] < self.duplicate_rate + self.same_label_rate:
+                labels[i] = labels[sources[i]]
+
+        return [{'abstract': {'_value': abstract},
+                 'label': {'_value': label},
+                 'numberOfSignatures': int(n)}
+                for abstract, label, n in zip(abstracts, labels, signatures)]
+
+    def write(self, fpath: str, n_records: int, lines: bool = False) -> None:
+        """
+        Write raw records as a JSON array (the input format of run_etl) or as JSON lines.
+        Parameters
+        ----------
+        fpath:
+            Output file path.
+        n_records:
+            Number of records.
+        lines:
+            If true, write one record per line.
+        """
+        logger.info(f'Write {n_records} synthetic records to {fpath}')
+        records = self.generate(n_records)
+        with open(fpath, 'w') as raw:
+            if lines:
+                for record in records:
+                    raw.write(json.dumps(record) + '\n')
+            else:
+                json.dump(records, raw)
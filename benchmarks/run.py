@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import subprocess
+import tempfile
+import pandas as pd
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+from benchmarks.corpus import CorpusGenerator
+from preprocessing import run
+from preprocessing.text_process import TextPreprocessing
+from preprocessing.word_process import WordCount, WordFrequency
+from preprocessing.params import TEXT_COLUMNS, TOP_K, MIN_LETTERS
+
+formatter = '%(name)s - %(levelname)s :: %(message)s'
+logging.basicConfig(level=logging.INFO,
+                    format=formatter)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+BENCHMARKS = ('transform', 'transform_batch', 'get_top_k', 'get_target_count', 'run_etl')
+ETL_MODES = {'batch': {}, 'single_pass': {'single_pass': True}, 'streaming': {'streaming': True}}
+
+
+def _best_time(func: Callable, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_corpus(generator: CorpusGenerator, n_records: int, data_path: str) -> str:
+    """
+    Return the path of a synthetic corpus, generating it only if it does not exist yet.
+    """
+    os.makedirs(data_path, exist_ok=True)
+    name = (f'petitions_{n_records}_v{generator.vocabulary_size}_s{generator.zipf_exponent}'
+            f'_d{generator.duplicate_rate}_l{generator.same_label_rate}_seed{generator.seed}.json')
+    fpath = os.path.join(data_path, name)
+    if not os.path.exists(fpath):
+        generator.write(fpath, n_records)
+    return fpath
+
+
+def run_benchmarks(sizes: List[int],
+                   benchmarks: List[str],
+                   data_path: str,
+                   generator: CorpusGenerator,
+                   etl_modes: List[str],
+                   repeat: int = 3,
+                   enable_lemmatisation: bool = False) -> Dict:
+    """
+    Run the benchmarks on synthetic corpora of the given sizes.
+    Micro benchmarks report the best of `repeat` runs; run_etl runs once per mode and also reports its stages.
+    Parameters
+    ----------
+    sizes:
+        Numbers of raw records.
+    benchmarks:
+        Names of the benchmarks to run, see BENCHMARKS.
+    data_path:
+        Directory where generated corpora are cached.
+    generator:
+        The synthetic corpus generator.
+    etl_modes:
+        run_etl modes to benchmark, see ETL_MODES.
+    repeat:
+        Number of runs of the micro benchmarks.
+    enable_lemmatisation:
+        Lemmatise texts in the transform benchmarks (requires WordNet).
+    Returns
+    -------
+        The results with environment metadata, ready to be saved as JSON.
+    """
+    results = []
+    for n_records in sizes:
+        fpath = get_corpus(generator, n_records, data_path)
+        with open(fpath) as raw:
+            records = json.load(raw)
+        texts = [record[feature]['_value'] for record in records for feature in TEXT_COLUMNS]
+        n_tokens = sum(len(text.split()) for text in texts)
+
+        def add(name: str, seconds: float, n_items: int, **extra) -> None:
+            res = {'benchmark': name, 'n_records': n_records, 'seconds': seconds,
+                   'items_per_s': n_items / seconds if seconds else None}
+            res.update(extra)
+            logger.info(f'{name} on {n_records} records: {seconds:.3f}s')
+            results.append(res)
+
+        text_preprocessor = TextPreprocessing()
+        if 'transform' in benchmarks:
+            seconds = _best_time(lambda: [text_preprocessor.transform(text, enable_lemmatisation) for text in texts],
+                                 repeat)
+            add('transform', seconds, len(texts), n_tokens=n_tokens)
+        if 'transform_batch' in benchmarks:
+            seconds = _best_time(lambda: text_preprocessor.transform_batch(texts, enable_lemmatisation), repeat)
+            add('transform_batch', seconds, len(texts), n_tokens=n_tokens)
+
+        if 'get_top_k' in benchmarks or 'get_target_count' in benchmarks:
+            cleaned = iter(text_preprocessor.transform_batch(texts))
+            df = pd.DataFrame([{feature: next(cleaned) for feature in TEXT_COLUMNS} for _ in records])
+            word_frequency = WordFrequency.from_dataframe(df, TEXT_COLUMNS)
+            target_words = word_frequency.get_top_k(TOP_K, MIN_LETTERS)
+        if 'get_top_k' in benchmarks:
+            seconds = _best_time(lambda: word_frequency.get_top_k(TOP_K, MIN_LETTERS), repeat)
+            add('get_top_k', seconds, len(word_frequency.get_table()), top_k=TOP_K)
+        if 'get_target_count' in benchmarks:
+            seconds = _best_time(lambda: df.apply(WordCount.get_target_count, columns=TEXT_COLUMNS,
+                                                  target_words=target_words, axis=1), repeat)
+            add('get_target_count', seconds, len(df), top_k=TOP_K)
+
+        if 'run_etl' in benchmarks:
+            for mode in etl_modes:
+                artefacts_path = tempfile.mkdtemp(prefix='benchmark_')
+                try:
+                    start = time.perf_counter()
+                    run.run_etl(fpath, artefacts_path, **ETL_MODES[mode])
+                    seconds = time.perf_counter() - start
+                    with open(os.path.join(artefacts_path, 'run_report.json')) as raw:
+                        stages = {stage['name']: stage['wall_time_s'] for stage in json.load(raw)['stages']}
+                finally:
+                    shutil.rmtree(artefacts_path, ignore_errors=True)
+                add(f'run_etl[{mode}]', seconds, n_records, stages=stages)
+
+    return {'created_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'machine': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'corpus': {'vocabulary_size': generator.vocabulary_size,
+                       'zipf_exponent': generator.zipf_exponent,
+                       'duplicate_rate': generator.duplicate_rate,
+                       'same_label_rate': generator.same_label_rate,
+                       'seed': generator.seed},
+            'enable_lemmatisation': enable_lemmatisation,
+            'results': results}
+
+
+def compare(baseline: Dict, current: Dict) -> pd.DataFrame:
+    """
+    Compare two benchmark results.
+    Parameters
+    ----------
+    baseline:
+        Results of the reference version.
+    current:
+        Results of the new version.
+    Returns
+    -------
+        A dataframe with the time of both versions and the speedup (baseline / current) of every benchmark and size
+        measured in both.
+    """
+    columns = ['benchmark', 'n_records', 'seconds']
+    baseline_df = pd.DataFrame(baseline['results'], columns=columns)
+    current_df = pd.DataFrame(current['results'], columns=columns)
+    res = baseline_df.merge(current_df, on=['benchmark', 'n_records'], suffixes=('_baseline', '_current'))
+    res['speedup'] = res['seconds_baseline'] / res['seconds_current']
+    return res
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default=[10000, 100000, 1000000], nargs='+', type=int, help='Numbers of records.')
+    parser.add_argument('--benchmarks', default=list(BENCHMARKS), nargs='+', choices=BENCHMARKS,
+                        help='Benchmarks to run.')
+    parser.add_argument('--etl_modes', default=['batch'], nargs='+', choices=list(ETL_MODES),
+                        help='run_etl modes to benchmark.')
+    parser.add_argument('--repeat', default=3, type=int, help='Runs of the micro benchmarks, the best is kept.')
+    parser.add_argument('--data_path', default='benchmarks/data', type=str, help='Where corpora are cached.')
+    parser.add_argument('--output_fpath', default=None, type=str, help='Where to save the results (JSON).')
+    parser.add_argument('--compare_fpath', default=None, type=str, help='Results to compare with (JSON).')
+    parser.add_argument('--vocabulary_size', default=50000, type=int, help='Number of distinct words.')
+    parser.add_argument('--zipf_exponent', default=1.1, type=float, help='Exponent of the word distribution.')
+    parser.add_argument('--duplicate_rate', default=0.05, type=float, help='Fraction of duplicated petitions.')
+    parser.add_argument('--same_label_rate', default=0.02, type=float, help='Fraction of repeated labels.')
+    parser.add_argument('--seed', default=0, type=int, help='Random seed.')
+    parser.add_argument('--enable_lemmatisation', action='store_true', help='Lemmatise in transform benchmarks.')
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(vocabulary_size=args.vocabulary_size,
+                                zipf_exponent=args.zipf_exponent,
+                                duplicate_rate=args.duplicate_rate,
+                                same_label_rate=args.same_label_rate,
+                                seed=args.seed)
+    current = run_benchmarks(sizes=args.sizes,
+                             benchmarks=args.benchmarks,
+                             data_path=args.data_path,
+                             generator=generator,
+                             etl_modes=args.etl_modes,
+                             repeat=args.repeat,
+                             enable_lemmatisation=args.enable_lemmatisation)
+    output_fpath = args.output_fpath or os.path.join('benchmarks', 'results',
+                                                     f'{current["git_revision"] or "results"}.json')
+    os.makedirs(os.path.dirname(output_fpath) or '.', exist_ok=True)
+    with open(output_fpath, 'w') as raw:
+        json.dump(current, raw, indent=2)
+    logger.info(f'Save benchmark results to {output_fpath}')
+
+    if args.compare_fpath:
+        with open(args.compare_fpath) as raw:
+            baseline = json.load(raw)
+        comparison = compare(baseline, current)
+        comparison_fpath = os.path.splitext(output_fpath)[0] + '_compare.csv'
+        comparison.to_csv(comparison_fpath, index=False)
+        logger.info(f'Speedup against {args.compare_fpath} (saved to {comparison_fpath}):\n'
+                    f'{comparison.to_string(index=False)}')
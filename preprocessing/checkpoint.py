@@ -0,0 +1,146 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def file_hash(fpath: str, block_size: int = 1 << 20) -> str:
+    """
+    Hash the content of a file.
+    Parameters
+    ----------
+    fpath:
+        The file path.
+    block_size:
+        Number of bytes read at a time.
+    Returns
+    -------
+        A hexadecimal blake2b digest.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(fpath, 'rb') as raw:
+        for block in iter(lambda: raw.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(stage: str, parent_key: str, params: Dict[str, Any], version: int = 1) -> str:
+    """
+    Key of a stage result: a hash of the stage name, the key of its input (input file hash or previous stage key),
+    the parameters the stage depends on and the version of the stored result. Bump the version of a stage when the
+    type or the content of its result changes, so checkpoints of older runs are not loaded; version 1 keeps the
+    keys of the checkpoints saved before versioning.
+    """
+    content = [stage, parent_key, params] if version == 1 else [stage, version, parent_key, params]
+    content = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class CheckpointStore:
+    def __init__(self, path: str):
+        """
+        Store stage results on disk so a rerun skips every stage whose inputs have not changed.
+        Every checkpoint is keyed by the hash of the input file and the params of the stage and of all the stages
+        before it (see stage_key); manifest.json lists the checkpoints and caches the input file hashes.
+        Parameters
+        ----------
+        path:
+            Directory of the checkpoints.
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest_fpath = os.path.join(path, MANIFEST)
+        self.manifest = {'version': MANIFEST_VERSION, 'inputs': {}, 'checkpoints': {}}
+        if os.path.exists(self.manifest_fpath):
+            with open(self.manifest_fpath) as raw:
+                manifest = json.load(raw)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.manifest = manifest
+            else:
+                logger.warning(f'Ignore checkpoints of {self.manifest_fpath}, unsupported manifest version')
+
+    def _save_manifest(self) -> None:
+        tmp_fpath = self.manifest_fpath + '.tmp'
+        with open(tmp_fpath, 'w') as raw:
+            json.dump(self.manifest, raw, indent=2)
+        os.replace(tmp_fpath, self.manifest_fpath)
+
+    def input_key(self, fpath: str) -> str:
+        """
+        Return the hash of an input file. The hash is cached in the manifest and only recomputed when the size or
+        the modification time of the file changes.
+        """
+        stat = os.stat(fpath)
+        entry = self.manifest['inputs'].get(os.path.abspath(fpath))
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['hash']
+        logger.info(f'Hash input file {fpath}')
+        digest = file_hash(fpath)
+        self.manifest['inputs'][os.path.abspath(fpath)] = {'size': stat.st_size,
+                                                           'mtime_ns': stat.st_mtime_ns,
+                                                           'hash': digest}
+        self._save_manifest()
+        return digest
+
+    def has(self, stage: str, key: str) -> bool:
+        """
+        Return true if the manifest lists a checkpoint of the stage for this key.
+        """
+        entry = self.manifest['checkpoints'].get(key)
+        return entry is not None and entry['stage'] == stage
+
+    def load(self, stage: str, key: str) -> Optional[Any]:
+        """
+        Load the result of a stage.
+        Parameters
+        ----------
+        stage:
+            The stage name.
+        key:
+            The stage key, see stage_key.
+        Returns
+        -------
+            The stored result, or None if there is no checkpoint for this key.
+        """
+        if not self.has(stage, key):
+            return None
+        entry = self.manifest['checkpoints'][key]
+        fpath = os.path.join(self.path, entry['fpath'])
+        if not os.path.exists(fpath):
+            logger.warning(f'Checkpoint {fpath} of stage {stage} is missing, the stage is recomputed')
+            return None
+        logger.info(f'Skip stage {stage}, load checkpoint {fpath}')
+        with open(fpath, 'rb') as raw:
+            return pickle.load(raw)
+
+    def save(self, stage: str, key: str, result: Any) -> None:
+        """
+        Save the result of a stage.
+        Parameters
+        ----------
+        stage:
+            The stage name.
+        key:
+            The stage key, see stage_key.
+        result:
+            The result, e.g. a dataframe or a lookup table.
+        """
+        fname = f'{stage}-{key}.pkl'
+        fpath = os.path.join(self.path, fname)
+        logger.info(f'Save checkpoint of stage {stage} to {fpath}')
+        tmp_fpath = fpath + '.tmp'
+        with open(tmp_fpath, 'wb') as raw:
+            pickle.dump(result, raw, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fpath, fpath)
+        self.manifest['checkpoints'][key] = {'stage': stage,
+                                             'fpath': fname,
+                                             'created_at': datetime.now(timezone.utc).isoformat()}
+        self._save_manifest()
@@ -0,0 +1,123 @@
+import json
+import logging
+from typing import Dict, List, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = ' \t\r\n'
+# maximum number of characters of a single record, a longer (or unterminated) record is an error
+MAX_RECORD_SIZE = 1 << 26
+
+
+def flatten_record(record: Dict, columns: Optional[List[str]] = None) -> Dict:
+    """
+    Remove the nested {"_value": ...} data structure from a raw record.
+    Parameters
+    ----------
+    record:
+        A raw record, e.g. {"label": {"_value": "this is a label text"}, "numberOfSignatures": 123}
+    columns:
+        A list of column names which contain nested data structures. If None, every nested value is flattened.
+    Returns
+    -------
+        The same record without nested data structure, e.g. {"label": "this is a label text", ...}
+    """
+    for feature in (columns if columns is not None else list(record)):
+        value = record[feature]
+        if isinstance(value, dict) and '_value' in value:
+            record[feature] = value['_value']
+    return record
+
+
+def iter_json_objects(fpath: str, block_size: int = 1 << 20,
+                      max_record_size: int = MAX_RECORD_SIZE) -> Iterator[Dict]:
+    """
+    Incrementally parse a JSON array of records or a JSON-lines file, without loading the whole file.
+    Parameters
+    ----------
+    fpath:
+        Input file path. The format is detected from the first non-whitespace character ('[' means JSON array).
+    block_size:
+        Number of characters read from the file at a time. A record split across blocks is completed with
+        reads of doubling size, so it is decoded a logarithmic number of times.
+    max_record_size:
+        Maximum number of characters of a record. Raise a ValueError instead of reading further.
+    Returns
+    -------
+        An iterator over the raw records.
+    """
+    decoder = json.JSONDecoder()
+    with open(fpath, 'r', encoding='utf-8') as raw:
+        buffer = raw.read(block_size)
+        eof = not buffer
+        # Find the first character to detect the format.
+        while not eof and not buffer.strip(_WHITESPACE):
+            buffer = raw.read(block_size)
+            eof = not buffer
+        buffer = buffer.lstrip(_WHITESPACE)
+        if not buffer:
+            return
+        is_array = buffer[0] == '['
+        pos = 1 if is_array else 0
+        separators = _WHITESPACE + ',' if is_array else _WHITESPACE
+
+        while True:
+            while pos < len(buffer) and buffer[pos] in separators:
+                pos += 1
+            if pos < len(buffer):
+                if is_array and buffer[pos] == ']':
+                    return
+                try:
+                    record, pos = decoder.raw_decode(buffer, pos)
+                    yield record
+                    continue
+                except json.JSONDecodeError:
+                    # The record is most likely split across two blocks, read more unless the file is exhausted
+                    # or the line of a JSON-lines record is complete.
+                    if eof or (not is_array and buffer.find('\n', pos) != -1):
+                        raise
+                    if len(buffer) - pos > max_record_size:
+                        logger.error(f'A record of {fpath} is longer than {max_record_size} characters')
+                        raise ValueError(f'A record of {fpath} is longer than {max_record_size} characters')
+            elif eof:
+                if is_array:
+                    raise ValueError(f'Unexpected end of JSON array in {fpath}')
+                return
+            more = raw.read(max(block_size, len(buffer) - pos))
+            eof = not more
+            buffer = buffer[pos:] + more
+            pos = 0
+
+
+def iter_records(fpath: str,
+                 chunk_size: int = 10000,
+                 columns: Optional[List[str]] = None,
+                 block_size: int = 1 << 20) -> Iterator[List[Dict]]:
+    """
+    Stream fixed-size chunks of flattened records from a JSON or JSON-lines file.
+    Parameters
+    ----------
+    fpath:
+        Input file path.
+    chunk_size:
+        Maximum number of records per chunk.
+    columns:
+        A list of column names which contain nested data structures. If None, every nested value is flattened.
+    block_size:
+        Number of characters read from the file at a time.
+    Returns
+    -------
+        An iterator over lists of flattened records.
+    """
+    if chunk_size is None or chunk_size <= 0:
+        logger.error('chunk_size must be a positive integer')
+        raise ValueError('chunk_size must be a positive integer')
+
+    chunk = []
+    for record in iter_json_objects(fpath, block_size=block_size):
+        chunk.append(flatten_record(record, columns))
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
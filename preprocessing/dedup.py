@@ -0,0 +1,126 @@
+import logging
+import numpy as np
+import pandas as pd
+from typing import List, Dict
+
+logger = logging.getLogger(__name__)
+
+# two independent uint64 hashes form a 128-bit fingerprint
+FINGERPRINT = ['_fingerprint_0', '_fingerprint_1']
+HASH_KEYS = ['0123456789123456', '6543219876543210']
+# combines the hashes of the columns of a record
+HASH_MULTIPLIER = np.uint64(1000003)
+
+
+def fingerprint(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Fingerprint the selected text columns of every record into a 128-bit hash (vectorised): two uint64 hashes
+    with different keys. With n distinct texts, two of them share a fingerprint with a probability of about
+    n^2 / 2^129, so the texts themselves are never compared.
+    Parameters
+    ----------
+    df:
+        A dataframe contains the selected text columns.
+    columns:
+        A list of names of text columns.
+    Returns
+    -------
+        A dataframe with the FINGERPRINT uint64 columns and the same index as df.
+    """
+    hashes = {name: np.zeros(len(df), dtype=np.uint64) for name in FINGERPRINT}
+    for feature in columns:
+        # every distinct text is hashed once per key
+        codes, uniques = pd.factorize(df[feature])
+        # missing texts have code -1, which picks the hash of the None appended after the distinct texts
+        uniques = np.append(np.asarray(uniques, dtype=object), [None])
+        for name, hash_key in zip(FINGERPRINT, HASH_KEYS):
+            hashed = pd.util.hash_array(uniques, hash_key=hash_key, categorize=False)
+            hashes[name] = hashes[name] * HASH_MULTIPLIER ^ hashed[codes]
+    return pd.DataFrame(hashes, index=df.index)
+
+
+class Deduplicator:
+    def __init__(self, columns: List[str], aggregations: Dict[str, str], compact_size: int = 1000000):
+        """
+        Combine records with the same text information. Records are grouped on a fixed-width 128-bit fingerprint
+        of their texts instead of the long text columns themselves, and only the columns listed in aggregations are
+        kept.
+        Chunks can be added one at a time (streaming) and partial results of several deduplicators can be merged.
+        Parameters
+        ----------
+        columns:
+            A list of names of text columns, e.g. TEXT_COLUMNS.
+        aggregations:
+            Explicit reducer of every other kept column, e.g. {'numberOfSignatures': 'sum'}. Any pandas groupby
+            reducer name ('sum', 'min', 'max', 'first', 'last') can be used; it must be associative to merge chunks.
+        compact_size:
+            Number of pending partial rows after which the partial results are combined, bounding the memory.
+        """
+        self.columns = columns
+        self.aggregations = aggregations
+        self.compact_size = compact_size
+        self.partials = []
+        self.n_pending = 0
+
+    def _reduce(self, df: pd.DataFrame) -> pd.DataFrame:
+        reducers = {feature: 'first' for feature in self.columns}
+        reducers.update(self.aggregations)
+        reduced = df.groupby(FINGERPRINT, sort=False).agg(reducers)
+        return reduced.reset_index()
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Add a chunk of preprocessed records.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the text columns and the aggregated columns.
+        """
+        df = df[self.columns + list(self.aggregations)].copy()
+        df[FINGERPRINT] = fingerprint(df, self.columns)
+        reduced = self._reduce(df)
+        self.partials.append(reduced)
+        self.n_pending += len(reduced)
+        if self.n_pending > self.compact_size:
+            self._compact()
+
+    def merge(self, other: 'Deduplicator') -> 'Deduplicator':
+        """
+        Merge the partial results of another deduplicator (e.g. built on another chunk or worker) into this one.
+        Parameters
+        ----------
+        other:
+            A deduplicator with the same columns and aggregations.
+        Returns
+        -------
+            This deduplicator.
+        """
+        self.partials.extend(other.partials)
+        self.n_pending += other.n_pending
+        self._compact()
+        return self
+
+    def _compact(self) -> None:
+        if len(self.partials) > 1:
+            self.partials = [self._reduce(pd.concat(self.partials, ignore_index=True))]
+            self.n_pending = len(self.partials[0])
+
+    def get_result(self, sort: bool = True) -> pd.DataFrame:
+        """
+        Return the deduplicated records.
+        Parameters
+        ----------
+        sort:
+            If true, sort records by the text columns, the same order as a groupby on the text columns.
+        Returns
+        -------
+            A dataframe with the text columns and the aggregated columns.
+        """
+        self._compact()
+        if self.partials:
+            df = self.partials[0].drop(columns=FINGERPRINT)
+        else:
+            df = pd.DataFrame(columns=self.columns + list(self.aggregations))
+        if sort:
+            df = df.sort_values(by=self.columns)
+        return df.reset_index(drop=True)
@@ -0,0 +1,161 @@
+import logging
+import numpy as np
+import pandas as pd
+from array import array
+from typing import Dict, List, Iterable, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentTermMatrix:
+    def __init__(self):
+        """
+        A sparse document-term count matrix in CSR layout. Tokens are mapped to vocabulary ids once, then target word
+        counts for any set of words are a column slice of the matrix, computed with NumPy.
+        Documents are appended row by row; the NumPy arrays are built on first use.
+        """
+        self.vocabulary = {}
+        self.words = []
+        self._indptr = array('q', [0])
+        self._indices = array('I')
+        self._data = array('I')
+        self._arrays = None
+
+    def add_document(self, counts: Mapping[str, int]) -> None:
+        """
+        Append a document (one row).
+        Parameters
+        ----------
+        counts:
+            A mapping of word to count, e.g. a Counter of the tokens of one record.
+        """
+        vocabulary = self.vocabulary
+        for word, count in counts.items():
+            word_id = vocabulary.get(word)
+            if word_id is None:
+                word_id = vocabulary[word] = len(self.words)
+                self.words.append(word)
+            self._indices.append(word_id)
+            self._data.append(count)
+        self._indptr.append(len(self._indices))
+        self._arrays = None
+
+    @property
+    def n_documents(self) -> int:
+        return len(self._indptr) - 1
+
+    def get_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Return the CSR arrays.
+        Returns
+        -------
+            A dictionary with indptr (n_documents + 1), indices (word ids) and data (counts).
+        """
+        if self._arrays is None:
+            # copies, a buffer exported to NumPy would prevent appending more documents
+            self._arrays = {'indptr': np.frombuffer(self._indptr, dtype=np.int64).copy(),
+                            'indices': np.frombuffer(self._indices, dtype=np.uint32).copy(),
+                            'data': np.frombuffer(self._data, dtype=np.uint32).copy()}
+        return self._arrays
+
+    def get_counts(self, target_words: List[str], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Count target words in every document.
+        Parameters
+        ----------
+        target_words:
+            A list of interested words.
+        rows:
+            If set, only count the target words of these documents, in this order (e.g. the top ranked ones).
+        Returns
+        -------
+            An int64 array of shape (n_documents, len(target_words)), or (len(rows), len(target_words)).
+        """
+        arrays = self.get_arrays()
+        indptr = arrays['indptr']
+        if rows is None:
+            entries = slice(None)
+            document_rows = np.repeat(np.arange(self.n_documents), np.diff(indptr))
+            n_rows = self.n_documents
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            starts, lengths = indptr[rows], indptr[rows + 1] - indptr[rows]
+            # positions of the entries of the selected rows in the CSR arrays
+            entries = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            document_rows = np.repeat(np.arange(len(rows)), lengths)
+            n_rows = len(rows)
+        res = np.zeros((n_rows, len(target_words)), dtype=np.int64)
+        # column of each word id in the result, -1 if the word is not a target
+        columns = np.full(len(self.words) + 1, -1, dtype=np.int64)
+        for column, word in enumerate(target_words):
+            if word in self.vocabulary:
+                columns[self.vocabulary[word]] = column
+        selected = columns[arrays['indices'][entries]]
+        mask = selected >= 0
+        # a word occurs at most once per row, so plain assignment is enough
+        res[document_rows[mask], selected[mask]] = arrays['data'][entries][mask]
+        return res
+
+    def get_target_counts(self, target_words: List[str], index: Iterable = None,
+                          rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Count target words in every document.
+        Parameters
+        ----------
+        target_words:
+            A list of interested words.
+        index:
+            Optional index of the returned dataframe (e.g. petition_id).
+        rows:
+            If set, only count the target words of these documents, in this order.
+        Returns
+        -------
+            A dataframe with one row per (selected) document and one column per target word.
+        """
+        return pd.DataFrame(self.get_counts(target_words, rows=rows), columns=target_words, index=index)
+
+    def get_word_frequency(self) -> Dict[str, int]:
+        """
+        Sum the matrix over documents.
+        Returns
+        -------
+            A mapping of word to total count.
+        """
+        arrays = self.get_arrays()
+        totals = np.bincount(arrays['indices'], weights=arrays['data'], minlength=len(self.words))
+        return dict(zip(self.words, totals.astype(np.int64).tolist()))
+
+    def save(self, fpath: str) -> None:
+        """
+        Save the matrix and its vocabulary (NumPy .npz).
+        Parameters
+        ----------
+        fpath:
+            The path where to save the matrix.
+        """
+        logger.info(f'Save document-term matrix to {fpath}')
+        arrays = self.get_arrays()
+        with open(fpath, 'wb') as raw:
+            np.savez(raw, words=np.array(self.words, dtype=str), **arrays)
+
+    @classmethod
+    def load(cls, fpath: str) -> 'DocumentTermMatrix':
+        """
+        Load a matrix written by save.
+        Parameters
+        ----------
+        fpath:
+            The path where to load the matrix from.
+        Returns
+        -------
+            A document-term matrix.
+        """
+        logger.info(f'Load document-term matrix from {fpath}')
+        matrix = cls()
+        with np.load(fpath) as saved:
+            matrix.words = saved['words'].tolist()
+            matrix._indptr = array('q', saved['indptr'].astype(np.int64).tobytes())
+            matrix._indices = array('I', saved['indices'].astype(np.uint32).tobytes())
+            matrix._data = array('I', saved['data'].astype(np.uint32).tobytes())
+        matrix.vocabulary = {word: word_id for word_id, word in enumerate(matrix.words)}
+        return matrix
@@ -0,0 +1,222 @@
+import struct
+import logging
+import numpy as np
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'WFTABLE\x00'
+VERSION = 1
+# magic, version, reserved, number of words, vocabulary blob size
+HEADER = struct.Struct('<8sIIQQ')
+
+
+def is_compact_table(fpath: str) -> bool:
+    """
+    Return true if the file was written by CompactTable.save.
+    """
+    with open(fpath, 'rb') as raw:
+        return raw.read(len(MAGIC)) == MAGIC
+
+
+class CompactTable(Mapping):
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, counts: np.ndarray):
+        """
+        A read-only word frequency lookup table stored in three flat arrays. Words are sorted, so the id of a word
+        is its rank and a lookup is a binary search. The arrays can be memory-mapped from a file written by save,
+        so many processes share one copy of the table and loading it takes no time.
+        Parameters
+        ----------
+        blob:
+            uint8 array of the concatenated UTF-8 encoded words.
+        offsets:
+            uint64 array of n + 1 offsets of the words in blob.
+        counts:
+            int64 array of n word counts.
+        """
+        self.blob = blob
+        self.offsets = offsets
+        self.counts = counts
+        self._ranking = None
+
+    @classmethod
+    def from_dict(cls, table: Dict[str, int]) -> 'CompactTable':
+        """
+        Build a compact table from a word-frequency mapping.
+        Parameters
+        ----------
+        table:
+            A mapping of word to count.
+        Returns
+        -------
+            A compact table.
+        """
+        words = sorted(table)
+        encoded = [word.encode('utf-8') for word in words]
+        offsets = np.zeros(len(words) + 1, dtype=np.uint64)
+        np.cumsum([len(word) for word in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        counts = np.array([table[word] for word in words], dtype=np.int64)
+        return cls(blob, offsets, counts)
+
+    def _word_bytes(self, word_id: int) -> bytes:
+        return self.blob[int(self.offsets[word_id]):int(self.offsets[word_id + 1])].tobytes()
+
+    def get_word(self, word_id: int) -> str:
+        """
+        Return the word of an id.
+        """
+        return self._word_bytes(word_id).decode('utf-8')
+
+    def _lower_bound(self, target: bytes) -> int:
+        # id of the first word not smaller than target
+        low, high = 0, len(self.counts)
+        while low < high:
+            middle = (low + high) // 2
+            if self._word_bytes(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def get_id(self, word: str) -> int:
+        """
+        Return the id of a word, or -1 if the word is not in the table.
+        """
+        target = word.encode('utf-8')
+        word_id = self._lower_bound(target)
+        if word_id < len(self.counts) and self._word_bytes(word_id) == target:
+            return word_id
+        return -1
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """
+        Return the ids [start, stop) of the words starting with a prefix. Words are sorted, so they are contiguous.
+        """
+        target = prefix.encode('utf-8')
+        start = self._lower_bound(target)
+        # the words starting with the prefix are followed by the first word not starting with it
+        low, high = start, len(self.counts)
+        while low < high:
+            middle = (low + high) // 2
+            if self._word_bytes(middle).startswith(target):
+                low = middle + 1
+            else:
+                high = middle
+        stop = low
+        return start, stop
+
+    def __getitem__(self, word: str) -> int:
+        word_id = self.get_id(word)
+        if word_id < 0:
+            raise KeyError(word)
+        return int(self.counts[word_id])
+
+    def __contains__(self, word) -> bool:
+        return isinstance(word, str) and self.get_id(word) >= 0
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __iter__(self) -> Iterator[str]:
+        return (self.get_word(word_id) for word_id in range(len(self.counts)))
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return zip(iter(self), self.counts.tolist())
+
+    def to_dict(self) -> Dict[str, int]:
+        """
+        Return the table as a plain dictionary.
+        """
+        return dict(self.items())
+
+    def get_ranking(self, min_letters: int = 0) -> np.ndarray:
+        """
+        Get the word ids in descending order of count (ties: descending word), the order of
+        WordFrequency.get_top_k. The ranking is computed once per table.
+        Parameters
+        ----------
+        min_letters:
+            Only keep the words of at least min_letters bytes. A word has at least as many bytes as letters, so
+            filtering on letters afterwards never misses a word.
+        Returns
+        -------
+            An array of word ids.
+        """
+        if self._ranking is None:
+            # Words are sorted, so ordering by (count, id) is ordering by (count, word).
+            ranking = np.lexsort((np.arange(len(self.counts)), self.counts))[::-1]
+            self._ranking = (ranking, np.diff(self.offsets.astype(np.int64))[ranking])
+        ranking, lengths = self._ranking
+        return ranking[lengths >= min_letters] if min_letters > 0 else ranking
+
+    def top_k(self, top_k: int, word_filter) -> List[str]:
+        """
+        Get the top k most common words passing a filter, in descending order of count (ties: descending word),
+        like WordFrequency.get_top_k. Words of the ranking are only decoded until k words pass.
+        Parameters
+        ----------
+        top_k:
+            Define the return number of most common words.
+        word_filter:
+            A WordFilter (supports `word in word_filter` and has min_letters).
+        Returns
+        -------
+            A list of the top k most common words sorted in descending order.
+        """
+        res = []
+        for word_id in self.get_ranking(word_filter.min_letters):
+            if len(res) >= top_k:
+                break
+            word = self.get_word(word_id)
+            if word in word_filter:
+                res.append(word)
+        return res
+
+    def save(self, fpath: str) -> None:
+        """
+        Save the table in a versioned binary format: header, counts, offsets and vocabulary blob.
+        Parameters
+        ----------
+        fpath:
+            The path where to save the table.
+        """
+        with open(fpath, 'wb') as raw:
+            raw.write(HEADER.pack(MAGIC, VERSION, 0, len(self.counts), len(self.blob)))
+            raw.write(np.ascontiguousarray(self.counts, dtype='<i8').tobytes())
+            raw.write(np.ascontiguousarray(self.offsets, dtype='<u8').tobytes())
+            raw.write(np.ascontiguousarray(self.blob, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, fpath: str, mmap: bool = True) -> 'CompactTable':
+        """
+        Load a table written by save.
+        Parameters
+        ----------
+        fpath:
+            The path where to load the table from.
+        mmap:
+            If true, memory-map the arrays instead of reading them.
+        Returns
+        -------
+            A compact table.
+        """
+        with open(fpath, 'rb') as raw:
+            magic, version, _, n_words, blob_size = HEADER.unpack(raw.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            message = f'{fpath} is not a compact lookup table of version {VERSION}'
+            logger.error(message)
+            raise ValueError(message)
+
+        offset = HEADER.size
+        arrays = []
+        for dtype, size in [('<i8', n_words), ('<u8', n_words + 1), (np.uint8, blob_size)]:
+            if mmap and size > 0:
+                array = np.memmap(fpath, dtype=dtype, mode='r', offset=offset, shape=(size,))
+            else:
+                array = np.fromfile(fpath, dtype=dtype, count=size, offset=offset)
+            arrays.append(array)
+            offset += size * np.dtype(dtype).itemsize
+        counts, offsets, blob = arrays
+        return cls(blob, offsets, counts)
@@ -0,0 +1,155 @@
+import heapq
+import logging
+import pandas as pd
+from collections import Counter
+from typing import Union, List, Dict, Iterable, Mapping, Sequence, Tuple
+from preprocessing.word_process import WordFilter, WordFrequency
+
+logger = logging.getLogger(__name__)
+
+
+class SpaceSavingFrequency:
+    def __init__(self, capacity: int = 100000, word_filter: WordFilter = None):
+        """
+        Approximate word frequency with a fixed memory budget (Space-Saving algorithm), an alternative to
+        WordFrequency for continuous streams. At most `capacity` words are monitored; when a new word arrives and the
+        summary is full, the word with the smallest count is replaced and the new word inherits its count as error.
+        Error bounds, with N the number of counted tokens:
+            - true count <= estimate <= true count + error, and error <= N / capacity for every monitored word;
+            - every word whose true count is larger than N / capacity is monitored.
+        So the top-k answer is exact for words much more frequent than N / capacity.
+        Parameters
+        ----------
+        capacity:
+            Maximum number of monitored words (the memory budget).
+        word_filter:
+            If set, only words passing the filter (min_letters, stopwords) are counted, so no counters are spent on
+            words that top-k queries would discard anyway.
+        """
+        if capacity is None or capacity <= 0:
+            logger.error('capacity must be a positive integer')
+            raise ValueError('capacity must be a positive integer')
+        self.capacity = capacity
+        self.word_filter = word_filter
+        # word -> [estimated count, error]
+        self.counters = {}
+        # min-heap of (count, word), exactly one entry per monitored word; an entry may be stale (count too low)
+        self.heap = []
+        self.n_tokens = 0
+
+    def _evict(self) -> int:
+        while True:
+            count, word = heapq.heappop(self.heap)
+            current = self.counters[word][0]
+            if count == current:
+                del self.counters[word]
+                return count
+            heapq.heappush(self.heap, (current, word))
+
+    def update(self, counts: Mapping[str, int]) -> None:
+        """
+        Add word counts to the summary.
+        Parameters
+        ----------
+        counts:
+            A mapping of word to count, e.g. a Counter of one record's tokens.
+        """
+        for word, count in counts.items():
+            if self.word_filter is not None and word not in self.word_filter:
+                continue
+            self.n_tokens += count
+            counter = self.counters.get(word)
+            if counter is not None:
+                counter[0] += count
+                continue
+            error = self._evict() if len(self.counters) >= self.capacity else 0
+            self.counters[word] = [error + count, error]
+            heapq.heappush(self.heap, (error + count, word))
+
+    def get_word_frequency(self, record: Union[Dict, pd.Series], columns: List[str]) -> None:
+        """
+        Count the words of one record, like WordFrequency.get_word_frequency.
+        Parameters
+        ----------
+        record:
+            A record contains one or more text objects.
+        columns:
+            A list of names of selected text objects.
+        """
+        for feature in columns:
+            self.update(Counter(record[feature].split()))
+
+    def get_table(self) -> Dict[str, int]:
+        """
+        Return the estimated counts of the monitored words, an approximate lookup table.
+        """
+        return {word: counter[0] for word, counter in self.counters.items()}
+
+    def save_table(self, fpath: str, compact: bool = False) -> None:
+        """
+        Save the estimated counts of the monitored words as a lookup table, like WordFrequency.save_table.
+        Parameters
+        ----------
+        fpath:
+            The path where to save the lookup table.
+        compact:
+            If true, save in the versioned binary format of CompactTable, otherwise pickle the dictionary.
+        """
+        word_frequency = WordFrequency()
+        word_frequency.update(self.get_table())
+        word_frequency.save_table(fpath, compact=compact)
+
+    def get_error_bound(self) -> float:
+        """
+        Return the maximum overestimation of any count, N / capacity.
+        """
+        return self.n_tokens / self.capacity
+
+    def get_estimates(self, top_k: int, word_filter: WordFilter = None) -> List[Tuple[str, int, int]]:
+        """
+        Get the top k words with their estimated count and error.
+        Parameters
+        ----------
+        top_k:
+            Define the return number of most common words.
+        word_filter:
+            If set, ignore words not passing the filter.
+        Returns
+        -------
+            A list of (word, estimated count, error) sorted by descending estimated count (ties: descending word).
+            The true count of a word is in [estimated count - error, estimated count].
+        """
+        candidates = ((counter[0], word) for word, counter in self.counters.items()
+                      if word_filter is None or word in word_filter)
+        return [(word, count, self.counters[word][1]) for count, word in heapq.nlargest(top_k, candidates)]
+
+    def get_top_k(self, top_k: int, min_letters=5, ignore_stopping_words: bool = False,
+                  languages: Sequence[str] = ('english',),
+                  extra_stopwords: Iterable[str] = ()) -> List[str]:
+        """
+        Get the approximate top k most common words, with the same rules as WordFrequency.get_top_k.
+        Can be called at any point in the stream.
+        Parameters
+        ----------
+        top_k:
+            Define the return number of most common words.
+        min_letters:
+            A threshold. Ignore words with number of letters smaller than min_letters.
+        ignore_stopping_words:
+            If true, ignore the NLTK stopwords of the given languages.
+        languages:
+            NLTK stopword languages used when ignore_stopping_words is true.
+        extra_stopwords:
+            Custom or domain stopwords, always ignored.
+        Returns
+        -------
+            A list of the top k most common words sorted in descending order.
+        """
+        if top_k is None or top_k < 0 or min_letters < 0:
+            logger.error('top_k and min_letters must be positive integers')
+            raise ValueError('top_k and min_letters must be positive integers')
+        word_filter = WordFilter.build(min_letters=min_letters,
+                                       ignore_stopping_words=ignore_stopping_words,
+                                       languages=languages,
+                                       extra_stopwords=extra_stopwords)
+        return [word for word, _, _ in self.get_estimates(top_k, word_filter)]
@@ -0,0 +1,177 @@
+import os
+import pickle
+import hashlib
+import logging
+import pandas as pd
+from collections import Counter
+from typing import List, Dict, Tuple
+from preprocessing.word_process import WordFrequency
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+
+class IncrementalState:
+    def __init__(self, columns: List[str], order_key: str, enable_lemmatisation: bool = False):
+        """
+        Persisted state of incremental runs: the cleaned-record store and the word frequency lookup table.
+        Records are keyed by a content hash of their raw texts, so a record is only cleaned the first time it is seen.
+        Parameters
+        ----------
+        columns:
+            A list of names of text columns, e.g. TEXT_COLUMNS.
+        order_key:
+            The name of the column aggregated across duplicated records, e.g. numberOfSignatures.
+        enable_lemmatisation:
+            Whether the stored texts were lemmatised. A state cannot be reused with a different setting.
+        """
+        self.columns = columns
+        self.order_key = order_key
+        self.enable_lemmatisation = enable_lemmatisation
+        # raw content hash -> [cleaned text of each column..., order_key value]
+        self.records = {}
+        self.word_frequency = WordFrequency()
+        # number of raw hashes per cleaned text key, a cleaned text key is counted once in the lookup table
+        self.key_refs = Counter()
+        # raw hashes already applied in the current run
+        self._seen = set()
+
+    @staticmethod
+    def content_hash(texts: List[str]) -> bytes:
+        """
+        Fingerprint the raw texts of a record.
+        Parameters
+        ----------
+        texts:
+            The raw texts of the record, one per column.
+        Returns
+        -------
+            A 16 bytes digest.
+        """
+        return hashlib.blake2b('\x00'.join(texts).encode('utf-8'), digest_size=16).digest()
+
+    def update(self, records: List[Dict], text_preprocessor) -> Tuple[int, int]:
+        """
+        Apply a batch of flattened raw records. New records are cleaned and added to the lookup table. Known records
+        get their order_key value replaced by the delta. Records repeated within the same run are summed, like
+        the groupby of a full run. Call start_run once before the first batch of a run.
+        Parameters
+        ----------
+        records:
+            A list of flattened raw records.
+        text_preprocessor:
+            An object with a transform_texts method (e.g. ParallelTextPreprocessing) used to clean new records.
+        Returns
+        -------
+            The number of new records and of updated records.
+        """
+        hashes = [self.content_hash([record[feature] for feature in self.columns]) for record in records]
+
+        new_records = {}
+        for digest, record in zip(hashes, records):
+            if digest not in self.records and digest not in new_records:
+                new_records[digest] = record
+        if new_records:
+            texts = [text_preprocessor.transform_texts([record[feature] for record in new_records.values()])
+                     for feature in self.columns]
+            for digest, cleaned in zip(new_records, zip(*texts)):
+                self.records[digest] = list(cleaned) + [0]
+                self._add_key(cleaned)
+
+        n_updated = 0
+        for digest, record in zip(hashes, records):
+            stored = self.records[digest]
+            if digest in self._seen:
+                stored[-1] += record[self.order_key]
+            else:
+                if digest not in new_records:
+                    n_updated += 1
+                stored[-1] = record[self.order_key]
+                self._seen.add(digest)
+        return len(new_records), n_updated
+
+    def start_run(self) -> None:
+        """
+        Mark the beginning of a run over a delta file, so that known records are replaced rather than summed.
+        """
+        self._seen = set()
+
+    def _add_key(self, cleaned: Tuple[str, ...]) -> None:
+        self.key_refs[cleaned] += 1
+        if self.key_refs[cleaned] == 1:
+            for text in cleaned:
+                self.word_frequency.update(Counter(text.split()))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Combine records with same cleaned text information.
+        Returns
+        -------
+            A dataframe with the text columns and the summed order_key, in the same order as a groupby on columns.
+        """
+        totals = Counter()
+        for stored in self.records.values():
+            totals[tuple(stored[:-1])] += stored[-1]
+        keys = sorted(totals)
+        df = pd.DataFrame(keys, columns=self.columns)
+        df[self.order_key] = [totals[key] for key in keys]
+        return df
+
+    def save(self, fpath: str) -> None:
+        """
+        Save the state.
+        Parameters
+        ----------
+        fpath:
+            The path where to save the state.
+        """
+        logger.info(f'Save incremental state ({len(self.records)} records) to {fpath}')
+        state = {'version': STATE_VERSION,
+                 'columns': self.columns,
+                 'order_key': self.order_key,
+                 'enable_lemmatisation': self.enable_lemmatisation,
+                 'records': self.records,
+                 'table': dict(self.word_frequency.get_table())}
+        tmp_fpath = fpath + '.tmp'
+        with open(tmp_fpath, 'wb') as raw:
+            pickle.dump(state, raw, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_fpath, fpath)
+
+    @classmethod
+    def load(cls, fpath: str, columns: List[str], order_key: str, enable_lemmatisation: bool = False) \
+            -> 'IncrementalState':
+        """
+        Load the state saved by a previous run, or create an empty state if fpath does not exist.
+        Parameters
+        ----------
+        fpath:
+            The path where to load the state from.
+        columns:
+            A list of names of text columns.
+        order_key:
+            The name of the aggregated column.
+        enable_lemmatisation:
+            Whether texts are lemmatised in this run.
+        Returns
+        -------
+            The incremental state.
+        """
+        state = cls(columns, order_key, enable_lemmatisation)
+        if not os.path.exists(fpath):
+            logger.info(f'No incremental state found at {fpath}, starting from scratch.')
+            return state
+
+        logger.info(f'Load incremental state from {fpath}')
+        with open(fpath, 'rb') as raw:
+            saved = pickle.load(raw)
+        for name, value in [('version', STATE_VERSION), ('columns', columns), ('order_key', order_key),
+                            ('enable_lemmatisation', enable_lemmatisation)]:
+            if saved[name] != value:
+                message = f'Incremental state {fpath} has {name}={saved[name]!r}, expected {value!r}'
+                logger.error(message)
+                raise ValueError(message)
+        state.records = saved['records']
+        state.word_frequency.table.update(saved['table'])
+        state.key_refs = Counter(tuple(stored[:-1]) for stored in state.records.values())
+        return state
@@ -0,0 +1,163 @@
+import os
+import sys
+import json
+import time
+import logging
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional, Iterator
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PROFILERS = ('cprofile', 'pyinstrument')
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _children_cpu_time() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class StageMetrics:
+    def __init__(self, name: str):
+        """
+        Metrics of one stage. Set n_records inside the stage to get its throughput, and add any stage specific
+        value (e.g. the busy time of overlapping sub-stages) to details.
+        """
+        self.name = name
+        self.n_records = None
+        self.details = {}
+        self.metrics = {}
+
+    def to_dict(self) -> Dict:
+        res = {'name': self.name, 'n_records': self.n_records}
+        res.update(self.metrics)
+        wall_time = self.metrics.get('wall_time_s')
+        res['records_per_s'] = self.n_records / wall_time if self.n_records is not None and wall_time else None
+        res.update(self.details)
+        return res
+
+
+class RunReport:
+    def __init__(self, profile: Optional[str] = None, profile_path: Optional[str] = None, **metadata):
+        """
+        Record wall time, CPU time, peak RSS and throughput of every stage of a run, and optionally profile stages.
+        Parameters
+        ----------
+        profile:
+            None, 'cprofile' or 'pyinstrument'. Profiles every stage and saves one profile per stage.
+        profile_path:
+            Directory where to save the profiles. Defaults to the current directory.
+        metadata:
+            Anything else to store in the report (e.g. input path and parameters).
+        """
+        if profile is not None and profile not in PROFILERS:
+            logger.error(f'profile must be one of {PROFILERS}')
+            raise ValueError(f'profile must be one of {PROFILERS}')
+        self.profile = profile
+        self.profile_path = profile_path or '.'
+        self.metadata = metadata
+        self.stages = []
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def _profiler(self, name: str) -> Iterator[None]:
+        if self.profile is None:
+            yield
+            return
+        os.makedirs(self.profile_path, exist_ok=True)
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(self.profile_path, f'{name}.prof'))
+            return
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise ImportError('pyinstrument is not installed, run `pip install pyinstrument` or use cprofile')
+        profiler = Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(os.path.join(self.profile_path, f'{name}.html'), 'w') as raw:
+                raw.write(profiler.output_html())
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """
+        Measure a stage.
+        e.g.
+            with report.stage('load') as stage:
+                df = load()
+                stage.n_records = len(df)
+        Parameters
+        ----------
+        name:
+            The stage name.
+        Returns
+        -------
+            The metrics of the stage, to set n_records.
+        """
+        stage = StageMetrics(name)
+        peak_rss = _peak_rss_mb()
+        wall_time = time.perf_counter()
+        cpu_time = time.process_time()
+        children_cpu_time = _children_cpu_time()
+        status = 'failed'
+        try:
+            with self._profiler(name):
+                yield stage
+            status = 'ok'
+        finally:
+            wall_time = time.perf_counter() - wall_time
+            end_peak_rss = _peak_rss_mb()
+            stage.metrics = {
+                'status': status,
+                'wall_time_s': wall_time,
+                'cpu_time_s': time.process_time() - cpu_time,
+                'children_cpu_time_s': _children_cpu_time() - children_cpu_time,
+                'peak_rss_mb': end_peak_rss,
+                'peak_rss_delta_mb': end_peak_rss - peak_rss if peak_rss is not None else None,
+            }
+            self.stages.append(stage)
+            logger.info(f'Stage {name} took {wall_time:.3f}s')
+
+    def to_dict(self) -> Dict:
+        return {'started_at': self.started_at,
+                'total_wall_time_s': time.perf_counter() - self._start,
+                'metadata': self.metadata,
+                'stages': [stage.to_dict() for stage in self.stages]}
+
+    def save(self, fpath: str) -> None:
+        """
+        Save the report as JSON.
+        Parameters
+        ----------
+        fpath:
+            The path where to save the report.
+        """
+        logger.info(f'Save run report to {fpath}')
+        with open(fpath, 'w') as raw:
+            json.dump(self.to_dict(), raw, indent=2, default=str)
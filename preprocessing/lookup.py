@@ -0,0 +1,287 @@
+import os
+import json
+import pickle
+import logging
+import argparse
+import functools
+import socketserver
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, List, Iterable, Optional, Sequence, Tuple, Type
+from preprocessing.frequency_table import CompactTable, is_compact_table
+from preprocessing.word_filter import WordFilter
+
+logger = logging.getLogger(__name__)
+
+
+class LookupService:
+    def __init__(self, table: CompactTable, cache_size: int = 4096):
+        """
+        Answer word-frequency queries from a preloaded lookup table, without pandas. Words are sorted (binary search
+        for point and prefix queries) and the ranking of all words by count is computed once (see
+        CompactTable.get_ranking), so a top-k query only scans the ranking until k words pass the filter. Prefix
+        and top-k results are cached.
+        Parameters
+        ----------
+        table:
+            A compact lookup table, e.g. memory-mapped with CompactTable.load.
+        cache_size:
+            Number of cached results per query type.
+        """
+        self.table = table
+        table.get_ranking()
+        self._prefix = functools.lru_cache(maxsize=cache_size)(self._prefix)
+        self._top_k = functools.lru_cache(maxsize=cache_size)(self._top_k)
+
+    @classmethod
+    def from_file(cls, fpath: str, mmap: bool = True, cache_size: int = 4096) -> 'LookupService':
+        """
+        Load a lookup table saved by WordFrequency.save_table, pickled or compact.
+        Parameters
+        ----------
+        fpath:
+            The path of the lookup table.
+        mmap:
+            If true, memory-map a compact table instead of reading it.
+        cache_size:
+            Number of cached results per query type.
+        Returns
+        -------
+            A lookup service.
+        """
+        logger.info(f'Load lookup table from {fpath}')
+        if is_compact_table(fpath):
+            table = CompactTable.load(fpath, mmap=mmap)
+        else:
+            with open(fpath, 'rb') as raw:
+                table = CompactTable.from_dict(pickle.load(raw))
+        return cls(table, cache_size=cache_size)
+
+    def get_count(self, word: str) -> int:
+        """
+        Return the frequency of a word, 0 if the word is not in the table.
+        """
+        word_id = self.table.get_id(word)
+        return int(self.table.counts[word_id]) if word_id >= 0 else 0
+
+    def get_counts(self, words: Iterable[str]) -> Dict[str, int]:
+        """
+        Return the frequency of every word, 0 for words not in the table.
+        """
+        return {word: self.get_count(word) for word in words}
+
+    def _prefix(self, prefix: str, limit: Optional[int]) -> Tuple[Tuple[str, int], ...]:
+        start, stop = self.table.prefix_range(prefix)
+        counts = self.table.counts[start:stop]
+        word_ids = np.arange(start, stop)
+        order = np.lexsort((word_ids, counts))[::-1][:limit]
+        return tuple((self.table.get_word(word_id), int(counts[word_id - start])) for word_id in word_ids[order])
+
+    def prefix(self, prefix: str, limit: Optional[int] = 10) -> List[Tuple[str, int]]:
+        """
+        Get the most frequent words starting with a prefix, e.g. for autocompletion.
+        Parameters
+        ----------
+        prefix:
+            The prefix of the words.
+        limit:
+            Maximum number of returned words. If None, return all of them.
+        Returns
+        -------
+            A list of (word, count) sorted in descending order of count.
+        """
+        if limit is not None and limit < 0:
+            logger.error('limit must be a positive integer')
+            raise ValueError('limit must be a positive integer')
+        return list(self._prefix(prefix, limit))
+
+    def _top_k(self, top_k: int, min_letters: int, ignore_stopping_words: bool,
+               languages: Tuple[str, ...], extra_stopwords: Tuple[str, ...]) -> Tuple[str, ...]:
+        word_filter = WordFilter.build(min_letters=min_letters,
+                                       ignore_stopping_words=ignore_stopping_words,
+                                       languages=languages,
+                                       extra_stopwords=extra_stopwords)
+        return tuple(self.table.top_k(top_k, word_filter))
+
+    def top_k(self, top_k: int, min_letters=5, ignore_stopping_words: bool = False,
+              languages: Sequence[str] = ('english',),
+              extra_stopwords: Iterable[str] = ()) -> List[str]:
+        """
+        Get the top k most common words, with the same rules and result as WordFrequency.get_top_k.
+        Parameters
+        ----------
+        top_k:
+            Define the return number of most common words.
+        min_letters:
+            A threshold. Ignore words with number of letters smaller than min_letters.
+        ignore_stopping_words:
+            If true, ignore the NLTK stopwords of the given languages.
+        languages:
+            NLTK stopword languages used when ignore_stopping_words is true.
+        extra_stopwords:
+            Custom or domain stopwords, always ignored.
+        Returns
+        -------
+            A list of the top k most common words sorted in descending order.
+        """
+        if top_k is None or top_k < 0 or min_letters < 0:
+            logger.error('top_k and min_letters must be positive integers')
+            raise ValueError('top_k and min_letters must be positive integers')
+        return list(self._top_k(top_k, min_letters, ignore_stopping_words,
+                                tuple(languages), tuple(sorted(extra_stopwords))))
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return hits, misses and size of the result caches.
+        """
+        return {name: cache.cache_info()._asdict() for name, cache in [('prefix', self._prefix),
+                                                                       ('top_k', self._top_k)]}
+
+
+def _flag(value: str) -> bool:
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def _words(values: List[str]) -> List[str]:
+    return [word for value in values for word in value.split(',') if word]
+
+
+def make_handler(service: LookupService) -> Type[BaseHTTPRequestHandler]:
+    """
+    Build an HTTP request handler answering JSON queries from a lookup service.
+    Routes (GET, query string parameters):
+        /count?word=people                              -> {"word": "people", "count": 12}
+        /counts?words=people,government                 -> {"counts": {"people": 12, "government": 7}}
+        /prefix?prefix=gov&limit=10                     -> {"words": [["government", 7], ...]}
+        /top_k?top_k=20&min_letters=5&ignore_stopping_words=true&languages=english&extra_stopwords=petition
+                                                        -> {"words": ["government", ...]}
+        /stats                                          -> cache statistics
+    POST /counts accepts a JSON list of words as body.
+    """
+    def count(params: Dict[str, List[str]]) -> Dict:
+        word = params['word'][0]
+        return {'word': word, 'count': service.get_count(word)}
+
+    def counts(params: Dict[str, List[str]]) -> Dict:
+        return {'counts': service.get_counts(_words(params['words']))}
+
+    def prefix(params: Dict[str, List[str]]) -> Dict:
+        limit = params.get('limit', ['10'])[0]
+        return {'words': service.prefix(params['prefix'][0], limit=None if limit == 'all' else int(limit))}
+
+    def top_k(params: Dict[str, List[str]]) -> Dict:
+        words = service.top_k(int(params.get('top_k', ['20'])[0]),
+                              min_letters=int(params.get('min_letters', ['5'])[0]),
+                              ignore_stopping_words=_flag(params.get('ignore_stopping_words', ['false'])[0]),
+                              languages=_words(params.get('languages', ['english'])),
+                              extra_stopwords=_words(params.get('extra_stopwords', [])))
+        return {'words': words}
+
+    routes = {'/count': count, '/counts': counts, '/prefix': prefix, '/top_k': top_k,
+              '/stats': lambda params: service.get_stats()}
+
+    class LookupHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict) -> None:
+            content = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def _answer(self, path: str, params: Dict[str, List[str]]) -> None:
+            if path not in routes:
+                self._send(404, {'error': f'unknown path {path}, use one of {sorted(routes)}'})
+                return
+            try:
+                self._send(200, routes[path](params))
+            except KeyError as e:
+                self._send(400, {'error': f'missing parameter {e}'})
+            except (ValueError, LookupError) as e:
+                self._send(400, {'error': str(e)})
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            self._answer(url.path, parse_qs(url.query))
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)
+            if url.path != '/counts':
+                self._send(405, {'error': 'only /counts accepts POST'})
+                return
+            try:
+                words = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'[]')
+            except ValueError:
+                words = None
+            if not isinstance(words, list) or not all(isinstance(word, str) for word in words):
+                self._send(400, {'error': 'body must be a JSON list of words'})
+                return
+            self._send(200, {'counts': service.get_counts(words)})
+
+        def address_string(self) -> str:
+            # client_address is empty for Unix sockets
+            return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+        def log_message(self, format: str, *args) -> None:
+            logger.debug(f'{self.address_string()} {format % args}')
+
+    return LookupHandler
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: LookupService, host: str = '127.0.0.1', port: int = 8000,
+                socket_path: Optional[str] = None) -> socketserver.BaseServer:
+    """
+    Build a threaded HTTP server for a lookup service, on a local TCP port or on a Unix socket.
+    Parameters
+    ----------
+    service:
+        The lookup service.
+    host:
+        Host to bind when socket_path is not set.
+    port:
+        Port to bind when socket_path is not set (0 picks a free port).
+    socket_path:
+        If set, listen on this Unix socket instead of a TCP port.
+    Returns
+    -------
+        The server, call serve_forever to start it.
+    """
+    handler = make_handler(service)
+    if socket_path is not None:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return UnixHTTPServer(socket_path, handler)
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    formatter = '%(name)s - %(levelname)s :: %(message)s'
+    logging.basicConfig(level=logging.INFO,
+                        format=formatter)
+    logger.setLevel(logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--table_fpath', required=True, type=str, help='Lookup table path (table.pkl or table.bin).')
+    parser.add_argument('--host', default='127.0.0.1', type=str, help='Host to bind.')
+    parser.add_argument('--port', default=8000, type=int, help='Port to bind.')
+    parser.add_argument('--socket_path', default=None, type=str, help='Listen on a Unix socket instead.')
+    parser.add_argument('--cache_size', default=4096, type=int, help='Number of cached results per query type.')
+    args = parser.parse_args()
+
+    server = make_server(LookupService.from_file(args.table_fpath, cache_size=args.cache_size),
+                         host=args.host, port=args.port, socket_path=args.socket_path)
+    logger.info(f'Serve lookup table on {args.socket_path or f"http://{args.host}:{args.port}"}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket_path is not None and os.path.exists(args.socket_path):
+            os.remove(args.socket_path)
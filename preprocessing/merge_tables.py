@@ -0,0 +1,44 @@
+import logging
+import argparse
+from typing import List
+from preprocessing.word_process import WordFrequency
+
+logger = logging.getLogger(__name__)
+
+
+def merge_tables(input_fpaths: List[str],
+                 output_fpath: str,
+                 compact: bool = False,
+                 ) -> None:
+    """
+    Merge partial lookup tables built on separate shards (processes or machines) into one lookup table.
+    Note that records duplicated across shards are counted once per shard.
+    Parameters
+    ----------
+    input_fpaths:
+        Paths of the partial lookup tables (pickled or compact).
+    output_fpath:
+        Path where to save the merged lookup table.
+    compact:
+        If true, save the merged table in the compact binary format.
+    """
+    logger.info(f'Merge {len(input_fpaths)} lookup tables.')
+    shards = [WordFrequency.from_file(fpath) for fpath in input_fpaths]
+    word_frequency = WordFrequency.reduce(shards)
+    logger.info(f'Merged lookup table contains {len(word_frequency.get_table())} words.')
+    word_frequency.save_table(fpath=output_fpath, compact=compact)
+
+
+if __name__ == "__main__":
+    formatter = '%(name)s - %(levelname)s :: %(message)s'
+    logging.basicConfig(level=logging.INFO,
+                        format=formatter)
+    logger.setLevel(logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input_fpaths', required=True, nargs='+', type=str, help='Partial lookup table paths.')
+    parser.add_argument('--output_fpath', required=True, type=str, help='Merged lookup table path.')
+    parser.add_argument('--compact', action='store_true', help='Save in the compact binary format.')
+    args = parser.parse_args()
+    merge_tables(input_fpaths=args.input_fpaths,
+                 output_fpath=args.output_fpath,
+                 compact=args.compact)
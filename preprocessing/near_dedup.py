@@ -0,0 +1,270 @@
+import zlib
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# universal hashing modulo a Mersenne prime, (a * x + b) fits in an int64 for x, a, b < 2^31
+PRIME = (1 << 31) - 1
+CLUSTER = 'cluster'
+REPRESENTATIVE = 'representative'
+JACCARD = 'jaccard'
+
+
+def get_shingles(texts: Sequence[str], shingle_size: int = 1) -> np.ndarray:
+    """
+    Hash the shingles (word n-grams) of the preprocessed texts of one record. Texts are already cleaned, so they
+    are only split on spaces. Shingles are prefixed by the position of their text, so a word of the label and the
+    same word of the abstract are different shingles.
+    Parameters
+    ----------
+    texts:
+        The preprocessed strings of the selected columns.
+    shingle_size:
+        Number of words per shingle. A text shorter than that is a single shingle.
+    Returns
+    -------
+        The sorted distinct shingle hashes, an int64 array of values smaller than PRIME.
+    """
+    shingles = set()
+    for position, text in enumerate(texts):
+        tokens = text.split()
+        for start in range(max(len(tokens) - shingle_size + 1, 1) if tokens else 0):
+            shingle = f'{position}:' + ' '.join(tokens[start:start + shingle_size])
+            shingles.add(zlib.crc32(shingle.encode('utf-8')) % PRIME)
+    return np.array(sorted(shingles), dtype=np.int64)
+
+
+def jaccard(shingles: np.ndarray, other: np.ndarray) -> float:
+    """
+    Jaccard similarity of two sorted distinct shingle arrays.
+    """
+    if len(shingles) == 0 and len(other) == 0:
+        return 1.0
+    intersection = len(np.intersect1d(shingles, other, assume_unique=True))
+    return intersection / (len(shingles) + len(other) - intersection)
+
+
+def get_lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose the number of bands b and of rows per band r (b * r <= num_perm) of the LSH index. Two records of
+    Jaccard similarity s share a band with probability 1 - (1 - s^r)^b; b and r minimize the probability of
+    missing a pair above the threshold plus the probability of a candidate below it. Missed pairs are weighted
+    9 times more, candidates are verified anyway.
+    Parameters
+    ----------
+    threshold:
+        The Jaccard similarity threshold.
+    num_perm:
+        Number of MinHash permutations.
+    Returns
+    -------
+        (bands, rows).
+    """
+    similarities = np.linspace(0, 1, 201)
+    best, best_cost = (1, num_perm), np.inf
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        probabilities = 1 - (1 - similarities ** rows) ** bands
+        false_positives = np.trapz(np.where(similarities < threshold, probabilities, 0), similarities)
+        false_negatives = np.trapz(np.where(similarities >= threshold, 1 - probabilities, 0), similarities)
+        cost = 0.1 * false_positives + 0.9 * false_negatives
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+class MinHash:
+    def __init__(self, num_perm: int = 128, seed: int = 0):
+        """
+        MinHash signatures of shingle sets: the fraction of equal signature values of two records estimates the
+        Jaccard similarity of their shingles.
+        Parameters
+        ----------
+        num_perm:
+            Number of hash functions (permutations), the length of a signature.
+        seed:
+            Seed of the hash functions.
+        """
+        random_state = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = random_state.randint(1, PRIME, size=num_perm, dtype=np.int64)
+        self.b = random_state.randint(0, PRIME, size=num_perm, dtype=np.int64)
+
+    def get_signatures(self, shingles: List[np.ndarray]) -> np.ndarray:
+        """
+        Compute the signatures of many records, one hash function at a time over all the shingles.
+        Parameters
+        ----------
+        shingles:
+            The shingle hashes of every record, see get_shingles.
+        Returns
+        -------
+            An int64 array of shape (n_records, num_perm). Records without shingles get PRIME everywhere.
+        """
+        lengths = np.array([len(values) for values in shingles], dtype=np.int64)
+        signatures = np.full((len(shingles), self.num_perm), PRIME, dtype=np.int64)
+        non_empty = lengths > 0
+        if not non_empty.any():
+            return signatures
+        values = np.concatenate([values for values in shingles if len(values)])
+        starts = np.concatenate([[0], np.cumsum(lengths[non_empty])[:-1]])
+        for i in range(self.num_perm):
+            signatures[non_empty, i] = np.minimum.reduceat((self.a[i] * values + self.b[i]) % PRIME, starts)
+        return signatures
+
+
+def get_candidate_pairs(signatures: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """
+    Find the pairs of records sharing at least one band of their signatures (LSH banding). Each band is hashed
+    with a sort, so the cost is roughly linear in the number of records plus the number of candidate pairs.
+    Parameters
+    ----------
+    signatures:
+        MinHash signatures, shape (n_records, num_perm).
+    bands:
+        Number of bands.
+    rows:
+        Number of signature values per band.
+    Returns
+    -------
+        A (n_pairs, 2) int64 array of distinct pairs (i, j) with i < j.
+    """
+    pairs = []
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = keys.view(np.dtype((np.void, keys.dtype.itemsize * rows))).ravel()
+        _, buckets = np.unique(keys, return_inverse=True)
+        order = np.argsort(buckets, kind='stable')
+        boundaries = np.flatnonzero(np.diff(buckets[order])) + 1
+        for members in np.split(order, boundaries):
+            if len(members) > 1:
+                first, second = np.triu_indices(len(members), k=1)
+                pairs.append(np.stack([members[first], members[second]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs).astype(np.int64), axis=0)
+
+
+class NearDeduplicator:
+    def __init__(self, columns: List[str], aggregations: Dict[str, str], threshold: float = 0.8,
+                 num_perm: int = 128, shingle_size: int = 1, order_key: Optional[str] = None, seed: int = 0):
+        """
+        Merge near-duplicated records, e.g. petitions with the same label and slightly different abstracts.
+        Candidate pairs are found with MinHash signatures and an LSH index instead of comparing every pair, then
+        kept if the Jaccard similarity of their shingles reaches the threshold. Records are visited by decreasing
+        order_key: a record not merged yet becomes a representative and absorbs the records similar to it which are
+        not merged yet, so every member reaches the threshold against its representative (similar pairs are not
+        chained). Each cluster keeps the texts of its representative and aggregates the other columns.
+        Parameters
+        ----------
+        columns:
+            A list of names of preprocessed text columns, e.g. TEXT_COLUMNS.
+        aggregations:
+            Reducer of every other kept column, e.g. {'numberOfSignatures': 'sum'}.
+        threshold:
+            Jaccard similarity threshold, between 0 (excluded) and 1.
+        num_perm:
+            Number of MinHash permutations, more is more accurate and slower.
+        shingle_size:
+            Number of words per shingle.
+        order_key:
+            Records with a larger order_key become representatives first (ties: the first one). If None, records
+            are visited in their order.
+        seed:
+            Seed of the MinHash hash functions.
+        """
+        if not 0 < threshold <= 1:
+            logger.error('threshold must be in (0, 1]')
+            raise ValueError('threshold must be in (0, 1]')
+        if num_perm <= 0 or shingle_size <= 0:
+            logger.error('num_perm and shingle_size must be positive integers')
+            raise ValueError('num_perm and shingle_size must be positive integers')
+        self.columns = columns
+        self.aggregations = aggregations
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.order_key = order_key
+        self.min_hash = MinHash(num_perm=num_perm, seed=seed)
+        self.bands, self.rows = get_lsh_params(threshold, num_perm)
+
+    def get_clusters(self, df: pd.DataFrame) -> Tuple[np.ndarray, List[np.ndarray], Dict[str, int]]:
+        """
+        Find the clusters of near-duplicated records.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the preprocessed text columns, and order_key if set.
+        Returns
+        -------
+            The cluster of every record (the position of its representative), the shingles of every record and
+            statistics (number of candidate and similar pairs).
+        """
+        shingles = [get_shingles(texts, self.shingle_size) for texts in zip(*(df[feature] for feature in self.columns))]
+        signatures = self.min_hash.get_signatures(shingles)
+        # records without any word get distinct signatures, their exact duplicates are already combined
+        empty = np.flatnonzero([len(values) == 0 for values in shingles])
+        signatures[empty] = -(empty[:, None] + 1)
+        candidates = get_candidate_pairs(signatures, self.bands, self.rows)
+
+        neighbours = [[] for _ in range(len(df))]
+        n_similar = 0
+        for i, j in candidates.tolist():
+            if jaccard(shingles[i], shingles[j]) >= self.threshold:
+                n_similar += 1
+                neighbours[i].append(j)
+                neighbours[j].append(i)
+
+        # representatives first by the largest order_key, ties and order_key None: the first record
+        order = np.arange(len(df))
+        if self.order_key is not None:
+            order = np.lexsort((order, -df[self.order_key].to_numpy()))
+        clusters = np.full(len(df), -1, dtype=np.int64)
+        for i in order.tolist():
+            if clusters[i] < 0:
+                clusters[i] = i
+                for j in neighbours[i]:
+                    if clusters[j] < 0:
+                        clusters[j] = i
+        return clusters, shingles, {'candidate_pairs': len(candidates), 'similar_pairs': n_similar}
+
+    def deduplicate(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Merge the clusters of near-duplicated records.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the text columns and the aggregated columns, with exact duplicates combined.
+        Returns
+        -------
+            The merged records in the order of their representatives, and the membership of every cluster of more
+            than one record: cluster number, representative flag, texts, aggregated columns and Jaccard similarity
+            to the representative.
+        """
+        df = df[self.columns + list(self.aggregations)].reset_index(drop=True)
+        clusters, shingles, stats = self.get_clusters(df)
+        logger.info(f'{stats["candidate_pairs"]} candidate pairs, {stats["similar_pairs"]} near-duplicated pairs')
+
+        representatives = np.flatnonzero(clusters == np.arange(len(df)))
+        cluster_of = pd.Series(np.arange(len(representatives)), index=clusters[representatives])
+        numbers = cluster_of.loc[clusters].to_numpy()
+
+        res = df.iloc[representatives].reset_index(drop=True)
+        aggregated = df[list(self.aggregations)].groupby(numbers, sort=True).agg(self.aggregations)
+        for feature in self.aggregations:
+            res[feature] = aggregated[feature].to_numpy()
+
+        sizes = np.bincount(numbers, minlength=len(representatives))
+        members = np.flatnonzero(sizes[numbers] > 1)
+        members = members[np.lexsort((members, numbers[members]))]
+        membership = df.iloc[members].reset_index(drop=True)
+        membership.insert(0, CLUSTER, pd.factorize(numbers[members])[0])
+        is_representative = np.zeros(len(df), dtype=bool)
+        is_representative[representatives] = True
+        membership.insert(1, REPRESENTATIVE, is_representative[members])
+        membership[JACCARD] = [jaccard(shingles[member], shingles[representatives[number]])
+                               for member, number in zip(members.tolist(), numbers[members].tolist())]
+        logger.info(f'Merge {len(df) - len(res)} near-duplicated records into {int((sizes > 1).sum())} clusters')
+        return res, membership
@@ -1,7 +1,33 @@
 TEXT_COLUMNS = ['abstract', 'label']
 ORDER_KEY = "numberOfSignatures"
 PRIMARY_KEY = "petition_id"
+# Explicit reducers applied when combining records with same text information, other columns are dropped.
+AGGREGATIONS = {ORDER_KEY: 'sum'}
 ENABLE_LEMMATISATION = True
 IGNORE_STOPPING_WORDS = True
 TOP_K = 20
 MIN_LETTERS = 5
+STOPWORD_LANGUAGES = ['english']
+EXTRA_STOPWORDS_FPATH = None
+NLTK_DATA_PATH = None
+NLTK_ALLOW_DOWNLOAD = False
+# 'pickle' saves table.pkl, 'compact' saves table.bin (memory-mappable, see frequency_table.CompactTable)
+TABLE_FORMAT = 'pickle'
+# formats of output1 and output2: 'csv' (original layout), 'parquet', 'feather' (compact integer dtypes, need pyarrow)
+OUTPUT_FORMATS = ['csv']
+# also save the non-zero entries of output2 as output2_sparse (petition_id, word, count)
+SPARSE_OUTPUT2 = False
+# number of rows written at a time
+OUTPUT_CHUNK_SIZE = 100000
+# Jaccard similarity threshold of the near-duplicate merge (MinHash/LSH, see near_dedup.py), None disables it
+NEAR_DEDUP_THRESHOLD = None
+MINHASH_PERMUTATIONS = 128
+# number of words per shingle compared by the near-duplicate merge
+MINHASH_SHINGLE_SIZE = 1
+# memory budget in bytes of the ranking sort. None sorts in memory, ties in no particular order (the original
+# ranking). If set, the sort is stable (ties keep their deduplicated order) and larger rankings are sorted in runs
+# spilled to disk (see ranking.py), e.g. 256 * 2 ** 20
+RANK_MEMORY_BUDGET = None
+# number of words monitored by the approximate lookup table of the streaming modes (Space-Saving, see
+# heavy_hitters.py), None counts every word exactly
+APPROXIMATE_TOP_K_CAPACITY = None
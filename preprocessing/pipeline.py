@@ -0,0 +1,160 @@
+import time
+import queue
+import logging
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+def _put(items: queue.Queue, item: Any, stop: threading.Event) -> bool:
+    # Block while the queue is full (backpressure), but give up when the consumer has stopped.
+    while not stop.is_set():
+        try:
+            items.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class ThreadedIterator:
+    def __init__(self, iterable: Iterable, maxsize: int = 2, name: str = 'producer'):
+        """
+        Consume an iterable (e.g. a file reader) in a background thread, connected to the consumer by a bounded
+        queue. The producer runs ahead by at most maxsize items and blocks when the queue is full, so I/O overlaps
+        with the work of the consumer without reading the whole input in memory. Exceptions of the producer are
+        raised in the consumer.
+        Parameters
+        ----------
+        iterable:
+            The items to produce.
+        maxsize:
+            Maximum number of items waiting in the queue.
+        name:
+            Name of the producer thread.
+        """
+        if maxsize is None or maxsize <= 0:
+            logger.error('maxsize must be a positive integer')
+            raise ValueError('maxsize must be a positive integer')
+        self.iterable = iterable
+        self.maxsize = maxsize
+        self.name = name
+        # time spent by the producer to produce items, excluding the time blocked on a full queue
+        self.busy_time = 0.0
+
+    def _produce(self, items: queue.Queue, stop: threading.Event) -> None:
+        try:
+            iterator = iter(self.iterable)
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    self.busy_time += time.perf_counter() - start
+                if not _put(items, item, stop):
+                    return
+            _put(items, _DONE, stop)
+        except BaseException as e:
+            _put(items, _Failure(e), stop)
+
+    def __iter__(self) -> Iterator:
+        items = queue.Queue(self.maxsize)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._produce, args=(items, stop), name=self.name, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise item.exception
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+
+
+class BackgroundWriter:
+    def __init__(self, maxsize: int = 4, name: str = 'writer'):
+        """
+        Run tasks (e.g. writing output files) in order in a background thread, so the caller keeps computing while
+        the results are written. submit blocks when maxsize tasks are waiting (backpressure). Use it as a context
+        manager; leaving the context waits for all tasks and raises the first failure. If the context is left with an
+        error, the tasks still queued are dropped (the task being run completes).
+        Parameters
+        ----------
+        maxsize:
+            Maximum number of waiting tasks.
+        name:
+            Name of the writer thread.
+        """
+        if maxsize is None or maxsize <= 0:
+            logger.error('maxsize must be a positive integer')
+            raise ValueError('maxsize must be a positive integer')
+        self.tasks = queue.Queue(maxsize)
+        # set to drop the queued tasks
+        self.stop = threading.Event()
+        self.failure = None
+        self.busy_time = 0.0
+        self.thread = threading.Thread(target=self._consume, name=name, daemon=True)
+        self.thread.start()
+
+    def _consume(self) -> None:
+        while True:
+            task = self.tasks.get()
+            if task is _DONE:
+                return
+            if self.failure is not None or self.stop.is_set():
+                continue
+            func, args, kwargs = task
+            start = time.perf_counter()
+            try:
+                func(*args, **kwargs)
+            except BaseException as e:
+                self.failure = e
+            finally:
+                self.busy_time += time.perf_counter() - start
+
+    def submit(self, func: Callable, *args, **kwargs) -> None:
+        """
+        Queue a call of func(*args, **kwargs). The arguments must not be modified afterwards.
+        """
+        if self.failure is not None:
+            raise self.failure
+        if not self.thread.is_alive():
+            raise RuntimeError('BackgroundWriter is closed')
+        self.tasks.put((func, args, kwargs))
+
+    def close(self) -> None:
+        """
+        Wait for all queued tasks, then raise the first failure if any.
+        """
+        if self.thread.is_alive():
+            self.tasks.put(_DONE)
+            self.thread.join()
+        if self.failure is not None:
+            raise self.failure
+
+    def __enter__(self) -> 'BackgroundWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+            return
+        # an error in the caller takes precedence: drop the queued tasks, only wait for the running one
+        self.stop.set()
+        if self.thread.is_alive():
+            self.tasks.put(_DONE)
+            self.thread.join()
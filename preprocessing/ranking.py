@@ -0,0 +1,235 @@
+import os
+import heapq
+import shutil
+import logging
+import tempfile
+import numpy as np
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# bytes of a (negated count, key) pair
+PAIR_SIZE = 16
+# minimum number of pairs read at a time from a run during the merge
+MIN_BLOCK_SIZE = 4096
+# default memory budget in bytes of a sort
+MEMORY_BUDGET = 256 << 20
+
+
+def _sort_pairs(counts: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    # (negated count, key) pairs in ascending order: descending count, ties by ascending key
+    pairs = np.empty((len(counts), 2), dtype=np.int64)
+    pairs[:, 0] = -np.asarray(counts, dtype=np.int64)
+    pairs[:, 1] = keys
+    if np.all(pairs[1:, 1] >= pairs[:-1, 1]):
+        # keys already in order, e.g. positions
+        return pairs[np.argsort(pairs[:, 0], kind='stable')]
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def _count_not_after(block: np.ndarray, bound: np.ndarray) -> int:
+    # number of pairs of a sorted block which are not after bound
+    return int(np.count_nonzero((block[:, 0] < bound[0]) | ((block[:, 0] == bound[0]) & (block[:, 1] <= bound[1]))))
+
+
+def _merge_runs(fpaths: List[str], block_size: int) -> Iterator[np.ndarray]:
+    """
+    K-way merge of sorted runs, block by block: every run has one block in memory, and all the pairs up to the
+    smallest last pair of the blocks of the runs which are not fully read are sorted and emitted together.
+    """
+    runs = [np.load(fpath, mmap_mode='r') for fpath in fpaths]
+    positions = [0] * len(runs)
+    blocks = [np.zeros((0, 2), dtype=np.int64)] * len(runs)
+    while True:
+        for i, run in enumerate(runs):
+            if len(blocks[i]) == 0 and positions[i] < len(run):
+                blocks[i] = np.array(run[positions[i]:positions[i] + block_size])
+                positions[i] += len(blocks[i])
+        bounds = [block[-1] for block, position, run in zip(blocks, positions, runs)
+                  if len(block) and position < len(run)]
+        if not bounds:
+            remaining = [block for block in blocks if len(block)]
+            if remaining:
+                merged = np.concatenate(remaining)
+                yield merged[np.lexsort((merged[:, 1], merged[:, 0]))]
+            return
+        bound = min(bounds, key=tuple)
+        emitted = []
+        for i, block in enumerate(blocks):
+            n_emitted = _count_not_after(block, bound)
+            emitted.append(block[:n_emitted])
+            blocks[i] = block[n_emitted:]
+        merged = np.concatenate(emitted)
+        yield merged[np.lexsort((merged[:, 1], merged[:, 0]))]
+
+
+class ExternalSorter:
+    def __init__(self, memory_budget: int = MEMORY_BUDGET, tmp_path: Optional[str] = None):
+        """
+        Sort (count, key) pairs in descending order of count, ties by ascending key, within a memory budget.
+        Pairs are buffered and sorted in memory; when the buffer exceeds the budget it is sorted and spilled to disk
+        as a run, and the runs are merged with a k-way merge at the end, reading every run block by block (the
+        budget split between the runs, at least MIN_BLOCK_SIZE pairs per run).
+        Parameters
+        ----------
+        memory_budget:
+            Maximum size in bytes of the buffered pairs (16 bytes per pair).
+        tmp_path:
+            Directory of the spilled runs, the system temporary directory by default.
+        """
+        if memory_budget < PAIR_SIZE:
+            logger.error(f'memory_budget must be at least {PAIR_SIZE} bytes')
+            raise ValueError(f'memory_budget must be at least {PAIR_SIZE} bytes')
+        self.run_size = memory_budget // PAIR_SIZE
+        self.tmp_path = tmp_path
+        self.counts = []
+        self.keys = []
+        self.n_buffered = 0
+        self.n_pairs = 0
+        self.runs = []
+        self.run_path = None
+
+    def add(self, counts: np.ndarray, keys: Optional[np.ndarray] = None) -> None:
+        """
+        Add pairs.
+        Parameters
+        ----------
+        counts:
+            The counts, e.g. numberOfSignatures.
+        keys:
+            Integer keys of the records (e.g. their positions). Defaults to the number of pairs added before plus
+            the position in counts.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        keys = np.asarray(keys, dtype=np.int64) if keys is not None else np.arange(self.n_pairs,
+                                                                                  self.n_pairs + len(counts))
+        position = 0
+        while position < len(counts):
+            size = min(self.run_size - self.n_buffered, len(counts) - position)
+            self.counts.append(counts[position:position + size])
+            self.keys.append(keys[position:position + size])
+            self.n_buffered += size
+            position += size
+            if self.n_buffered >= self.run_size:
+                self._spill()
+        self.n_pairs += len(counts)
+
+    def _buffered_pairs(self) -> np.ndarray:
+        pairs = _sort_pairs(np.concatenate(self.counts or [np.zeros(0, dtype=np.int64)]),
+                            np.concatenate(self.keys or [np.zeros(0, dtype=np.int64)]))
+        self.counts, self.keys, self.n_buffered = [], [], 0
+        return pairs
+
+    def _spill(self) -> None:
+        if self.run_path is None:
+            self.run_path = tempfile.mkdtemp(prefix='ranking-', dir=self.tmp_path)
+        fpath = os.path.join(self.run_path, f'run-{len(self.runs)}.npy')
+        np.save(fpath, self._buffered_pairs())
+        self.runs.append(fpath)
+        logger.debug(f'Spill sorted run {fpath}')
+
+    def _sorted_blocks(self) -> Iterator[np.ndarray]:
+        if not self.runs:
+            yield self._buffered_pairs()
+            return
+        if self.n_buffered:
+            self._spill()
+        logger.info(f'Merge {len(self.runs)} sorted runs of at most {self.run_size} pairs')
+        try:
+            yield from _merge_runs(self.runs, block_size=max(self.run_size // (len(self.runs) + 1), MIN_BLOCK_SIZE))
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        """
+        Iterate over the sorted (count, key) pairs. Ends the sort, the sorter cannot be reused.
+        """
+        for block in self._sorted_blocks():
+            for negated_count, key in block.tolist():
+                yield -negated_count, key
+
+    def get_keys(self) -> np.ndarray:
+        """
+        Return all the keys in sorted order, an int64 array. Ends the sort, the sorter cannot be reused.
+        """
+        blocks = [block[:, 1] for block in self._sorted_blocks()]
+        return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int64)
+
+    def close(self) -> None:
+        """
+        Delete the spilled runs.
+        """
+        if self.run_path is not None:
+            shutil.rmtree(self.run_path, ignore_errors=True)
+            self.run_path = None
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def top_n(pairs: Iterable[Tuple[int, int]], n: int) -> List[Tuple[int, int]]:
+    """
+    Get the n (count, key) pairs of largest count, ties by ascending key, with a heap of n pairs.
+    Parameters
+    ----------
+    pairs:
+        (count, key) pairs, e.g. a generator over chunks.
+    n:
+        Number of pairs to keep.
+    Returns
+    -------
+        A list of at most n pairs in descending order of count.
+    """
+    if n is None or n < 0:
+        logger.error('n must be a positive integer')
+        raise ValueError('n must be a positive integer')
+    return [(-negated_count, key) for negated_count, key in
+            heapq.nsmallest(n, ((-count, key) for count, key in pairs))]
+
+
+def rank(counts: Union[np.ndarray, Iterable[np.ndarray]], top: Optional[int] = None, memory_budget: int = MEMORY_BUDGET,
+         tmp_path: Optional[str] = None) -> np.ndarray:
+    """
+    Rank records in descending order of count; ties keep their order (a stable sort). Only the (count, position)
+    pairs are sorted, within a memory budget, so the records themselves are never reordered.
+    Parameters
+    ----------
+    counts:
+        The count of every record (e.g. numberOfSignatures), an array or an iterable of chunks of it in record
+        order, so that the counts do not have to be in memory at once.
+    top:
+        If set, only rank the top records, with a heap.
+    memory_budget:
+        Maximum size in bytes of the pairs sorted in memory, see ExternalSorter.
+    tmp_path:
+        Directory of the spilled runs.
+    Returns
+    -------
+        The positions of the ranked records, an int64 array: the record at position order[i] has rank i.
+    """
+    chunks = [counts] if isinstance(counts, np.ndarray) else counts
+    if top is not None:
+        chunk_size = max(memory_budget // PAIR_SIZE, 1)
+
+        def candidates() -> Iterator[Tuple[int, int]]:
+            # the top of a chunk (with all the ties of its smallest count) contains the chunk pairs of the global top
+            offset = 0
+            for counts_chunk in chunks:
+                counts_chunk = np.asarray(counts_chunk, dtype=np.int64)
+                for start in range(0, len(counts_chunk), chunk_size):
+                    chunk = counts_chunk[start:start + chunk_size]
+                    positions = np.arange(len(chunk))
+                    if len(chunk) > top > 0:
+                        threshold = np.partition(chunk, len(chunk) - top)[len(chunk) - top]
+                        positions = np.flatnonzero(chunk >= threshold)
+                    yield from zip(chunk[positions].tolist(), (positions + offset + start).tolist())
+                offset += len(counts_chunk)
+
+        return np.array([key for _, key in top_n(candidates(), top)], dtype=np.int64)
+    with ExternalSorter(memory_budget=memory_budget, tmp_path=tmp_path) as sorter:
+        for counts_chunk in chunks:
+            sorter.add(counts_chunk)
+        return sorter.get_keys()
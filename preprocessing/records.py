@@ -0,0 +1,109 @@
+import logging
+import pandas as pd
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class RecordSchema:
+    def __init__(self, fields: Sequence[str]):
+        """
+        The fields of a family of records. The field positions are stored once in the schema and shared by all of
+        its records, so a record only holds a list of values.
+        Parameters
+        ----------
+        fields:
+            Field names, e.g. TEXT_COLUMNS + ['numberOfSignatures'] + the '_length' fields set by WordCount.
+        """
+        self.fields = tuple(fields)
+        self.positions = {field: position for position, field in enumerate(self.fields)}
+
+    def new(self, values: Sequence[Any] = None) -> 'Record':
+        """
+        Create a record from values given in the order of fields. Missing values are None.
+        """
+        values = list(values) if values is not None else []
+        return Record(self, values + [None] * (len(self.fields) - len(values)))
+
+    def from_dict(self, mapping: Mapping[str, Any]) -> 'Record':
+        """
+        Create a record from a mapping, e.g. a raw JSON record. Keys which are not fields are ignored.
+        """
+        return Record(self, [mapping.get(field) for field in self.fields])
+
+    def from_dataframe(self, df: pd.DataFrame) -> List['Record']:
+        """
+        Create one record per row, reading the dataframe column by column (no pandas Series per row).
+        """
+        columns = [df[field].tolist() if field in df.columns else [None] * len(df) for field in self.fields]
+        return [Record(self, list(values)) for values in zip(*columns)]
+
+    def to_dataframe(self, records: Sequence['Record'], fields: Sequence[str] = None,
+                     index: Iterable = None) -> pd.DataFrame:
+        """
+        Build a dataframe column by column, e.g. at an output boundary.
+        Parameters
+        ----------
+        records:
+            Records of this schema.
+        fields:
+            Selected fields, all fields by default.
+        index:
+            Optional index of the dataframe (e.g. petition_id).
+        Returns
+        -------
+            A dataframe with one row per record and one column per selected field.
+        """
+        fields = list(fields) if fields is not None else list(self.fields)
+        positions = [self.positions[field] for field in fields]
+        return pd.DataFrame({field: [record.values[position] for record in records]
+                             for field, position in zip(fields, positions)},
+                            columns=fields, index=index)
+
+
+class Record:
+    __slots__ = ('schema', 'values')
+
+    def __init__(self, schema: RecordSchema, values: List[Any]):
+        """
+        A lightweight mutable record with a fixed set of fields, accepted by the record processing functions
+        (TextPreprocessing.extract_text, WordCount.get_word_counts, WordCount.get_target_count,
+        WordFrequency.get_word_frequency) in place of a dictionary or a pandas Series. Create records with a
+        RecordSchema.
+        """
+        self.schema = schema
+        self.values = values
+
+    def __getitem__(self, field: str) -> Any:
+        return self.values[self.schema.positions[field]]
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        position = self.schema.positions.get(field)
+        if position is None:
+            logger.error(f'{field} is not a field of the record, add it to the schema')
+            raise KeyError(field)
+        self.values[position] = value
+
+    def __contains__(self, field: str) -> bool:
+        return field in self.schema.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.fields)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            return self.schema.fields == other.schema.fields and self.values == other.values
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'Record({self.to_dict()})'
+
+    def get(self, field: str, default: Any = None) -> Any:
+        position = self.schema.positions.get(field)
+        return self.values[position] if position is not None else default
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(zip(self.schema.fields, self.values))
@@ -0,0 +1,111 @@
+import logging
+from typing import List, Optional
+from preprocessing.params import NLTK_DATA_PATH, NLTK_ALLOW_DOWNLOAD
+
+logger = logging.getLogger(__name__)
+
+# NLTK resource name -> package name used by nltk.download
+NLTK_RESOURCES = {
+    'corpora/stopwords': 'stopwords',
+    'corpora/wordnet': 'wordnet',
+}
+
+_config = {'data_path': NLTK_DATA_PATH, 'allow_download': NLTK_ALLOW_DOWNLOAD}
+
+
+def configure(data_path: Optional[str] = None, allow_download: Optional[bool] = None) -> None:
+    """
+    Configure where NLTK resources are loaded from. nltk itself is only imported on first use.
+    Parameters
+    ----------
+    data_path:
+        A local directory containing NLTK data (e.g. corpora/stopwords). Searched before the NLTK default paths.
+    allow_download:
+        If true, missing resources are downloaded into data_path. Otherwise, a missing resource fails fast.
+    """
+    if data_path is not None:
+        _config['data_path'] = data_path
+    if allow_download is not None:
+        _config['allow_download'] = allow_download
+
+
+def find_resource(resource: str) -> str:
+    """
+    Locate an NLTK resource, downloading it only if allowed.
+    Parameters
+    ----------
+    resource:
+        An NLTK resource name, e.g. 'corpora/stopwords'.
+    Returns
+    -------
+        The path of the resource.
+    """
+    import nltk
+
+    data_path = _config['data_path']
+    if data_path is not None and data_path not in nltk.data.path:
+        nltk.data.path.insert(0, data_path)
+
+    try:
+        return str(nltk.data.find(resource))
+    except LookupError:
+        pass
+
+    package = NLTK_RESOURCES.get(resource, resource.split('/')[-1])
+    if _config['allow_download']:
+        logger.info(f'Download NLTK resource {package}')
+        nltk.download(package, download_dir=data_path, quiet=True, raise_on_error=True)
+        return str(nltk.data.find(resource))
+
+    message = (f'NLTK resource {resource!r} not found in {nltk.data.path}. Downloads are disabled; install it with '
+               f'`python -m nltk.downloader -d <path> {package}` and set NLTK_DATA_PATH in params.py '
+               f'(or --nltk_data_path) to that path.')
+    logger.error(message)
+    raise LookupError(message)
+
+
+def check_resources(enable_lemmatisation: bool = False, ignore_stopping_words: bool = False) -> None:
+    """
+    Fail fast, before any expensive work, if a resource needed by the run is missing.
+    Parameters
+    ----------
+    enable_lemmatisation:
+        If true, WordNet is required.
+    ignore_stopping_words:
+        If true, the stopword corpus is required.
+    """
+    if enable_lemmatisation:
+        find_resource('corpora/wordnet')
+    if ignore_stopping_words:
+        find_resource('corpora/stopwords')
+
+
+def get_stopwords(language: str = 'english') -> List[str]:
+    """
+    Load the NLTK stopword list of a language.
+    Parameters
+    ----------
+    language:
+        An NLTK stopword language.
+    Returns
+    -------
+        A list of stopwords.
+    """
+    find_resource('corpora/stopwords')
+    from nltk.corpus import stopwords
+    if language not in stopwords.fileids():
+        logger.error(f'Unknown stopword language {language!r}, use one of {stopwords.fileids()}')
+        raise ValueError(f'Unknown stopword language {language!r}, use one of {stopwords.fileids()}')
+    return stopwords.words(language)
+
+
+def get_lemmatizer():
+    """
+    Create a WordNet lemmatizer. WordNet itself is loaded by NLTK on the first lemmatisation.
+    Returns
+    -------
+        A WordNetLemmatizer.
+    """
+    find_resource('corpora/wordnet')
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
@@ -1,18 +1,51 @@
 import pandas as pd
-import swifter
 import os
+import json
+import time
 import logging
 import argparse
-from preprocessing.text_process import TextPreprocessing
-from preprocessing.word_process import WordCount, WordFrequency
+import multiprocessing
+import numpy as np
+from collections import Counter, deque
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from preprocessing import resources
+from preprocessing.checkpoint import CheckpointStore, stage_key
+from preprocessing.data_loader import iter_records, iter_json_objects
+from preprocessing.dedup import Deduplicator
+from preprocessing.heavy_hitters import SpaceSavingFrequency
+from preprocessing.incremental import IncrementalState
+from preprocessing.instrumentation import RunReport, StageMetrics
+from preprocessing.near_dedup import NearDeduplicator, CLUSTER
+from preprocessing.pipeline import ThreadedIterator, BackgroundWriter
+from preprocessing.ranking import MEMORY_BUDGET, rank
+from preprocessing.records import Record, RecordSchema
+from preprocessing.sinks import OutputSink, check_output_formats
+from preprocessing.sweep import Sweep, parse_configs, config_name
+from preprocessing.token_store import TokenStore
+from preprocessing.text_process import ParallelTextPreprocessing, LemmaCache
+from preprocessing.word_filter import load_stopwords
+from preprocessing.word_process import WordCount, WordFrequency, TokenizedCorpus
 from preprocessing.params import (
     TEXT_COLUMNS,
     ORDER_KEY,
     PRIMARY_KEY,
+    AGGREGATIONS,
     ENABLE_LEMMATISATION,
     IGNORE_STOPPING_WORDS,
     TOP_K,
     MIN_LETTERS,
+    STOPWORD_LANGUAGES,
+    EXTRA_STOPWORDS_FPATH,
+    TABLE_FORMAT,
+    OUTPUT_FORMATS,
+    SPARSE_OUTPUT2,
+    OUTPUT_CHUNK_SIZE,
+    NEAR_DEDUP_THRESHOLD,
+    MINHASH_PERMUTATIONS,
+    MINHASH_SHINGLE_SIZE,
+    RANK_MEMORY_BUDGET,
+    APPROXIMATE_TOP_K_CAPACITY,
 )
 
 formatter = '%(name)s - %(levelname)s :: %(message)s'
@@ -24,6 +57,23 @@ logger.setLevel(logging.INFO)
 
 def run_etl(input_fpath: str,
             artefacts_path:str,
+            single_pass: bool = False,
+            streaming: bool = False,
+            chunk_size: int = 10000,
+            n_workers: int = None,
+            clean_chunk_size: int = 1000,
+            lemma_cache_fpath: str = None,
+            nltk_data_path: str = None,
+            state_path: str = None,
+            profile: str = None,
+            checkpoint_path: str = None,
+            pipeline: bool = False,
+            queue_size: int = 4,
+            sweep: List[Dict] = None,
+            token_store_path: str = None,
+            near_dedup_threshold: float = None,
+            top_n: int = None,
+            approximate_top_k_capacity: int = None,
             ) -> None:
     """
     Run etl job.
@@ -33,61 +83,931 @@ def run_etl(input_fpath: str,
         Input file path.
     artefacts_path:
         Output path where to store output artefacts.
+    single_pass:
+        If true, tokenize each record only once and derive lengths, lookup table and target counts from the same
+        tokens, instead of re-splitting the texts in every stage.
+    streaming:
+        If true, read the input incrementally in chunks of flattened records and combine duplicated records chunk
+        by chunk, so that the raw dataset is never fully loaded in memory. Implies single_pass.
+    chunk_size:
+        Number of records per chunk in streaming mode.
+    n_workers:
+        If set, clean texts with the built-in process pool of n_workers workers instead of in the current process.
+        In pipeline mode, at least 2, defaults to the number of CPUs (at least 2).
+    clean_chunk_size:
+        Number of strings sent to a cleaning worker at a time.
+    lemma_cache_fpath:
+        If set, warm the lemma cache from this file when it exists and save the cache back after cleaning.
+    nltk_data_path:
+        Local directory containing the NLTK data. Defaults to NLTK_DATA_PATH in params.py.
+    state_path:
+        If set, run incrementally: input_fpath is a delta file applied to the cleaned-record store and lookup table
+        persisted in this file by previous runs. Only new records are cleaned. Implies streaming.
+    profile:
+        None, 'cprofile' or 'pyinstrument'. Profile every stage and save the profiles in artefacts_path/profiles.
+        Stage timings, CPU time, peak RSS and throughput are always saved in artefacts_path/run_report.json.
+    checkpoint_path:
+        If set, save the result of every expensive stage (cleaning, deduplication, counting, lookup table) in this
+        directory, keyed by the input file hash and the params the stage depends on. Reruns load the results of the
+        stages whose inputs have not changed, e.g. changing TOP_K only recomputes top_k and output2.
+        Not used in incremental mode, which keeps its own state.
+    pipeline:
+        If true, run the streaming mode as a pipeline: a thread reads and parses the input, the cleaning worker
+        processes clean the next chunks while the current one is combined, and a thread writes the outputs while
+        the next ones are computed. Stages are connected by bounded queues. Implies streaming.
+    queue_size:
+        Maximum number of chunks waiting between two pipeline stages.
+    sweep:
+        If set, also write the output2 of every configuration of this list (top_k, min_letters,
+        ignore_stopping_words, see sweep.parse_configs) as output2_<configuration name>, together with
+        sweep.json. All configurations reuse the cleaned corpus, the lookup table and the tokens of the run.
+        Implies single_pass.
+    token_store_path:
+        If set, save the cleaned and deduplicated corpus in this directory as a memory-mappable integer-encoded
+        token store (see TokenStore), in petition_id order with numberOfSignatures.
+    near_dedup_threshold:
+        If set, merge the near-duplicated records after combining the exact duplicates: records whose cleaned
+        tokens have a Jaccard similarity of at least this threshold are found with MinHash/LSH and merged, their
+        numberOfSignatures summed. The clusters are saved in near_duplicates.csv. Defaults to NEAR_DEDUP_THRESHOLD
+        in params.py.
+    top_n:
+        If set, only rank the top_n most signed petitions, with a heap instead of a full sort: output1, output2 and
+        the token store only contain petition_id 0 to top_n - 1 (the same rows as a full run with
+        RANK_MEMORY_BUDGET set, ties in a stable order), while the lookup table and the top_k words still cover all
+        petitions.
+    approximate_top_k_capacity:
+        If set, count the lookup table of the streaming and pipeline modes with a SpaceSavingFrequency monitoring
+        this many words instead of a WordFrequency: the memory of the table is bounded, the top_k words and the saved
+        table (the monitored words only) are estimates, see heavy_hitters.py. Defaults to APPROXIMATE_TOP_K_CAPACITY
+        in params.py.
     """
+    if top_n is not None and top_n < 0:
+        logger.error('top_n must be a positive integer')
+        raise ValueError('top_n must be a positive integer')
+    if pipeline and n_workers is not None and n_workers < 2:
+        # with a single worker the chunks would be cleaned in the main thread, not overlapped with combining
+        logger.error('Pipeline mode cleans in a pool of worker processes, n_workers must be at least 2')
+        raise ValueError('Pipeline mode cleans in a pool of worker processes, n_workers must be at least 2')
+    if pipeline and n_workers is None:
+        n_workers = max(multiprocessing.cpu_count(), 2)
+    near_dedup_threshold = near_dedup_threshold if near_dedup_threshold is not None else NEAR_DEDUP_THRESHOLD
+    approximate_top_k_capacity = (approximate_top_k_capacity if approximate_top_k_capacity is not None
+                                  else APPROXIMATE_TOP_K_CAPACITY)
+    if approximate_top_k_capacity is not None and (not (streaming or pipeline) or state_path is not None):
+        logger.error('approximate_top_k_capacity is only supported in streaming and pipeline mode')
+        raise ValueError('approximate_top_k_capacity is only supported in streaming and pipeline mode')
+    resources.configure(data_path=nltk_data_path)
+    resources.check_resources(enable_lemmatisation=ENABLE_LEMMATISATION,
+                              ignore_stopping_words=IGNORE_STOPPING_WORDS or
+                              any(config['ignore_stopping_words'] for config in sweep or []))
+    check_output_formats(OUTPUT_FORMATS)
 
-    df = pd.read_json(input_fpath, orient='records')
-    logger.info(f'Load raw data from {input_fpath}. Raw dataset contains {len(df)} records.')
+    report = RunReport(profile=profile,
+                       profile_path=os.path.join(artefacts_path, 'profiles'),
+                       input_fpath=input_fpath,
+                       mode='incremental' if state_path is not None else 'pipeline' if pipeline
+                       else 'streaming' if streaming else 'single_pass' if single_pass else 'batch',
+                       params={'ENABLE_LEMMATISATION': ENABLE_LEMMATISATION,
+                               'IGNORE_STOPPING_WORDS': IGNORE_STOPPING_WORDS,
+                               'TOP_K': TOP_K,
+                               'MIN_LETTERS': MIN_LETTERS,
+                               'n_workers': n_workers,
+                               'sweep': sweep,
+                               'near_dedup_threshold': near_dedup_threshold,
+                               'top_n': top_n,
+                               'approximate_top_k_capacity': approximate_top_k_capacity})
+    checkpoints = CheckpointStore(checkpoint_path) if checkpoint_path is not None and state_path is None else None
+    try:
+        if state_path is not None:
+            _run_incremental(input_fpath, artefacts_path, state_path, chunk_size, n_workers=n_workers or 1,
+                             clean_chunk_size=clean_chunk_size, lemma_cache_fpath=lemma_cache_fpath, report=report,
+                             sweep=sweep, token_store_path=token_store_path,
+                             near_dedup_threshold=near_dedup_threshold, top_n=top_n)
+        elif streaming or pipeline:
+            dedup_key = _get_dedup_key(checkpoints, input_fpath)
+            df = _load_checkpoint(checkpoints, report, 'dedup', dedup_key)
+            if df is None:
+                df = _load_streaming(input_fpath, chunk_size, n_workers=n_workers or 1,
+                                     clean_chunk_size=clean_chunk_size, lemma_cache_fpath=lemma_cache_fpath,
+                                     report=report, pipeline=pipeline, queue_size=queue_size)
+                _save_checkpoint(checkpoints, 'dedup', dedup_key, df)
+            if near_dedup_threshold is not None:
+                df, dedup_key = _near_dedup(df, near_dedup_threshold, artefacts_path, report, checkpoints, dedup_key)
+            with BackgroundWriter(maxsize=queue_size) if pipeline else nullcontext() as writer:
+                _run_single_pass(df, artefacts_path, report=report, checkpoints=checkpoints, parent_key=dedup_key,
+                                 writer=writer, sweep=sweep, token_store_path=token_store_path, top_n=top_n,
+                                 approximate_top_k_capacity=approximate_top_k_capacity)
+        else:
+            _run_batch(input_fpath, artefacts_path, single_pass=single_pass or bool(sweep), n_workers=n_workers,
+                       clean_chunk_size=clean_chunk_size, lemma_cache_fpath=lemma_cache_fpath, report=report,
+                       checkpoints=checkpoints, sweep=sweep, token_store_path=token_store_path,
+                       near_dedup_threshold=near_dedup_threshold, top_n=top_n)
+    finally:
+        try:
+            report.save(os.path.join(artefacts_path, 'run_report.json'))
+        except Exception:
+            # do not replace the exception of a failed run
+            logger.exception('Failed to save the run report')
 
-    logger.info('Extract text from raw data with preprocessing...')
-    logger.info(f'Enable lemmatisation: {ENABLE_LEMMATISATION}')
-    text_preprocessor = TextPreprocessing()
-    df = df.swifter.apply(text_preprocessor.extract_text,
-                          columns=TEXT_COLUMNS,
-                          enable_lemmatisation=ENABLE_LEMMATISATION,
-                          axis=1)
-
-    logger.info('Combine records with same text information...')
-    df = df.groupby(TEXT_COLUMNS).agg('sum').reset_index()
+
+def _run_batch(input_fpath: str,
+               artefacts_path: str,
+               single_pass: bool,
+               n_workers: int,
+               clean_chunk_size: int,
+               lemma_cache_fpath: str,
+               report: RunReport,
+               checkpoints: Optional[CheckpointStore] = None,
+               sweep: List[Dict] = None,
+               token_store_path: str = None,
+               near_dedup_threshold: float = None,
+               top_n: int = None) -> None:
+    """
+    Load the whole raw dataset and run all stages on it.
+    Parameters
+    ----------
+    input_fpath:
+        Input file path.
+    artefacts_path:
+        Output path where to store output artefacts.
+    single_pass:
+        If true, use the tokenize-once counting stages.
+    n_workers:
+        If set, clean texts with the built-in process pool of n_workers workers instead of in the current process.
+    clean_chunk_size:
+        Number of strings sent to a cleaning worker at a time.
+    lemma_cache_fpath:
+        If set, warm the lemma cache from this file when it exists and save the cache back after cleaning.
+    report:
+        The run report where stage metrics are recorded.
+    checkpoints:
+        If set, load the stage results stored by previous runs and save the new ones.
+    sweep:
+        If set, also write the output2 of every configuration of this list, requires single_pass.
+    token_store_path:
+        If set, save the ranked corpus as a token store in this directory.
+    near_dedup_threshold:
+        If set, merge the near-duplicated records with this Jaccard similarity threshold.
+    top_n:
+        If set, only rank and output the top_n most signed petitions.
+    """
+    clean_key = _get_clean_key(checkpoints, input_fpath)
+    dedup_key = _get_dedup_key(checkpoints, input_fpath)
+    df = _load_checkpoint(checkpoints, report, 'dedup', dedup_key)
+    if df is None:
+        df = _load_checkpoint(checkpoints, report, 'clean', clean_key)
+        if df is None:
+            records = _load_and_clean(input_fpath, n_workers, clean_chunk_size, lemma_cache_fpath, report)
+            df = _get_record_schema().to_dataframe(records, fields=TEXT_COLUMNS + list(AGGREGATIONS))
+            _save_checkpoint(checkpoints, 'clean', clean_key, df)
+
+        logger.info('Combine records with same text information...')
+        with report.stage('dedup') as stage:
+            stage.n_records = len(df)
+            deduplicator = Deduplicator(columns=TEXT_COLUMNS, aggregations=AGGREGATIONS)
+            deduplicator.add(df)
+            df = deduplicator.get_result()
+        _save_checkpoint(checkpoints, 'dedup', dedup_key, df)
     logger.info(f'New dataset contains {len(df)} records')
+    if near_dedup_threshold is not None:
+        df, dedup_key = _near_dedup(df, near_dedup_threshold, artefacts_path, report, checkpoints, dedup_key)
 
-    df = df.swifter.apply(WordCount.get_word_counts, columns=TEXT_COLUMNS, axis=1)
-    df = df.sort_values(by=ORDER_KEY, ascending=False)
-    df = df.reset_index(drop=True)
-    df.index.name = PRIMARY_KEY
+    if single_pass:
+        _run_single_pass(df, artefacts_path, report=report, checkpoints=checkpoints, parent_key=dedup_key,
+                         sweep=sweep, token_store_path=token_store_path, top_n=top_n)
+        return
 
-    selected_columns = [feature + '_length' for feature in TEXT_COLUMNS] + [ORDER_KEY]
-    output_fpath = os.path.join(artefacts_path, 'output1.csv')
-    df[selected_columns].to_csv(output_fpath)
-    logger.info(f'Save output1 to {output_fpath}')
+    # version 3: the Record objects in deduplicated order and the ranked positions
+    rank_key = stage_key('rank', dedup_key, {'ORDER_KEY': ORDER_KEY, 'PRIMARY_KEY': PRIMARY_KEY, 'top_n': top_n,
+                                             'stable_rank': RANK_MEMORY_BUDGET is not None}, version=3)
+    schema = _get_record_schema()
+    checkpoint = _load_checkpoint(checkpoints, report, 'rank', rank_key)
+    if checkpoint is not None:
+        records, order = checkpoint
+    else:
+        with report.stage('rank') as stage:
+            stage.n_records = len(df)
+            records = schema.from_dataframe(df)
+            order = _rank(df, top_n, stage)
+        with report.stage('word_counts') as stage:
+            stage.n_records = len(order)
+            for position in order.tolist():
+                WordCount.get_word_counts(records[position], columns=TEXT_COLUMNS)
+        _save_checkpoint(checkpoints, 'rank', rank_key, (records, order))
+    # the records are not reordered, petition_id i is the record at position order[i]
+    n_ranked = len(order)
+    index = pd.RangeIndex(n_ranked, name=PRIMARY_KEY)
+    if token_store_path is not None:
+        _save_token_store(df, order, token_store_path, report)
+
+    with report.stage('write_output1') as stage:
+        stage.n_records = n_ranked
+        selected_columns = [feature + '_length' for feature in TEXT_COLUMNS] + [ORDER_KEY]
+        _write_output((schema.to_dataframe([records[position] for position in
+                                            order[start:start + OUTPUT_CHUNK_SIZE].tolist()],
+                                           fields=selected_columns, index=index[start:start + OUTPUT_CHUNK_SIZE])
+                       for start in range(0, max(n_ranked, 1), OUTPUT_CHUNK_SIZE)),
+                      'output1', artefacts_path)
 
     logger.info('Building lookup table...')
-    word_frequency = WordFrequency()
-    _ = df.apply(word_frequency.get_word_frequency,
-                 columns=TEXT_COLUMNS,
-                 axis=1)
+    frequency_key = stage_key('frequency', dedup_key, {})
+    word_frequency = _load_checkpoint(checkpoints, report, 'frequency', frequency_key)
+    if word_frequency is None:
+        with report.stage('frequency') as stage:
+            stage.n_records = len(records)
+            word_frequency = WordFrequency()
+            for record in records:
+                word_frequency.get_word_frequency(record, columns=TEXT_COLUMNS)
+        _save_checkpoint(checkpoints, 'frequency', frequency_key, word_frequency)
     logger.info('Saving word frequency lookup table')
-    word_frequency.save_table(fpath=os.path.join(artefacts_path, 'table.pkl'))
+    with report.stage('save_table'):
+        _save_table(word_frequency, artefacts_path)
+
+    with report.stage('top_k'):
+        target_words = _get_target_words(word_frequency)
+    with report.stage('target_counts') as stage:
+        stage.n_records = n_ranked
+        # every chunk of records is written as soon as it is counted
+        _write_output(_iter_target_counts(records, order, target_words, index), 'output2', artefacts_path,
+                      sparse=SPARSE_OUTPUT2)
+
+
+def _iter_target_counts(records: List[Record], order: np.ndarray, target_words: List[str],
+                        index: pd.Index) -> Iterator[pd.DataFrame]:
+    """
+    Count the target words of the ranked records, OUTPUT_CHUNK_SIZE records at a time.
+    Parameters
+    ----------
+    records:
+        The deduplicated records, with the word counts of the ranked ones.
+    order:
+        The positions of the ranked records, in petition_id order.
+    target_words:
+        A list of interested words.
+    index:
+        The petition_id index of the ranked records.
+    Returns
+    -------
+        The chunks of output2, at least one (empty if there is no record).
+    """
+    for start in range(0, max(len(order), 1), OUTPUT_CHUNK_SIZE):
+        yield pd.DataFrame([WordCount.get_target_count(records[position], columns=TEXT_COLUMNS,
+                                                       target_words=target_words)
+                            for position in order[start:start + OUTPUT_CHUNK_SIZE].tolist()],
+                           columns=target_words, index=index[start:start + OUTPUT_CHUNK_SIZE], dtype='int64')
+
+
+def _rank(df: pd.DataFrame, top_n: Optional[int], stage: StageMetrics) -> np.ndarray:
+    """
+    Rank the records by numberOfSignatures in descending order, without reordering df.
+    By default all the records are sorted in memory like DataFrame.sort_values, ties in no particular order. If
+    RANK_MEMORY_BUDGET is set, or with top_n, the sort is stable: ties keep their order in df (sorted by
+    TEXT_COLUMNS after deduplication), and only (numberOfSignatures, position) pairs are sorted, fed chunk by chunk
+    and spilled to disk in runs beyond RANK_MEMORY_BUDGET.
+    Parameters
+    ----------
+    df:
+        The deduplicated dataset.
+    top_n:
+        If set, only rank the top_n records with a heap.
+    stage:
+        The metrics of the rank stage.
+    Returns
+    -------
+        The positions in df of the ranked records (all of them, or the top_n), in petition_id order.
+    """
+    counts = df[ORDER_KEY]
+    stage.details['stable'] = RANK_MEMORY_BUDGET is not None or top_n is not None
+    if not stage.details['stable']:
+        return counts.reset_index(drop=True).sort_values(ascending=False).index.to_numpy()
+    if top_n is not None:
+        stage.details['top_n'] = top_n
+    return rank((counts.iloc[start:start + OUTPUT_CHUNK_SIZE].to_numpy()
+                 for start in range(0, len(counts), OUTPUT_CHUNK_SIZE)),
+                top=top_n, memory_budget=RANK_MEMORY_BUDGET if RANK_MEMORY_BUDGET is not None else MEMORY_BUDGET)
+
+
+def _load_and_clean(input_fpath: str,
+                    n_workers: int,
+                    clean_chunk_size: int,
+                    lemma_cache_fpath: str,
+                    report: RunReport) -> List[Record]:
+    """
+    Load the whole raw dataset and preprocess the text columns. Records are kept as lightweight Records.
+    Parameters
+    ----------
+    input_fpath:
+        Input file path.
+    n_workers:
+        If set, clean texts with the built-in process pool of n_workers workers instead of in the current process.
+        Either way the text columns are cleaned in batches (TextPreprocessing.transform_batch).
+    clean_chunk_size:
+        Number of strings cleaned (or sent to a cleaning worker) at a time.
+    lemma_cache_fpath:
+        If set, warm the lemma cache from this file when it exists and save the cache back after cleaning.
+    report:
+        The run report where stage metrics are recorded.
+    Returns
+    -------
+        Preprocessed records.
+    """
+    schema = _get_record_schema()
+    with report.stage('load') as stage:
+        records = [schema.from_dict(raw) for raw in iter_json_objects(input_fpath)]
+        stage.n_records = len(records)
+    logger.info(f'Load raw data from {input_fpath}. Raw dataset contains {len(records)} records.')
+
+    logger.info('Extract text from raw data with preprocessing...')
+    logger.info(f'Enable lemmatisation: {ENABLE_LEMMATISATION}')
+    with report.stage('clean') as stage:
+        stage.n_records = len(records)
+        # without n_workers, the columns are cleaned in batches in the current process (a single worker)
+        with ParallelTextPreprocessing(n_workers=n_workers or 1,
+                                       chunk_size=clean_chunk_size,
+                                       enable_lemmatisation=ENABLE_LEMMATISATION,
+                                       lemma_cache_fpath=lemma_cache_fpath) as text_preprocessor:
+            text_preprocessor.extract_records(records, columns=TEXT_COLUMNS)
+            lemma_cache = text_preprocessor.get_lemma_cache()
+        _save_lemma_cache(lemma_cache, lemma_cache_fpath)
+    return records
+
+
+def _get_record_schema() -> RecordSchema:
+    """
+    Schema of the records processed by the batch mode: text columns, aggregated columns and text lengths.
+    """
+    return RecordSchema(TEXT_COLUMNS + list(AGGREGATIONS) + [feature + '_length' for feature in TEXT_COLUMNS])
+
+
+def _near_dedup(df: pd.DataFrame,
+                threshold: float,
+                artefacts_path: str,
+                report: RunReport,
+                checkpoints: Optional[CheckpointStore] = None,
+                parent_key: Optional[str] = None) -> Tuple[pd.DataFrame, Optional[str]]:
+    """
+    Merge the near-duplicated records and save the cluster membership in near_duplicates.csv.
+    Parameters
+    ----------
+    df:
+        Preprocessed dataset with exact duplicates combined.
+    threshold:
+        The Jaccard similarity threshold.
+    artefacts_path:
+        Output path where to store output artefacts.
+    report:
+        The run report where stage metrics are recorded.
+    checkpoints:
+        If set, load the merged dataset stored by a previous run, or save it.
+    parent_key:
+        Checkpoint key of df.
+    Returns
+    -------
+        The merged dataset and its checkpoint key (None if checkpoints are disabled).
+    """
+    key = None
+    if parent_key is not None:
+        # version 2: records are only merged into a similar representative, similar pairs are not chained
+        key = stage_key('near_dedup', parent_key, {'threshold': threshold,
+                                                   'MINHASH_PERMUTATIONS': MINHASH_PERMUTATIONS,
+                                                   'MINHASH_SHINGLE_SIZE': MINHASH_SHINGLE_SIZE,
+                                                   'ORDER_KEY': ORDER_KEY},
+                        version=2)
+    checkpoint = _load_checkpoint(checkpoints, report, 'near_dedup', key)
+    if checkpoint is not None:
+        df, membership = checkpoint
+    else:
+        logger.info(f'Merge near-duplicated records, Jaccard similarity threshold: {threshold}')
+        with report.stage('near_dedup') as stage:
+            stage.n_records = len(df)
+            deduplicator = NearDeduplicator(columns=TEXT_COLUMNS,
+                                            aggregations=AGGREGATIONS,
+                                            threshold=threshold,
+                                            num_perm=MINHASH_PERMUTATIONS,
+                                            shingle_size=MINHASH_SHINGLE_SIZE,
+                                            order_key=ORDER_KEY)
+            n_records = len(df)
+            df, membership = deduplicator.deduplicate(df)
+            stage.details['merged_records'] = n_records - len(df)
+            stage.details['clusters'] = int(membership[CLUSTER].nunique())
+        _save_checkpoint(checkpoints, 'near_dedup', key, (df, membership))
+    membership.to_csv(os.path.join(artefacts_path, 'near_duplicates.csv'), index=False)
+    logger.info(f'New dataset contains {len(df)} records')
+    return df, key
+
+
+def _get_clean_key(checkpoints: Optional[CheckpointStore], input_fpath: str) -> Optional[str]:
+    """
+    Key of the cleaned dataset: input file hash and cleaning params. None if checkpoints are disabled.
+    """
+    if checkpoints is None:
+        return None
+    return stage_key('clean', checkpoints.input_key(input_fpath),
+                     {'TEXT_COLUMNS': TEXT_COLUMNS, 'ENABLE_LEMMATISATION': ENABLE_LEMMATISATION})
 
+
+def _get_dedup_key(checkpoints: Optional[CheckpointStore], input_fpath: str) -> Optional[str]:
+    """
+    Key of the deduplicated dataset, the same in every mode. None if checkpoints are disabled.
+    """
+    if checkpoints is None:
+        return None
+    return stage_key('dedup', _get_clean_key(checkpoints, input_fpath), {'AGGREGATIONS': AGGREGATIONS})
+
+
+def _load_checkpoint(checkpoints: Optional[CheckpointStore], report: RunReport, stage: str, key: str) -> Any:
+    """
+    Load the result of a stage saved by a previous run.
+    Returns
+    -------
+        The result, or None if checkpoints are disabled or the stage has to be computed.
+    """
+    if checkpoints is None or not checkpoints.has(stage, key):
+        return None
+    with report.stage(f'{stage}_checkpoint'):
+        return checkpoints.load(stage, key)
+
+
+def _save_checkpoint(checkpoints: Optional[CheckpointStore], stage: str, key: str, result: Any) -> None:
+    """
+    Save the result of a stage if checkpoints are enabled.
+    """
+    if checkpoints is not None:
+        checkpoints.save(stage, key, result)
+
+
+def _save_table(word_frequency: WordFrequency, artefacts_path: str) -> None:
+    """
+    Save the lookup table in the format configured by TABLE_FORMAT in params.py.
+    Parameters
+    ----------
+    word_frequency:
+        A word frequency object with a complete lookup table.
+    artefacts_path:
+        Output path where to store output artefacts.
+    """
+    if TABLE_FORMAT == 'compact':
+        word_frequency.save_table(fpath=os.path.join(artefacts_path, 'table.bin'), compact=True)
+    else:
+        word_frequency.save_table(fpath=os.path.join(artefacts_path, 'table.pkl'))
+
+
+def _write_output(df: Union[pd.DataFrame, Iterable[pd.DataFrame]], name: str, artefacts_path: str,
+                  sparse: bool = False) -> None:
+    """
+    Write an output table in every format of OUTPUT_FORMATS, OUTPUT_CHUNK_SIZE rows at a time.
+    Parameters
+    ----------
+    df:
+        The output table, indexed by petition_id, or its chunks which are written as soon as they are produced.
+    name:
+        Name of the output, e.g. 'output1'.
+    artefacts_path:
+        Output path where to store output artefacts.
+    sparse:
+        If true, also save the non-zero entries of the table.
+    """
+    sink = OutputSink(artefacts_path, name, formats=OUTPUT_FORMATS, sparse=sparse)
+    if isinstance(df, pd.DataFrame):
+        sink.write_all(df, chunk_size=OUTPUT_CHUNK_SIZE)
+    else:
+        sink.write_chunks(df)
+    logger.info(f'Save {name} to {", ".join(sink.fpaths)}')
+
+
+def _get_target_words(word_frequency: WordFrequency) -> List[str]:
+    """
+    Get the top_k most common words with the filters configured in params.py.
+    Parameters
+    ----------
+    word_frequency:
+        A word frequency object with a complete lookup table.
+    Returns
+    -------
+        A list of the top k most common words sorted in descending order.
+    """
     logger.info(f'Get top {TOP_K} common words.')
     logger.info(f'Ignore stopping words: {IGNORE_STOPPING_WORDS}')
-    target_words = word_frequency.get_top_k(top_k=TOP_K,
-                                            min_letters=MIN_LETTERS,
-                                            ignore_stopping_words=IGNORE_STOPPING_WORDS)
-    output2_df = df.swifter.apply(WordCount.get_target_count,
-                                  columns=TEXT_COLUMNS,
-                                  target_words=target_words,
-                                  axis=1)
-    output_fpath = os.path.join(artefacts_path, 'output2.csv')
-    output2_df.to_csv(output_fpath)
-    logger.info(f'Save output2 to {output_fpath}')
+    extra_stopwords = load_stopwords(EXTRA_STOPWORDS_FPATH) if EXTRA_STOPWORDS_FPATH is not None else ()
+    return word_frequency.get_top_k(top_k=TOP_K,
+                                    min_letters=MIN_LETTERS,
+                                    ignore_stopping_words=IGNORE_STOPPING_WORDS,
+                                    languages=STOPWORD_LANGUAGES,
+                                    extra_stopwords=extra_stopwords)
+
+
+def _run_sweep(configs: List[Dict],
+               corpus: TokenizedCorpus,
+               word_frequency: WordFrequency,
+               index: pd.Index,
+               artefacts_path: str,
+               report: RunReport,
+               submit: Callable,
+               rows: Optional[np.ndarray] = None) -> None:
+    """
+    Write the output2 of every sweep configuration, selected from one ranking of the lookup table and counted in
+    one pass over the tokenized corpus. sweep.json maps the output names to their configuration and target words.
+    Parameters
+    ----------
+    configs:
+        Configurations with the keys top_k, min_letters and ignore_stopping_words.
+    corpus:
+        The tokenized corpus of the run.
+    word_frequency:
+        A word frequency object with a complete lookup table.
+    index:
+        The petition_id index of the ranked documents.
+    artefacts_path:
+        Output path where to store output artefacts.
+    report:
+        The run report where stage metrics are recorded.
+    submit:
+        Called with a write function and its arguments.
+    rows:
+        The corpus documents of the ranked petitions, in petition_id order. Defaults to all the documents in
+        corpus order.
+    """
+    logger.info(f'Sweep {len(configs)} top_k configurations...')
+    extra_stopwords = load_stopwords(EXTRA_STOPWORDS_FPATH) if EXTRA_STOPWORDS_FPATH is not None else ()
+    with report.stage('sweep_top_k') as stage:
+        sweep = Sweep(word_frequency.get_table(), languages=STOPWORD_LANGUAGES, extra_stopwords=extra_stopwords)
+        target_words = sweep.get_target_words(configs)
+        stage.details['n_configs'] = len(configs)
+    with report.stage('sweep_target_counts') as stage:
+        stage.n_records = len(index)
+        outputs = sweep.get_target_counts(corpus.matrix, target_words, index=index, rows=rows)
+        stage.details['n_target_words'] = len({word for words in target_words.values() for word in words})
+    with report.stage('write_sweep') as stage:
+        stage.n_records = len(index) * len(outputs)
+        for name, output2_df in outputs.items():
+            submit(_write_output, output2_df, f'output2_{name}', artefacts_path,
+                   sparse=SPARSE_OUTPUT2)
+        manifest = {f'output2_{config_name(config)}': {'config': config,
+                                                       'target_words': target_words[config_name(config)]}
+                    for config in configs}
+        with open(os.path.join(artefacts_path, 'sweep.json'), 'w') as raw:
+            json.dump(manifest, raw, indent=2)
+
+
+def _save_token_store(df: pd.DataFrame, order: np.ndarray, token_store_path: str, report: RunReport,
+                      submit: Callable = None) -> None:
+    """
+    Encode the ranked corpus and save it as a token store.
+    Parameters
+    ----------
+    df:
+        The deduplicated dataset.
+    order:
+        The positions in df of the ranked records, in petition_id order. df is read in this order, not reordered.
+    token_store_path:
+        The directory where to save the token store.
+    report:
+        The run report where stage metrics are recorded.
+    submit:
+        If set, called with the save function and its arguments.
+    """
+    with report.stage('token_store') as stage:
+        stage.n_records = len(order)
+        texts = [df[feature].to_numpy() for feature in TEXT_COLUMNS]
+        store = TokenStore.build((tuple(column[position] for column in texts) for position in order.tolist()),
+                                 TEXT_COLUMNS, values={ORDER_KEY: df[ORDER_KEY].to_numpy()[order]})
+        stage.details['n_tokens'] = len(store.tokens)
+        stage.details['vocabulary_size'] = len(store.vocabulary)
+        if submit is not None:
+            submit(store.save, token_store_path)
+        else:
+            store.save(token_store_path)
+
+
+def _save_lemma_cache(lemma_cache: LemmaCache, lemma_cache_fpath: str) -> None:
+    """
+    Log the lemma cache statistics and save the cache if requested.
+    Parameters
+    ----------
+    lemma_cache:
+        The lemma cache used for cleaning, with the lemmas of the cleaning worker processes merged in.
+    lemma_cache_fpath:
+        The path where to save the cache. If None, the cache is not saved.
+    """
+    if not ENABLE_LEMMATISATION:
+        return
+    logger.info(f'Lemma cache statistics: {lemma_cache.get_stats()}')
+    if lemma_cache_fpath is not None:
+        lemma_cache.save(lemma_cache_fpath)
+
+
+def _load_streaming(input_fpath: str,
+                    chunk_size: int,
+                    n_workers: int = 1,
+                    clean_chunk_size: int = 1000,
+                    lemma_cache_fpath: str = None,
+                    report: RunReport = None,
+                    pipeline: bool = False,
+                    queue_size: int = 4) -> pd.DataFrame:
+    """
+    Stream the raw data, preprocess it and combine records with same text information chunk by chunk.
+    Only the cleaned unique texts and their number of signatures are kept in memory.
+    Parameters
+    ----------
+    input_fpath:
+        Input file path (JSON array or JSON lines).
+    chunk_size:
+        Number of records per chunk.
+    n_workers:
+        Number of cleaning worker processes.
+    clean_chunk_size:
+        Number of strings sent to a cleaning worker at a time.
+    lemma_cache_fpath:
+        If set, warm the lemma cache from this file when it exists and save the cache back after cleaning.
+    report:
+        The run report where stage metrics are recorded.
+    pipeline:
+        If true, read and parse the input in a background thread and clean the next chunks in the worker processes
+        while the current chunk is combined.
+    queue_size:
+        Maximum number of chunks read ahead, and of chunks being cleaned, in pipeline mode.
+    Returns
+    -------
+        Preprocessed dataset with duplicated records combined, in the same order as a groupby on TEXT_COLUMNS.
+    """
+    logger.info(f'Stream raw data from {input_fpath} in chunks of {chunk_size} records.')
+    logger.info(f'Enable lemmatisation: {ENABLE_LEMMATISATION}')
+    report = report or RunReport()
+    deduplicator = Deduplicator(columns=TEXT_COLUMNS, aggregations=AGGREGATIONS)
+    # reading, cleaning and combining are interleaved chunk by chunk, so they are measured as one stage
+    with report.stage('load_clean_dedup') as stage:
+        stage.n_records = 0
+        with ParallelTextPreprocessing(n_workers=n_workers,
+                                       chunk_size=clean_chunk_size,
+                                       enable_lemmatisation=ENABLE_LEMMATISATION,
+                                       lemma_cache_fpath=lemma_cache_fpath) as text_preprocessor:
+            chunks = iter_records(input_fpath, chunk_size=chunk_size, columns=TEXT_COLUMNS)
+            if pipeline:
+                chunks = ThreadedIterator(chunks, maxsize=queue_size, name='reader')
+            # chunks sent to the cleaning workers and not combined yet, in order
+            pending_chunks = deque()
+
+            def get_texts():
+                for chunk in chunks:
+                    pending_chunks.append(chunk)
+                    yield [record[feature] for feature in TEXT_COLUMNS for record in chunk]
+
+            if pipeline:
+                cleaned_chunks = text_preprocessor.imap_texts(get_texts(), max_pending=queue_size)
+            else:
+                cleaned_chunks = (text_preprocessor.transform_texts(texts) for texts in get_texts())
+            combine_time = 0.0
+            for texts in cleaned_chunks:
+                start = time.perf_counter()
+                chunk = pending_chunks.popleft()
+                chunk_df = pd.DataFrame({feature: texts[i * len(chunk):(i + 1) * len(chunk)]
+                                         for i, feature in enumerate(TEXT_COLUMNS)})
+                for column in AGGREGATIONS:
+                    chunk_df[column] = [record[column] for record in chunk]
+                deduplicator.add(chunk_df)
+                stage.n_records += len(chunk)
+                combine_time += time.perf_counter() - start
+            _save_lemma_cache(text_preprocessor.get_lemma_cache(), lemma_cache_fpath)
+        df = deduplicator.get_result()
+        stage.details['combine_time_s'] = combine_time
+        if pipeline:
+            stage.details['read_time_s'] = chunks.busy_time
+    logger.info(f'Raw dataset contains {stage.n_records} records.')
+    logger.info(f'New dataset contains {len(df)} records')
+    return df
+
+
+def _run_incremental(input_fpath: str,
+                     artefacts_path: str,
+                     state_path: str,
+                     chunk_size: int,
+                     n_workers: int = 1,
+                     clean_chunk_size: int = 1000,
+                     lemma_cache_fpath: str = None,
+                     report: RunReport = None,
+                     sweep: List[Dict] = None,
+                     token_store_path: str = None,
+                     near_dedup_threshold: float = None,
+                     top_n: int = None) -> None:
+    """
+    Apply a delta file to the persisted incremental state and rewrite all artefacts.
+    Parameters
+    ----------
+    input_fpath:
+        Delta file path (JSON array or JSON lines). Known records get their numberOfSignatures replaced.
+    artefacts_path:
+        Output path where to store output artefacts.
+    state_path:
+        The path of the incremental state.
+    chunk_size:
+        Number of records per chunk.
+    n_workers:
+        Number of cleaning worker processes.
+    clean_chunk_size:
+        Number of strings sent to a cleaning worker at a time.
+    lemma_cache_fpath:
+        If set, warm the lemma cache from this file when it exists and save the cache back after cleaning.
+    report:
+        The run report where stage metrics are recorded.
+    sweep:
+        If set, also write the output2 of every configuration of this list.
+    token_store_path:
+        If set, save the corpus as a token store in this directory.
+    near_dedup_threshold:
+        If set, merge the near-duplicated records with this Jaccard similarity threshold. The state keeps the
+        records unmerged.
+    top_n:
+        If set, only rank and output the top_n most signed petitions.
+    """
+    report = report or RunReport()
+    logger.info(f'Enable lemmatisation: {ENABLE_LEMMATISATION}')
+    with report.stage('load_state'):
+        state = IncrementalState.load(state_path, columns=TEXT_COLUMNS, order_key=ORDER_KEY,
+                                      enable_lemmatisation=ENABLE_LEMMATISATION)
+    state.start_run()
+    n_new = n_updated = 0
+    with report.stage('apply_delta') as stage:
+        stage.n_records = 0
+        with ParallelTextPreprocessing(n_workers=n_workers,
+                                       chunk_size=clean_chunk_size,
+                                       enable_lemmatisation=ENABLE_LEMMATISATION,
+                                       lemma_cache_fpath=lemma_cache_fpath) as text_preprocessor:
+            for chunk in iter_records(input_fpath, chunk_size=chunk_size, columns=TEXT_COLUMNS):
+                new, updated = state.update(chunk, text_preprocessor)
+                n_new += new
+                n_updated += updated
+                stage.n_records += len(chunk)
+            _save_lemma_cache(text_preprocessor.get_lemma_cache(), lemma_cache_fpath)
+    logger.info(f'Apply delta from {input_fpath}: {n_new} new records, {n_updated} updated records.')
+
+    with report.stage('dedup'):
+        df = state.to_dataframe()
+    logger.info(f'New dataset contains {len(df)} records')
+    word_frequency = state.word_frequency
+    if near_dedup_threshold is not None:
+        df, _ = _near_dedup(df, near_dedup_threshold, artefacts_path, report)
+        # the state table also counts the merged records, rebuild it from the merged dataset
+        word_frequency = None
+    _run_single_pass(df, artefacts_path, word_frequency=word_frequency, report=report, sweep=sweep,
+                     token_store_path=token_store_path, top_n=top_n)
+    with report.stage('save_state'):
+        state.save(state_path)
+
+
+def _run_single_pass(df: pd.DataFrame,
+                     artefacts_path: str,
+                     word_frequency: WordFrequency = None,
+                     report: RunReport = None,
+                     checkpoints: Optional[CheckpointStore] = None,
+                     parent_key: Optional[str] = None,
+                     writer: Optional[BackgroundWriter] = None,
+                     sweep: List[Dict] = None,
+                     token_store_path: str = None,
+                     top_n: int = None,
+                     approximate_top_k_capacity: int = None) -> None:
+    """
+    Tokenize-once variant of the counting stages of run_etl. Produces the same artefacts.
+    Parameters
+    ----------
+    df:
+        Preprocessed dataset with duplicated records combined.
+    artefacts_path:
+        Output path where to store output artefacts.
+    word_frequency:
+        A lookup table already built for df. If None, it is built from the tokens.
+    report:
+        The run report where stage metrics are recorded.
+    checkpoints:
+        If set, load the ranked and tokenized records stored by a previous run, or save them.
+    parent_key:
+        Checkpoint key of df.
+    writer:
+        If set, the artefacts are written by this background writer while the next ones are computed. The write
+        stages then only measure the time to queue the write.
+    sweep:
+        If set, also write the output2 of every configuration of this list.
+    token_store_path:
+        If set, save the ranked corpus as a token store in this directory.
+    top_n:
+        If set, only rank and output the top_n most signed petitions: only they are tokenized, and the lookup
+        table is counted from all the records.
+    approximate_top_k_capacity:
+        If set (and word_frequency is None), count the lookup table with a SpaceSavingFrequency of this capacity.
+    """
+    report = report or RunReport()
+    submit = writer.submit if writer is not None else (lambda func, *args, **kwargs: func(*args, **kwargs))
+    # version 2: the ranked positions and the corpus in deduplicated order (or of the top_n rows), df not reordered
+    tokenize_key = stage_key('tokenize', parent_key, {'ORDER_KEY': ORDER_KEY, 'PRIMARY_KEY': PRIMARY_KEY,
+                                                      'top_n': top_n, 'stable_rank': RANK_MEMORY_BUDGET is not None,
+                                                      'approximate_top_k_capacity': approximate_top_k_capacity},
+                             version=2)
+    checkpoint = _load_checkpoint(checkpoints, report, 'tokenize', tokenize_key)
+    if checkpoint is not None:
+        order, corpus, table = checkpoint
+    else:
+        with report.stage('rank') as stage:
+            stage.n_records = len(df)
+            order = _rank(df, top_n, stage)
+
+        logger.info('Tokenize records once for word counts and lookup table...')
+        with report.stage('tokenize') as stage:
+            # with top_n only the ranked records are tokenized, in petition_id order
+            ranked = df if top_n is None else df.iloc[order]
+            stage.n_records = len(ranked)
+            table = None
+            if word_frequency is None:
+                table = (SpaceSavingFrequency(capacity=approximate_top_k_capacity)
+                         if approximate_top_k_capacity is not None else WordFrequency())
+            corpus = TokenizedCorpus(columns=TEXT_COLUMNS, build_table=table is not None and top_n is None,
+                                     word_frequency=table)
+            corpus.add_dataframe(ranked)
+        if table is not None and top_n is not None:
+            with report.stage('frequency') as stage:
+                # the lookup table still covers all the records
+                stage.n_records = len(df)
+                for texts in zip(*(df[feature] for feature in TEXT_COLUMNS)):
+                    table.update(Counter(' '.join(texts).split()))
+        _save_checkpoint(checkpoints, 'tokenize', tokenize_key, (order, corpus, table))
+    n_ranked = len(order)
+    index = pd.RangeIndex(n_ranked, name=PRIMARY_KEY)
+    # the corpus documents of the ranked records, in petition_id order
+    rows = order if top_n is None else np.arange(n_ranked)
+    if token_store_path is not None:
+        _save_token_store(df, order, token_store_path, report, submit)
+
+    with report.stage('write_output1') as stage:
+        stage.n_records = n_ranked
+        output1_df = pd.DataFrame({column: np.asarray(lengths)[rows] for column, lengths in
+                                   corpus.get_lengths().items()}, index=index)
+        output1_df[ORDER_KEY] = df[ORDER_KEY].to_numpy()[order]
+        submit(_write_output, output1_df, 'output1', artefacts_path)
+
+    logger.info('Saving word frequency lookup table')
+    word_frequency = word_frequency if word_frequency is not None else table
+    with report.stage('save_table'):
+        submit(_save_table, word_frequency, artefacts_path)
+
+    with report.stage('top_k') as stage:
+        target_words = _get_target_words(word_frequency)
+        if isinstance(word_frequency, SpaceSavingFrequency):
+            stage.details['error_bound'] = word_frequency.get_error_bound()
+    with report.stage('target_counts') as stage:
+        stage.n_records = n_ranked
+        output2_df = corpus.get_target_counts(target_words, index=index, rows=rows)
+    with report.stage('write_output2') as stage:
+        stage.n_records = len(output2_df)
+        submit(_write_output, output2_df, 'output2', artefacts_path, sparse=SPARSE_OUTPUT2)
+    if sweep:
+        _run_sweep(sweep, corpus, word_frequency, index, artefacts_path, report, submit, rows=rows)
+    if writer is not None:
+        with report.stage('wait_writes') as stage:
+            writer.close()
+            stage.details['write_time_s'] = writer.busy_time
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('--input_fpath', required=True, default=None, type=str, help='Input file path.')
     parser.add_argument('--artefacts_path', required=True, default=None, type=str, help='Output path to store artefacts.')
+    parser.add_argument('--single_pass', action='store_true', help='Tokenize each record only once.')
+    parser.add_argument('--streaming', action='store_true', help='Read the input incrementally in chunks.')
+    parser.add_argument('--chunk_size', default=10000, type=int, help='Number of records per chunk.')
+    parser.add_argument('--n_workers', default=None, type=int, help='Number of text cleaning worker processes.')
+    parser.add_argument('--clean_chunk_size', default=1000, type=int, help='Number of strings per cleaning task.')
+    parser.add_argument('--lemma_cache_fpath', default=None, type=str, help='Path to load/save the lemma cache.')
+    parser.add_argument('--nltk_data_path', default=None, type=str, help='Local directory containing NLTK data.')
+    parser.add_argument('--state_path', default=None, type=str, help='Incremental state file, input is a delta.')
+    parser.add_argument('--profile', default=None, choices=['cprofile', 'pyinstrument'], help='Profile every stage.')
+    parser.add_argument('--checkpoint_path', default=None, type=str, help='Directory of the stage checkpoints.')
+    parser.add_argument('--pipeline', action='store_true', help='Overlap reading, cleaning and writing.')
+    parser.add_argument('--queue_size', default=4, type=int, help='Maximum number of chunks between stages.')
+    parser.add_argument('--sweep', default=None, nargs='+', type=str,
+                        help="Top_k configurations, e.g. 'top_k=20|50,min_letters=3|5,ignore_stopping_words=true'.")
+    parser.add_argument('--token_store_path', default=None, type=str, help='Directory to save the token store.')
+    parser.add_argument('--near_dedup_threshold', default=None, type=float,
+                        help='Merge near-duplicated records above this Jaccard similarity.')
+    parser.add_argument('--top_n', default=None, type=int, help='Only rank and output the top_n petitions.')
+    parser.add_argument('--approximate_top_k_capacity', default=None, type=int,
+                        help='Count the lookup table of the streaming modes with this many Space-Saving counters.')
     args = parser.parse_args()
     input_fpath = args.input_fpath
     artefacts_path = args.artefacts_path
     run_etl(input_fpath=input_fpath,
-            artefacts_path=artefacts_path)
+            artefacts_path=artefacts_path,
+            single_pass=args.single_pass,
+            streaming=args.streaming,
+            chunk_size=args.chunk_size,
+            n_workers=args.n_workers,
+            clean_chunk_size=args.clean_chunk_size,
+            lemma_cache_fpath=args.lemma_cache_fpath,
+            nltk_data_path=args.nltk_data_path,
+            state_path=args.state_path,
+            profile=args.profile,
+            checkpoint_path=args.checkpoint_path,
+            pipeline=args.pipeline,
+            queue_size=args.queue_size,
+            sweep=parse_configs(args.sweep) if args.sweep else None,
+            token_store_path=args.token_store_path,
+            near_dedup_threshold=args.near_dedup_threshold,
+            top_n=args.top_n,
+            approximate_top_k_capacity=args.approximate_top_k_capacity)
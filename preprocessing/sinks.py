@@ -0,0 +1,241 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+OUTPUT_FORMATS = ('csv', 'parquet', 'feather')
+# dtype of every integer column of the columnar formats, fixed so the schema does not depend on the data
+INTEGER_DTYPE = 'uint32'
+
+
+def cast_integers(df: pd.DataFrame, dtype: str = INTEGER_DTYPE) -> pd.DataFrame:
+    """
+    Store every integer column in the same integer dtype, whatever its values.
+    Parameters
+    ----------
+    df:
+        A dataframe.
+    dtype:
+        The integer dtype, e.g. 'uint32'.
+    Returns
+    -------
+        A dataframe with the same values.
+    """
+    info = np.iinfo(dtype)
+    res = df.copy()
+    for column in res.columns:
+        if pd.api.types.is_integer_dtype(res[column]) and not isinstance(res[column].dtype, pd.CategoricalDtype):
+            if len(res) and (res[column].min() < info.min or res[column].max() > info.max):
+                logger.error(f'Column {column} does not fit in {dtype}')
+                raise ValueError(f'Column {column} does not fit in {dtype}')
+            res[column] = res[column].astype(dtype)
+    return res
+
+
+def to_sparse(df: pd.DataFrame, word_label: str = 'word', count_label: str = 'count') -> pd.DataFrame:
+    """
+    Convert a wide count table (one row per record, one column per word) to its non-zero entries.
+    Parameters
+    ----------
+    df:
+        A wide dataframe of integer counts, e.g. output2.
+    word_label:
+        Name of the word column.
+    count_label:
+        Name of the count column.
+    Returns
+    -------
+        A long dataframe with the index of df, a word column and a count column, ordered like the wide table.
+    """
+    values = df.to_numpy()
+    rows, columns = np.nonzero(values)
+    res = pd.DataFrame({word_label: pd.Categorical.from_codes(columns, categories=df.columns),
+                        count_label: values[rows, columns]},
+                       index=df.index[rows])
+    return res
+
+
+class TableWriter(ABC):
+    extension = None
+
+    def __init__(self, fpath: str):
+        """
+        Write a table chunk by chunk. Use as a context manager; the file is complete when the writer is closed.
+        Parameters
+        ----------
+        fpath:
+            Output file path.
+        """
+        self.fpath = fpath
+
+    @abstractmethod
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a chunk of rows. Every chunk must have the same columns and index name.
+        """
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CsvWriter(TableWriter):
+    extension = 'csv'
+
+    def __init__(self, fpath: str):
+        """
+        Stream a table to CSV, each chunk is written as soon as it is added. The result is identical to
+        DataFrame.to_csv on the whole table.
+        """
+        super().__init__(fpath)
+        self.header = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        df.to_csv(self.fpath, mode='w' if self.header else 'a', header=self.header)
+        self.header = False
+
+    def close(self) -> None:
+        if self.header:
+            logger.warning(f'No rows written to {self.fpath}')
+
+
+class ColumnarWriter(TableWriter):
+    def __init__(self, fpath: str):
+        """
+        Stream a table to a columnar format, each chunk is written as soon as it is added. The index is stored as
+        a regular column and every integer column as INTEGER_DTYPE; the schema is taken from the first chunk.
+        """
+        super().__init__(fpath)
+        self.schema = None
+        self.writer = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        df = cast_integers(df.reset_index())
+        if self.writer is None:
+            self.schema = pa.Schema.from_pandas(df, preserve_index=False)
+            self.writer = self._open(self.schema)
+        self.writer.write_table(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    @abstractmethod
+    def _open(self, schema: Any) -> Any:
+        """
+        Open the file writer of the format, it has write_table and close methods.
+        """
+
+    def close(self) -> None:
+        if self.writer is None:
+            logger.warning(f'No rows written to {self.fpath}')
+            return
+        self.writer.close()
+        self.writer = None
+
+
+class ParquetWriter(ColumnarWriter):
+    extension = 'parquet'
+
+    def _open(self, schema: Any) -> Any:
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(self.fpath, schema)
+
+
+class FeatherWriter(ColumnarWriter):
+    extension = 'feather'
+
+    def _open(self, schema: Any) -> Any:
+        # Feather V2 is the Arrow IPC file format
+        import pyarrow.ipc as ipc
+
+        return ipc.new_file(self.fpath, schema)
+
+
+WRITERS = {writer.extension: writer for writer in [CsvWriter, ParquetWriter, FeatherWriter]}
+
+
+def check_output_formats(formats: List[str]) -> None:
+    """
+    Fail early if an output format is unknown or its optional dependency (pyarrow) is missing.
+    """
+    for output_format in formats:
+        if output_format not in OUTPUT_FORMATS:
+            logger.error(f'output format must be one of {OUTPUT_FORMATS}')
+            raise ValueError(f'output format must be one of {OUTPUT_FORMATS}')
+        if output_format != 'csv':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError(f'pyarrow is not installed, run `pip install pyarrow` to write {output_format} files')
+
+
+class OutputSink:
+    def __init__(self, artefacts_path: str, name: str, formats: List[str] = ('csv',), sparse: bool = False):
+        """
+        Write one output table (e.g. output2) in several formats at once, chunk by chunk.
+        Parameters
+        ----------
+        artefacts_path:
+            Output path where to store output artefacts.
+        name:
+            Name of the output, e.g. 'output2' is saved as output2.csv, output2.parquet ...
+        formats:
+            Output formats, see OUTPUT_FORMATS. 'csv' keeps the original layout.
+        sparse:
+            If true, also save the non-zero entries of the table (record, word, count) as <name>_sparse.
+            Only meaningful for wide count tables such as output2.
+        """
+        check_output_formats(formats)
+        self.writers = [WRITERS[output_format](os.path.join(artefacts_path, f'{name}.{output_format}'))
+                        for output_format in formats]
+        self.sparse_writers = [WRITERS[output_format](os.path.join(artefacts_path, f'{name}_sparse.{output_format}'))
+                               for output_format in formats] if sparse else []
+
+    @property
+    def fpaths(self) -> List[str]:
+        return [writer.fpath for writer in self.writers + self.sparse_writers]
+
+    def write(self, df: pd.DataFrame) -> None:
+        """
+        Append a chunk of rows to every output file.
+        """
+        for writer in self.writers:
+            writer.write(df)
+        if self.sparse_writers:
+            sparse_df = to_sparse(df)
+            for writer in self.sparse_writers:
+                writer.write(sparse_df)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> None:
+        """
+        Write every chunk as soon as it is produced, e.g. by a generator counting records, then close the sink.
+        """
+        with self:
+            for chunk in chunks:
+                self.write(chunk)
+
+    def write_all(self, df: pd.DataFrame, chunk_size: Optional[int] = None) -> None:
+        """
+        Write a whole table in chunks of chunk_size rows, then close the sink.
+        """
+        chunk_size = chunk_size or max(len(df), 1)
+        self.write_chunks(df.iloc[start:start + chunk_size] for start in range(0, max(len(df), 1), chunk_size))
+
+    def close(self) -> None:
+        for writer in self.writers + self.sparse_writers:
+            writer.close()
+
+    def __enter__(self) -> 'OutputSink':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
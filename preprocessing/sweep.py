@@ -0,0 +1,142 @@
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+from preprocessing.document_term import DocumentTermMatrix
+from preprocessing.frequency_table import CompactTable
+from preprocessing.params import TOP_K, MIN_LETTERS, IGNORE_STOPPING_WORDS
+from preprocessing.word_filter import WordFilter
+
+logger = logging.getLogger(__name__)
+
+SWEEP_KEYS = ('top_k', 'min_letters', 'ignore_stopping_words')
+
+
+def _parse_value(key: str, value: str):
+    if key == 'ignore_stopping_words':
+        if value.lower() not in ('true', 'false'):
+            logger.error(f'{key} must be true or false, got {value!r}')
+            raise ValueError(f'{key} must be true or false, got {value!r}')
+        return value.lower() == 'true'
+    return int(value)
+
+
+def parse_configs(specs: Iterable[str]) -> List[Dict]:
+    """
+    Parse sweep configurations, e.g. from the command line. Alternatives separated by '|' are expanded to all their
+    combinations, so 'top_k=20|50,min_letters=3|5' gives 4 configurations. Missing keys take the params.py value.
+    Parameters
+    ----------
+    specs:
+        Configurations like 'top_k=20,min_letters=5,ignore_stopping_words=false'.
+    Returns
+    -------
+        A list of distinct configurations, dictionaries with the keys of SWEEP_KEYS.
+    """
+    configs = []
+    for spec in specs:
+        options = {'top_k': [TOP_K], 'min_letters': [MIN_LETTERS], 'ignore_stopping_words': [IGNORE_STOPPING_WORDS]}
+        for item in filter(None, spec.split(',')):
+            key, _, values = item.partition('=')
+            key = key.strip()
+            if key not in SWEEP_KEYS:
+                logger.error(f'Unknown sweep key {key!r}, use one of {SWEEP_KEYS}')
+                raise ValueError(f'Unknown sweep key {key!r}, use one of {SWEEP_KEYS}')
+            options[key] = [_parse_value(key, value.strip()) for value in values.split('|')]
+        for values in itertools.product(*options.values()):
+            config = dict(zip(options, values))
+            if config not in configs:
+                configs.append(config)
+    return configs
+
+
+def config_name(config: Mapping) -> str:
+    """
+    Name of a configuration, e.g. 'top20_min5_nostop' (stopwords ignored) or 'top20_min5_stop' (stopwords kept).
+    """
+    stopwords = 'nostop' if config['ignore_stopping_words'] else 'stop'
+    return f"top{config['top_k']}_min{config['min_letters']}_{stopwords}"
+
+
+class Sweep:
+    def __init__(self, table: Mapping[str, int], languages: Sequence[str] = ('english',),
+                 extra_stopwords: Iterable[str] = ()):
+        """
+        Compute the top_k selections and the target counts (output2) of many configurations from one lookup table
+        and one tokenized corpus. The words are ranked by count once (see CompactTable.get_ranking) and all
+        configurations are selected in a single scan of this ranking; the union of their target words is then
+        counted in one pass over the document-term matrix.
+        Parameters
+        ----------
+        table:
+            The lookup table, a dictionary of word counts or a CompactTable.
+        languages:
+            NLTK stopword languages of the configurations ignoring stopwords.
+        extra_stopwords:
+            Custom or domain stopwords, always ignored.
+        """
+        self.table = table if isinstance(table, CompactTable) else CompactTable.from_dict(table)
+        self.languages = tuple(languages)
+        self.extra_stopwords = tuple(extra_stopwords)
+
+    def get_target_words(self, configs: List[Dict]) -> Dict[str, List[str]]:
+        """
+        Get the top k most common words of every configuration, the same as WordFrequency.get_top_k.
+        Parameters
+        ----------
+        configs:
+            Configurations with the keys of SWEEP_KEYS, see parse_configs.
+        Returns
+        -------
+            The target words of every configuration, by configuration name.
+        """
+        if any(config['top_k'] < 0 or config['min_letters'] < 0 for config in configs):
+            logger.error('top_k and min_letters must be positive integers')
+            raise ValueError('top_k and min_letters must be positive integers')
+        filters = [WordFilter.build(min_letters=config['min_letters'],
+                                    ignore_stopping_words=config['ignore_stopping_words'],
+                                    languages=self.languages,
+                                    extra_stopwords=self.extra_stopwords) for config in configs]
+        selections = [[] for _ in configs]
+        pending = [i for i, config in enumerate(configs) if config['top_k'] > 0]
+        if pending:
+            min_letters = min(config['min_letters'] for config in configs)
+            for word_id in self.table.get_ranking(min_letters):
+                word = self.table.get_word(word_id)
+                full = False
+                for i in pending:
+                    if word in filters[i]:
+                        selections[i].append(word)
+                        full = full or len(selections[i]) >= configs[i]['top_k']
+                if full:
+                    pending = [i for i in pending if len(selections[i]) < configs[i]['top_k']]
+                    if not pending:
+                        break
+        return {config_name(config): words for config, words in zip(configs, selections)}
+
+    @staticmethod
+    def get_target_counts(matrix: DocumentTermMatrix, target_words: Dict[str, List[str]],
+                          index: Iterable = None, rows: Optional[np.ndarray] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Count the target words of every configuration in every document.
+        Parameters
+        ----------
+        matrix:
+            The document-term matrix of the corpus.
+        target_words:
+            The target words of every configuration, by configuration name, see get_target_words.
+        index:
+            Optional index of the returned dataframes (e.g. petition_id).
+        rows:
+            If set, only count the target words of these documents, in this order.
+        Returns
+        -------
+            The output2 dataframe of every configuration, by configuration name.
+        """
+        vocabulary = list(dict.fromkeys(word for words in target_words.values() for word in words))
+        logger.info(f'Count {len(vocabulary)} target words of {len(target_words)} configurations in one pass.')
+        counts = matrix.get_counts(vocabulary, rows=rows)
+        columns = {word: column for column, word in enumerate(vocabulary)}
+        return {name: pd.DataFrame(counts[:, [columns[word] for word in words]], columns=words, index=index)
+                for name, words in target_words.items()}
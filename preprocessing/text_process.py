@@ -1,16 +1,190 @@
 import pandas as pd
 import re
-from nltk.stem import WordNetLemmatizer
-from typing import Union, List, Dict
+import os
+import json
+import logging
+import multiprocessing
+from collections import OrderedDict, deque
+from preprocessing import resources
+from preprocessing.records import Record
+from typing import Union, List, Dict, Optional, Iterable, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+# use '[^a-z ]' if treat numbers as invalid words
+PUNCTUATION_PATTERN = re.compile(r'[^a-z0-9 ]')
+# runs of 2+ spaces only, replacing single spaces by themselves is wasted work on long strings
+WHITESPACE_PATTERN = re.compile('  +')
+# Separates the texts of a batch once they are joined into a single string. PUNCTUATION_PATTERN would remove it,
+# so the batch pattern keeps it.
+BATCH_SEPARATOR = '\x00'
+BATCH_PUNCTUATION_PATTERN = re.compile(r'[^a-z0-9 \x00]')
+
+
+class LemmaCache:
+    def __init__(self, lemmatizer=None, max_size: int = 100000):
+        """
+        A bounded LRU cache in front of a lemmatizer. Word frequencies are heavily skewed, so most lookups are hits.
+        Parameters
+        ----------
+        lemmatizer:
+            The lemmatizer used on cache misses. If None, a WordNet lemmatizer is created on the first miss, so
+            nltk is not loaded at all when lemmatisation is disabled.
+        max_size:
+            Maximum number of cached words. The least recently used word is evicted first.
+        """
+        if max_size is None or max_size <= 0:
+            raise ValueError('max_size must be a positive integer')
+        self._lemmatizer = lemmatizer
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # if a dict, the lemmas of the misses are also recorded here, see pop_new_lemmas
+        self.new_lemmas = None
+
+    @property
+    def lemmatizer(self):
+        if self._lemmatizer is None:
+            self._lemmatizer = resources.get_lemmatizer()
+        return self._lemmatizer
+
+    @lemmatizer.setter
+    def lemmatizer(self, lemmatizer) -> None:
+        self._lemmatizer = lemmatizer
+
+    def lemmatize(self, word: str) -> str:
+        """
+        Return the base form of a word, using the cache when possible.
+        Parameters
+        ----------
+        word:
+            A single word.
+        Returns
+        -------
+            The lemma of the word.
+        """
+        lemma = self.cache.get(word)
+        if lemma is not None:
+            self.hits += 1
+            self.cache.move_to_end(word)
+            return lemma
+
+        self.misses += 1
+        lemma = self.lemmatizer.lemmatize(word)
+        self.cache[word] = lemma
+        if self.new_lemmas is not None:
+            self.new_lemmas[word] = lemma
+        if len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return lemma
+
+    def pop_new_lemmas(self) -> Dict[str, str]:
+        """
+        Return the recorded lemmas (see new_lemmas) and start recording again, e.g. to send the lemmas of a worker
+        process back to the main process.
+        Returns
+        -------
+            A mapping of word to lemma of the misses since the previous call.
+        """
+        new_lemmas, self.new_lemmas = self.new_lemmas or {}, {}
+        return new_lemmas
+
+    def merge(self, lemmas: Dict[str, str], hits: int = 0, misses: int = 0) -> None:
+        """
+        Add lemmas looked up by another cache, e.g. in a worker process, and its statistics.
+        Parameters
+        ----------
+        lemmas:
+            A mapping of word to lemma.
+        hits:
+            Number of hits of the other cache to add.
+        misses:
+            Number of misses of the other cache to add.
+        """
+        for word, lemma in lemmas.items():
+            self.cache[word] = lemma
+            self.cache.move_to_end(word)
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        self.hits += hits
+        self.misses += misses
+
+    def lemmatize_vocabulary(self, words: Iterable[str]) -> Dict[str, str]:
+        """
+        Lemmatize every unique word once.
+        Parameters
+        ----------
+        words:
+            Words, possibly with repetitions.
+        Returns
+        -------
+            A mapping of word to lemma for the unique words.
+        """
+        return {word: self.lemmatize(word) for word in set(words)}
+
+    def get_stats(self) -> Dict[str, Union[int, float]]:
+        """
+        Return the cache statistics.
+        Returns
+        -------
+            Number of hits, misses, cached words and the hit rate.
+        """
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.cache),
+                'hit_rate': self.hits / total if total else 0.0}
+
+    def save(self, fpath: str) -> None:
+        """
+        Save the cached lemmas, so that later runs can start warm.
+        Parameters
+        ----------
+        fpath:
+            The path where to save the cache (JSON).
+        """
+        logger.info(f'Save lemma cache ({len(self.cache)} words) to {fpath}')
+        with open(fpath, 'w', encoding='utf-8') as raw:
+            json.dump(self.cache, raw)
+
+    def load(self, fpath: str) -> None:
+        """
+        Warm the cache from a file written by save. Statistics are not changed.
+        Parameters
+        ----------
+        fpath:
+            The path where to load the cache from.
+        """
+        logger.info(f'Load lemma cache from {fpath}')
+        with open(fpath, 'r', encoding='utf-8') as raw:
+            self.cache.update(json.load(raw))
+        while len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
 
 
 class TextPreprocessing:
-    def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
+    def __init__(self, lemma_cache_size: int = 100000, lemma_cache_fpath: Optional[str] = None):
+        """
+        Parameters
+        ----------
+        lemma_cache_size:
+            Maximum number of words kept in the lemma cache.
+        lemma_cache_fpath:
+            If set and the file exists, warm the lemma cache from it.
+        """
+        self.lemma_cache = LemmaCache(max_size=lemma_cache_size)
+        if lemma_cache_fpath is not None and os.path.exists(lemma_cache_fpath):
+            self.lemma_cache.load(lemma_cache_fpath)
+
+    @property
+    def lemmatizer(self):
+        # Created lazily, see LemmaCache.
+        return self.lemma_cache.lemmatizer
 
-    def extract_text(self, record: Union[Dict, pd.Series],
+    def extract_text(self, record: Union[Dict, pd.Series, Record],
                      columns: List[str],
-                     enable_lemmatisation=False) -> Union[Dict, pd.Series]:
+                     enable_lemmatisation=False) -> Union[Dict, pd.Series, Record]:
         """
         Extract texts from nested data structure which simplifies the downstream processing (e.g. remove duplicated
         records).
@@ -64,16 +238,251 @@ class TextPreprocessing:
         """
         # this usually helps avoid duplicates
         text = text.lower()
-        # use '[^a-z ]' if treat numbers as invalid words
-        text = re.sub(r'[^a-z0-9 ]', '', text)  # remove punctuation
-        text = re.sub(' +', ' ', text)  # remove multiple white spaces
+        text = PUNCTUATION_PATTERN.sub('', text)  # remove punctuation
+        text = WHITESPACE_PATTERN.sub(' ', text)  # remove multiple white spaces
         text = text.strip()  # remove leading and trailing spaces
 
         if enable_lemmatisation:
             word_list = []
             for word in text.split():
-                word = self.lemmatizer.lemmatize(word)
+                word = self.lemma_cache.lemmatize(word)
                 word_list.append(word)
             text = ' '.join(word_list)
 
         return text
+
+    def transform_batch(self, texts: List[str], enable_lemmatisation=False) -> List[str]:
+        """
+        Apply transform to a list of strings in bulk. The texts are joined into a single string, so lowering and
+        both regular expressions run once per batch instead of once per text. The result is identical to transform.
+        Parameters
+        ----------
+        texts:
+            A list of strings.
+        enable_lemmatisation:
+            If true, apply lemmatisation (see lemmatize_batch).
+        Returns
+        -------
+            A list of preprocessed strings, in the same order.
+        """
+        if len(texts) == 0:
+            return []
+        text = BATCH_SEPARATOR.join(texts)
+        if text.count(BATCH_SEPARATOR) != len(texts) - 1:
+            # The separator occurs in the input itself, fall back to one text at a time.
+            texts = [self.transform(text) for text in texts]
+        else:
+            text = text.lower()
+            text = BATCH_PUNCTUATION_PATTERN.sub('', text)
+            text = WHITESPACE_PATTERN.sub(' ', text)
+            # strip every text: at most one space is left on each side of a separator
+            text = text.replace(' ' + BATCH_SEPARATOR, BATCH_SEPARATOR).replace(BATCH_SEPARATOR + ' ', BATCH_SEPARATOR)
+            texts = text.strip(' ').split(BATCH_SEPARATOR)
+
+        if enable_lemmatisation:
+            texts = self.lemmatize_batch(texts)
+        return texts
+
+    def transform_series(self, series: pd.Series, enable_lemmatisation=False) -> pd.Series:
+        """
+        Apply transform to a whole column.
+        Parameters
+        ----------
+        series:
+            A series of strings.
+        enable_lemmatisation:
+            If true, apply lemmatisation before word counting.
+        Returns
+        -------
+            A series of preprocessed strings with the same index and name.
+        """
+        return pd.Series(self.transform_batch(series.tolist(), enable_lemmatisation=enable_lemmatisation),
+                         index=series.index, name=series.name, dtype=object)
+
+    def lemmatize_batch(self, texts: List[str]) -> List[str]:
+        """
+        Lemmatize a batch of preprocessed strings. The unique vocabulary of the batch is lemmatized once and mapped
+        back, which gives the same result as transform with enable_lemmatisation=True.
+        Parameters
+        ----------
+        texts:
+            A list of strings already preprocessed by transform without lemmatisation.
+        Returns
+        -------
+            A list of lemmatized strings, in the same order.
+        """
+        tokens = [text.split() for text in texts]
+        lemmas = self.lemma_cache.lemmatize_vocabulary(word for words in tokens for word in words)
+        return [' '.join(lemmas[word] for word in words) for words in tokens]
+
+
+# The text preprocessor of a worker process, initialised once per worker by _init_worker.
+_worker_preprocessor = None
+
+
+def _init_worker(lemma_cache_fpath: Optional[str] = None) -> None:
+    global _worker_preprocessor
+    _worker_preprocessor = TextPreprocessing(lemma_cache_fpath=lemma_cache_fpath)
+    _worker_preprocessor.lemma_cache.new_lemmas = {}
+
+
+def _transform_batch(texts: List[str], enable_lemmatisation: bool) -> Tuple[List[str], Dict[str, str], int, int]:
+    # the new lemmas and the statistics of the batch are merged into the lemma cache of the main process
+    lemma_cache = _worker_preprocessor.lemma_cache
+    hits, misses = lemma_cache.hits, lemma_cache.misses
+    texts = _worker_preprocessor.transform_batch(texts, enable_lemmatisation=enable_lemmatisation)
+    return texts, lemma_cache.pop_new_lemmas(), lemma_cache.hits - hits, lemma_cache.misses - misses
+
+
+class ParallelTextPreprocessing:
+    def __init__(self, n_workers: Optional[int] = None, chunk_size: int = 1000, enable_lemmatisation=False,
+                 lemma_cache_fpath: Optional[str] = None):
+        """
+        Clean column-wise batches of strings with a pool of worker processes. Each worker initialises its own
+        lemmatizer once. Batches are returned in submission order, so the output is identical to the serial path,
+        with the lemmas looked up by the worker, which are merged into the lemma cache of the current process.
+        Use it as a context manager to start and stop the worker processes.
+        Parameters
+        ----------
+        n_workers:
+            Number of worker processes. If None, use the number of CPUs. If 1, clean in the current process.
+        chunk_size:
+            Number of strings sent to a worker at a time.
+        enable_lemmatisation:
+            If true, apply lemmatisation before word counting.
+        lemma_cache_fpath:
+            If set and the file exists, warm the lemma cache of every worker (and of the current process) from it.
+        """
+        if (n_workers is not None and n_workers <= 0) or chunk_size is None or chunk_size <= 0:
+            raise ValueError('n_workers and chunk_size must be positive integers')
+        self.n_workers = n_workers or multiprocessing.cpu_count()
+        self.chunk_size = chunk_size
+        self.enable_lemmatisation = enable_lemmatisation
+        self.lemma_cache_fpath = lemma_cache_fpath
+        self.pool = None
+        self.text_preprocessor = None
+
+    def __enter__(self) -> 'ParallelTextPreprocessing':
+        # cleans in the current process with a single worker, else only holds the merged lemma cache
+        self.text_preprocessor = TextPreprocessing(lemma_cache_fpath=self.lemma_cache_fpath)
+        if self.n_workers > 1:
+            self.pool = multiprocessing.Pool(self.n_workers, initializer=_init_worker,
+                                             initargs=(self.lemma_cache_fpath,))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def get_lemma_cache(self) -> Optional[LemmaCache]:
+        """
+        Return the lemma cache of the current process, with the lemmas and statistics of the workers merged in.
+        Returns
+        -------
+            The lemma cache, or None outside of the context manager.
+        """
+        return self.text_preprocessor.lemma_cache if self.text_preprocessor is not None else None
+
+    def _merge_batch(self, result: Tuple[List[str], Dict[str, str], int, int]) -> List[str]:
+        # merge the lemmas of a batch cleaned by a worker, see _transform_batch
+        texts, lemmas, hits, misses = result
+        self.text_preprocessor.lemma_cache.merge(lemmas, hits=hits, misses=misses)
+        return texts
+
+    def transform_texts(self, texts: List[str]) -> List[str]:
+        """
+        Apply TextPreprocessing.transform to a list of strings.
+        Parameters
+        ----------
+        texts:
+            A list of strings.
+        Returns
+        -------
+            A list of preprocessed strings, in the same order.
+        """
+        if self.pool is None and self.text_preprocessor is None:
+            raise RuntimeError('ParallelTextPreprocessing must be used as a context manager')
+        if self.pool is None:
+            return [text for i in range(0, len(texts), self.chunk_size)
+                    for text in self.text_preprocessor.transform_batch(texts[i:i + self.chunk_size],
+                                                                       enable_lemmatisation=self.enable_lemmatisation)]
+
+        batches = [(texts[i:i + self.chunk_size], self.enable_lemmatisation)
+                   for i in range(0, len(texts), self.chunk_size)]
+        res = []
+        for result in self.pool.starmap(_transform_batch, batches, chunksize=1):
+            res.extend(self._merge_batch(result))
+        return res
+
+    def imap_texts(self, batches: Iterable[List[str]], max_pending: Optional[int] = None) -> Iterator[List[str]]:
+        """
+        Lazily clean a stream of lists of strings, e.g. the text columns of the chunks of a streamed input.
+        Up to max_pending lists are cleaned by the workers while the caller consumes the previous results, and no
+        more lists are pulled from batches until the oldest one is done (backpressure).
+        Parameters
+        ----------
+        batches:
+            An iterable of lists of strings.
+        max_pending:
+            Maximum number of lists being cleaned at a time. Defaults to twice the number of workers.
+        Returns
+        -------
+            An iterator of lists of preprocessed strings, in the same order as batches.
+        """
+        if self.pool is None:
+            for texts in batches:
+                yield self.transform_texts(texts)
+            return
+        max_pending = max_pending or 2 * self.n_workers
+        pending = deque()
+        for texts in batches:
+            pending.append([self.pool.apply_async(_transform_batch,
+                                                  (texts[i:i + self.chunk_size], self.enable_lemmatisation))
+                            for i in range(0, len(texts), self.chunk_size)])
+            while len(pending) >= max_pending:
+                yield [text for result in pending.popleft() for text in self._merge_batch(result.get())]
+        while pending:
+            yield [text for result in pending.popleft() for text in self._merge_batch(result.get())]
+
+    def extract_text(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        """
+        Column-wise equivalent of TextPreprocessing.extract_text for a whole dataframe.
+        Parameters
+        ----------
+        df:
+            A dataframe whose selected columns contain nested data structures.
+        columns:
+            A list of column names which contain nested data structures.
+        Returns
+        -------
+            A new dataframe without nested data structure.
+        """
+        df = df.copy()
+        texts = []
+        for feature in columns:
+            texts.extend(value['_value'] for value in df[feature])
+        texts = self.transform_texts(texts)
+        for i, feature in enumerate(columns):
+            df[feature] = texts[i * len(df):(i + 1) * len(df)]
+        return df
+
+    def extract_records(self, records: List[Record], columns: List[str]) -> List[Record]:
+        """
+        Column-wise equivalent of TextPreprocessing.extract_text for a list of records, updated in place.
+        Parameters
+        ----------
+        records:
+            Records whose selected fields contain nested data structures.
+        columns:
+            A list of field names which contain nested data structures.
+        Returns
+        -------
+            The same records without nested data structure.
+        """
+        for feature in columns:
+            texts = self.transform_texts([record[feature]['_value'] for record in records])
+            for record, text in zip(records, texts):
+                record[feature] = text
+        return records
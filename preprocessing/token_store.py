@@ -0,0 +1,269 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import numpy as np
+import pandas as pd
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+from preprocessing.frequency_table import CompactTable
+
+logger = logging.getLogger(__name__)
+
+VERSION = 1
+META = 'meta.json'
+VOCABULARY = 'vocabulary.bin'
+TOKENS = 'tokens.npy'
+OFFSETS = 'offsets.npy'
+
+
+class TokenStore:
+    def __init__(self, vocabulary: CompactTable, tokens: np.ndarray, offsets: np.ndarray, columns: Sequence[str],
+                 values: Optional[Mapping[str, np.ndarray]] = None):
+        """
+        The cleaned corpus encoded as integer tokens, stored in flat arrays which can be memory-mapped, so lengths,
+        word frequencies and target counts are computed with NumPy without parsing, cleaning or splitting texts.
+        The text of column c of document d is tokens[offsets[d * n_columns + c]:offsets[d * n_columns + c + 1]].
+        Parameters
+        ----------
+        vocabulary:
+            The sorted vocabulary with the corpus word counts, the id of a word is its position.
+        tokens:
+            uint32 array of the word ids of all texts, document by document and column by column.
+        offsets:
+            int64 array of n_documents * n_columns + 1 offsets of the texts in tokens.
+        columns:
+            Names of the text columns.
+        values:
+            Optional per-document numeric columns, e.g. numberOfSignatures.
+        """
+        self.vocabulary = vocabulary
+        self.tokens = tokens
+        self.offsets = offsets
+        self.columns = list(columns)
+        self.values = dict(values or {})
+
+    @classmethod
+    def build(cls, documents: Iterable[Sequence[str]], columns: Sequence[str],
+              values: Optional[Mapping[str, Iterable]] = None) -> 'TokenStore':
+        """
+        Encode preprocessed texts.
+        Parameters
+        ----------
+        documents:
+            The texts of every document, one preprocessed string per column in the order of columns.
+        columns:
+            Names of the text columns.
+        values:
+            Optional per-document numeric columns, e.g. numberOfSignatures.
+        Returns
+        -------
+            A token store, documents keep their order.
+        """
+        ids = {}
+        tokens = array('I')
+        offsets = array('q', [0])
+        for texts in documents:
+            for text in texts:
+                # ids in order of first occurrence, remapped to sorted ids below
+                tokens.extend([ids.setdefault(token, len(ids)) for token in text.split()])
+                offsets.append(len(tokens))
+        words = list(ids)
+        order = sorted(range(len(words)), key=words.__getitem__)
+        remap = np.empty(len(words), dtype=np.uint32)
+        remap[order] = np.arange(len(words), dtype=np.uint32)
+        tokens = remap[np.frombuffer(tokens, dtype=np.uint32)] if len(tokens) else np.zeros(0, dtype=np.uint32)
+        counts = np.bincount(tokens, minlength=len(words))
+        vocabulary = CompactTable.from_dict(dict(zip([words[i] for i in order], counts.tolist())))
+        values = {name: np.asarray(list(value), dtype=np.int64) for name, value in (values or {}).items()}
+        return cls(vocabulary, tokens, np.frombuffer(offsets, dtype=np.int64).copy(), columns, values)
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: Sequence[str],
+                       value_columns: Sequence[str] = ()) -> 'TokenStore':
+        """
+        Encode the preprocessed text columns of a dataframe, read column by column.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the selected text columns.
+        columns:
+            Names of the text columns.
+        value_columns:
+            Numeric columns stored with the tokens, e.g. numberOfSignatures.
+        Returns
+        -------
+            A token store with one document per row.
+        """
+        return cls.build(zip(*(df[feature].tolist() for feature in columns)), columns,
+                         values={name: df[name].tolist() for name in value_columns})
+
+    @property
+    def n_documents(self) -> int:
+        return (len(self.offsets) - 1) // len(self.columns)
+
+    def _text_lengths(self) -> np.ndarray:
+        return np.diff(self.offsets).reshape(self.n_documents, len(self.columns))
+
+    def _token_documents(self) -> np.ndarray:
+        # document of every token
+        return np.repeat(np.arange(self.n_documents), self._text_lengths().sum(axis=1))
+
+    def _token_mask(self, columns: Optional[Sequence[str]]) -> Optional[np.ndarray]:
+        # tokens of the selected columns, None for all columns
+        if columns is None or list(columns) == self.columns:
+            return None
+        unknown = [feature for feature in columns if feature not in self.columns]
+        if unknown:
+            logger.error(f'Unknown columns {unknown}, use some of {self.columns}')
+            raise ValueError(f'Unknown columns {unknown}, use some of {self.columns}')
+        selected = np.isin(np.arange(len(self.columns)), [self.columns.index(feature) for feature in columns])
+        return np.repeat(np.tile(selected, self.n_documents), np.diff(self.offsets))
+
+    def get_tokens(self, document: int, column: str) -> List[str]:
+        """
+        Decode the tokens of one text.
+        """
+        position = document * len(self.columns) + self.columns.index(column)
+        word_ids = self.tokens[int(self.offsets[position]):int(self.offsets[position + 1])]
+        return [self.vocabulary.get_word(word_id) for word_id in word_ids]
+
+    def get_lengths(self) -> Dict[str, np.ndarray]:
+        """
+        Return the word counts (lengths) of each column, keyed by '<column>_length', like TokenizedCorpus.get_lengths
+        (an empty text counts as 1).
+        """
+        lengths = np.maximum(self._text_lengths(), 1)
+        return {feature + '_length': lengths[:, i] for i, feature in enumerate(self.columns)}
+
+    def get_word_frequency(self, columns: Optional[Sequence[str]] = None) -> CompactTable:
+        """
+        Count the words of the corpus.
+        Parameters
+        ----------
+        columns:
+            Count only the words of these columns, all columns by default.
+        Returns
+        -------
+            A compact lookup table, with the words of the selected columns.
+        """
+        mask = self._token_mask(columns)
+        if mask is None:
+            return self.vocabulary
+        counts = np.bincount(self.tokens[mask], minlength=len(self.vocabulary))
+        word_ids = np.flatnonzero(counts)
+        return CompactTable.from_dict({self.vocabulary.get_word(word_id): int(counts[word_id])
+                                       for word_id in word_ids})
+
+    def get_counts(self, target_words: List[str], columns: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Count target words in every document.
+        Parameters
+        ----------
+        target_words:
+            A list of interested words.
+        columns:
+            Count only in these columns, all columns by default.
+        Returns
+        -------
+            An int64 array of shape (n_documents, len(target_words)).
+        """
+        # column of each word id in the result, -1 if the word is not a target
+        target_columns = np.full(len(self.vocabulary), -1, dtype=np.int64)
+        for i, word in enumerate(target_words):
+            word_id = self.vocabulary.get_id(word)
+            if word_id >= 0:
+                target_columns[word_id] = i
+        selected = target_columns[self.tokens]
+        mask = selected >= 0
+        token_mask = self._token_mask(columns)
+        if token_mask is not None:
+            mask &= token_mask
+        cells = self._token_documents()[mask] * len(target_words) + selected[mask]
+        counts = np.bincount(cells, minlength=self.n_documents * len(target_words))
+        return counts.astype(np.int64).reshape(self.n_documents, len(target_words))
+
+    def get_target_counts(self, target_words: List[str], index: Iterable = None) -> pd.DataFrame:
+        """
+        Count target words in every document, like TokenizedCorpus.get_target_counts.
+        Parameters
+        ----------
+        target_words:
+            A list of interested words.
+        index:
+            Optional index of the returned dataframe (e.g. petition_id).
+        Returns
+        -------
+            A dataframe with one row per document and one column per target word.
+        """
+        return pd.DataFrame(self.get_counts(target_words), columns=target_words, index=index)
+
+    def save(self, path: str) -> None:
+        """
+        Save the store in a directory: meta.json, the vocabulary (a compact lookup table), tokens.npy, offsets.npy
+        and one .npy file per value column. The store is written in a new directory next to path, which then
+        replaces path: an interrupted save leaves the previous store (or none), never a mix of both, and the
+        stores memory-mapped from the previous files stay valid.
+        Parameters
+        ----------
+        path:
+            The directory where to save the store.
+        """
+        logger.info(f'Save token store of {self.n_documents} documents to {path}')
+        path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = tempfile.mkdtemp(prefix=f'.{os.path.basename(path)}-', dir=os.path.dirname(path))
+        try:
+            os.chmod(tmp_path, 0o755)
+            self.vocabulary.save(os.path.join(tmp_path, VOCABULARY))
+            np.save(os.path.join(tmp_path, TOKENS), np.ascontiguousarray(self.tokens, dtype='<u4'))
+            np.save(os.path.join(tmp_path, OFFSETS), np.ascontiguousarray(self.offsets, dtype='<i8'))
+            for name, value in self.values.items():
+                np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(value, dtype='<i8'))
+            # written last, a store without meta.json is incomplete
+            with open(os.path.join(tmp_path, META), 'w') as raw:
+                json.dump({'version': VERSION, 'columns': self.columns, 'values': list(self.values),
+                           'n_documents': self.n_documents, 'n_tokens': len(self.tokens)}, raw, indent=2)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        old_path = None
+        if os.path.exists(path):
+            old_path = tmp_path + '.old'
+            os.rename(path, old_path)
+        os.rename(tmp_path, path)
+        if old_path is not None:
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> 'TokenStore':
+        """
+        Load a store written by save.
+        Parameters
+        ----------
+        path:
+            The directory where to load the store from.
+        mmap:
+            If true, memory-map the arrays instead of reading them.
+        Returns
+        -------
+            A token store.
+        """
+        meta_fpath = os.path.join(path, META)
+        meta = {}
+        if os.path.exists(meta_fpath):
+            with open(meta_fpath) as raw:
+                meta = json.load(raw)
+        if meta.get('version') != VERSION:
+            logger.error(f'{path} is not a token store of version {VERSION}')
+            raise ValueError(f'{path} is not a token store of version {VERSION}')
+        logger.info(f'Load token store of {meta["n_documents"]} documents from {path}')
+        vocabulary = CompactTable.load(os.path.join(path, VOCABULARY), mmap=mmap)
+        # empty arrays cannot be memory-mapped
+        tokens = np.load(os.path.join(path, TOKENS), mmap_mode='r' if mmap and meta['n_tokens'] else None)
+        offsets = np.load(os.path.join(path, OFFSETS), mmap_mode='r' if mmap else None)
+        values = {name: np.load(os.path.join(path, f'{name}.npy'),
+                                mmap_mode='r' if mmap and meta['n_documents'] else None)
+                  for name in meta['values']}
+        return cls(vocabulary, tokens, offsets, meta['columns'], values)
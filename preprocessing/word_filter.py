@@ -0,0 +1,84 @@
+import logging
+import functools
+from preprocessing import resources
+from typing import Iterable, Sequence, FrozenSet, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def get_stopwords(languages: Tuple[str, ...] = ('english',)) -> FrozenSet[str]:
+    """
+    Load the NLTK stopword lists once per set of languages.
+    Parameters
+    ----------
+    languages:
+        A tuple of NLTK stopword languages, e.g. ('english', 'french').
+    Returns
+    -------
+        A frozen set of stopwords.
+    """
+    return frozenset(word for language in languages for word in resources.get_stopwords(language))
+
+
+def load_stopwords(fpath: str) -> FrozenSet[str]:
+    """
+    Load a custom (e.g. domain specific) stopword list, one word per line. Empty lines and lines starting with '#'
+    are ignored.
+    Parameters
+    ----------
+    fpath:
+        The path of the stopword list.
+    Returns
+    -------
+        A frozen set of stopwords.
+    """
+    with open(fpath, 'r', encoding='utf-8') as raw:
+        return frozenset(line.strip() for line in raw if line.strip() and not line.startswith('#'))
+
+
+class WordFilter:
+    def __init__(self, min_letters: int = 5, stop_words: Iterable[str] = ()):
+        """
+        A reusable filter for candidate words, built once and applied to a whole vocabulary.
+        Parameters
+        ----------
+        min_letters:
+            A threshold. Ignore words with number of letters smaller than min_letters.
+        stop_words:
+            Words to ignore.
+        """
+        self.min_letters = min_letters
+        self.stop_words = frozenset(stop_words)
+
+    @classmethod
+    def build(cls, min_letters: int = 5,
+              ignore_stopping_words: bool = False,
+              languages: Sequence[str] = ('english',),
+              extra_stopwords: Iterable[str] = ()) -> 'WordFilter':
+        """
+        Build a filter from the NLTK stopword lists and custom stopwords.
+        Parameters
+        ----------
+        min_letters:
+            A threshold. Ignore words with number of letters smaller than min_letters.
+        ignore_stopping_words:
+            If true, ignore the NLTK stopwords of the given languages.
+        languages:
+            NLTK stopword languages.
+        extra_stopwords:
+            Custom or domain stopwords, always ignored.
+        Returns
+        -------
+            A word filter.
+        """
+        stop_words = frozenset(extra_stopwords)
+        if ignore_stopping_words:
+            stop_words = stop_words | get_stopwords(tuple(languages))
+        return cls(min_letters=min_letters, stop_words=stop_words)
+
+    def __contains__(self, word: str) -> bool:
+        """
+        Return true if the word passes the filter.
+        """
+        return len(word) >= self.min_letters and word not in self.stop_words
@@ -1,19 +1,22 @@
+import numpy as np
 import pandas as pd
 import heapq
 import pickle
-import nltk
 import logging
-from nltk.corpus import stopwords
-from typing import Union, List, Dict
+from preprocessing.frequency_table import CompactTable, is_compact_table
+from preprocessing.document_term import DocumentTermMatrix
+from preprocessing.records import Record
+from preprocessing.word_filter import WordFilter
+from typing import Union, List, Dict, Iterable, Mapping, Optional, Sequence
 from collections import defaultdict, Counter
-nltk.download('stopwords')
 
 logger = logging.getLogger(__name__)
 
 
 class WordCount:
     @classmethod
-    def get_word_counts(cls, record: Union[Dict, pd.Series], columns: List[str]) -> Union[Dict, pd.Series]:
+    def get_word_counts(cls, record: Union[Dict, pd.Series, Record],
+                        columns: List[str]) -> Union[Dict, pd.Series, Record]:
         """
         Count words in the selected text objects.
         Parameters
@@ -46,7 +49,8 @@ class WordCount:
         return len(text.split(' '))
 
     @staticmethod
-    def get_target_count(record: Union[Dict, pd.Series], columns: List[str], target_words: List[str]) -> pd.Series:
+    def get_target_count(record: Union[Dict, pd.Series, Record], columns: List[str],
+                         target_words: List[str]) -> Union[pd.Series, Dict[str, int]]:
         """
         Count target words in the selected columns.
         Parameters
@@ -59,7 +63,8 @@ class WordCount:
             A list of interested words.
         Returns
         -------
-
+            The count of every target word, a dictionary for a Record (no pandas Series per row), a pandas Series
+            otherwise.
         """
         res = {k: 0 for k in target_words}
         for feature in columns:
@@ -67,15 +72,106 @@ class WordCount:
             for word in target_words:
                 if word in counts:
                     res[word] += counts[word]
+        if isinstance(record, Record):
+            return res
         return pd.Series(res)
 
 
+class TokenizedCorpus:
+    def __init__(self, columns: List[str], build_table: bool = True, word_frequency=None):
+        """
+        Tokenize every record exactly once and derive the text lengths, the word frequency lookup table and the
+        target word counts from the same tokens.
+        Parameters
+        ----------
+        columns:
+            A list of names of selected text objects.
+        build_table:
+            If false, do not update the lookup table (e.g. when it is maintained incrementally elsewhere).
+        word_frequency:
+            The lookup table updated with the tokens, a new WordFrequency by default. Any object with an
+            update(counts) method can be used, e.g. a SpaceSavingFrequency.
+        """
+        self.columns = columns
+        self.build_table = build_table
+        self.word_frequency = word_frequency if word_frequency is not None else WordFrequency()
+        self.lengths = {feature: [] for feature in columns}
+        # One row per record (all columns merged), which is all the top-k counting stage needs.
+        self.matrix = DocumentTermMatrix()
+
+    def add_record(self, record: Union[Dict, pd.Series, Record]) -> None:
+        """
+        Tokenize one record and update lengths, lookup table and per-record counts.
+        Parameters
+        ----------
+        record:
+            A record contains one or more preprocessed text objects.
+        """
+        self.add_texts([record[feature] for feature in self.columns])
+
+    def add_texts(self, texts: List[str]) -> None:
+        """
+        Tokenize the text objects of one record, given in the same order as columns.
+        Parameters
+        ----------
+        texts:
+            A list of preprocessed strings, one per selected column.
+        """
+        counts = Counter()
+        for feature, text in zip(self.columns, texts):
+            tokens = text.split()
+            # Preprocessed texts are single-spaced, so this equals WordCount.word_count (an empty text counts as 1).
+            self.lengths[feature].append(max(len(tokens), 1))
+            counts.update(tokens)
+        if self.build_table:
+            self.word_frequency.update(counts)
+        self.matrix.add_document(counts)
+
+    def add_dataframe(self, df: pd.DataFrame) -> None:
+        """
+        Tokenize all records of a dataframe column-wise, without building a pandas Series per row.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the selected text columns.
+        """
+        for texts in zip(*(df[feature] for feature in self.columns)):
+            self.add_texts(texts)
+
+    def get_lengths(self) -> Dict[str, List[int]]:
+        """
+        Return the word counts (lengths) of each selected column, keyed by '<column>_length'.
+        Returns
+        -------
+            A dictionary of lengths in record order.
+        """
+        return {feature + '_length': lengths for feature, lengths in self.lengths.items()}
+
+    def get_target_counts(self, target_words: List[str], index: Iterable = None,
+                          rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """
+        Count target words for every record, a column slice of the document-term matrix.
+        Parameters
+        ----------
+        target_words:
+            A list of interested words.
+        index:
+            Optional index of the returned dataframe (e.g. petition_id).
+        rows:
+            If set, only count the target words of these records, in this order.
+        Returns
+        -------
+            A dataframe with one row per (selected) record and one column per target word.
+        """
+        return self.matrix.get_target_counts(target_words, index=index, rows=rows)
+
+
 class WordFrequency:
     def __init__(self):
         # Initialize a lookup table and a lemmatizer operator
         self.table = defaultdict(int)
 
-    def get_word_frequency(self, record: Union[Dict, pd.Series], columns: List[str]) -> None:
+    def get_word_frequency(self, record: Union[Dict, pd.Series, Record], columns: List[str]) -> None:
         """
         Calculate word frequency.
         Parameters
@@ -88,32 +184,152 @@ class WordFrequency:
         -------
 
         """
+        self._ensure_mutable()
         for feature in columns:
             counts = Counter(record[feature].split())
             for word, count in counts.items():
                 self.table[word] += count
 
-    def save_table(self, fpath: str) -> None:
+    def update(self, counts: Mapping[str, int]) -> None:
+        """
+        Add pre-computed word counts to the lookup table.
+        Parameters
+        ----------
+        counts:
+            A mapping of word to count, e.g. a Counter of one record's tokens.
+        """
+        self._ensure_mutable()
+        for word, count in counts.items():
+            self.table[word] += count
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, columns: List[str]) -> 'WordFrequency':
+        """
+        Build a partial lookup table (a shard) from a chunk of records, column-wise.
+        Parameters
+        ----------
+        df:
+            A dataframe contains the selected text columns.
+        columns:
+            A list of names of selected text objects.
+        Returns
+        -------
+            A new word frequency object.
+        """
+        counts = Counter()
+        for feature in columns:
+            for text in df[feature]:
+                counts.update(text.split())
+        word_frequency = cls()
+        word_frequency.update(counts)
+        return word_frequency
+
+    @classmethod
+    def from_file(cls, fpath: str, mmap: bool = True) -> 'WordFrequency':
+        """
+        Load a (partial) lookup table saved by save_table.
+        Parameters
+        ----------
+        fpath:
+            The path where to load the lookup table.
+        mmap:
+            If true, memory-map a compact table instead of reading it.
+        Returns
+        -------
+            A new word frequency object.
+        """
+        word_frequency = cls()
+        word_frequency.load_table(fpath, mmap=mmap)
+        return word_frequency
+
+    def merge(self, other: 'WordFrequency') -> 'WordFrequency':
+        """
+        Add the counts of another (partial) lookup table to this one, in place.
+        Parameters
+        ----------
+        other:
+            Another word frequency object, e.g. built by another worker on another chunk.
+        Returns
+        -------
+            This word frequency object.
+        """
+        self.update(other.get_table())
+        return self
+
+    def __add__(self, other: 'WordFrequency') -> 'WordFrequency':
+        return WordFrequency().merge(self).merge(other)
+
+    @classmethod
+    def reduce(cls, shards: List['WordFrequency']) -> 'WordFrequency':
+        """
+        Merge partial lookup tables pairwise (a reduce tree), so that no single table absorbs every shard one
+        by one.
+        Parameters
+        ----------
+        shards:
+            A list of word frequency objects.
+        Returns
+        -------
+            A new word frequency object with the summed counts.
+        """
+        shards = list(shards)
+        if len(shards) == 0:
+            return cls()
+        while len(shards) > 1:
+            shards = [shards[i] + shards[i + 1] if i + 1 < len(shards) else shards[i]
+                      for i in range(0, len(shards), 2)]
+        return cls().merge(shards[0])
+
+    def _ensure_mutable(self) -> None:
+        # A compact table is read-only, switch back to a dictionary before counting.
+        if isinstance(self.table, CompactTable):
+            self.table = defaultdict(int, self.table.to_dict())
+
+    def to_compact(self) -> CompactTable:
+        """
+        Convert the lookup table to the compact read-only representation (see CompactTable).
+        Returns
+        -------
+            The compact table, which also becomes the lookup table.
+        """
+        if not isinstance(self.table, CompactTable):
+            self.table = CompactTable.from_dict(self.table)
+        return self.table
+
+    def save_table(self, fpath: str, compact: bool = False) -> None:
         """
         Save the lookup table. Avoid multiple calculations.
         Parameters
         ----------
         fpath:
             The path where to save the lookup table.
+        compact:
+            If true, save in the versioned binary format of CompactTable, which load_table can memory-map.
+            Otherwise, pickle the dictionary.
         """
         logger.info(f'Save lookup table to {fpath}')
+        if compact:
+            table = self.table if isinstance(self.table, CompactTable) else CompactTable.from_dict(self.table)
+            table.save(fpath)
+            return
+        table = defaultdict(int, self.table.to_dict()) if isinstance(self.table, CompactTable) else self.table
         with open(fpath, 'wb') as raw:
-            pickle.dump(self.table, raw)
+            pickle.dump(table, raw)
 
-    def load_table(self, fpath: str) -> None:
+    def load_table(self, fpath: str, mmap: bool = True) -> None:
         """
         Load the lookup table. Avoid multiple calculations.
         Parameters
         ----------
         fpath:
-            The path where to load the lookup table.
+            The path where to load the lookup table. Both pickled and compact tables are supported.
+        mmap:
+            If true, memory-map a compact table instead of reading it.
         """
         logger.info(f'Load lookup table from {fpath}')
+        if is_compact_table(fpath):
+            self.table = CompactTable.load(fpath, mmap=mmap)
+            return
         with open(fpath, 'rb') as raw:
             self.table = pickle.load(raw)
 
@@ -126,7 +342,9 @@ class WordFrequency:
         """
         return self.table
 
-    def get_top_k(self, top_k: int, min_letters=5, ignore_stopping_words: bool = False) -> List[str]:
+    def get_top_k(self, top_k: int, min_letters=5, ignore_stopping_words: bool = False,
+                  languages: Sequence[str] = ('english',),
+                  extra_stopwords: Iterable[str] = ()) -> List[str]:
         """
         Get the top k most common words.
         Parameters
@@ -138,6 +356,10 @@ class WordFrequency:
         ignore_stopping_words:
             If true, ignore some common words that are frequently used but without much specific information.
             e.g. you're, yourself, itself, having, between, don't ,etc.
+        languages:
+            NLTK stopword languages used when ignore_stopping_words is true.
+        extra_stopwords:
+            Custom or domain stopwords, always ignored.
         Returns
         -------
             A list of the top k most common words sorted in descending order.
@@ -147,25 +369,20 @@ class WordFrequency:
             logger.error('top_k and min_letters must be positive integers')
             raise ValueError('top_k and min_letters must be positive integers')
 
-        res = []
         if len(self.table) == 0:
             logger.warning('Look up table is empty, please calculate word frequency first.')
             return []
 
-        for word, count in self.table.items():
-            # If length is smaller than threshold, ignore this word
-            if len(word) < min_letters:
-                continue
-
-            # Ignore if the word is a stopword.
-            if ignore_stopping_words and (word in stopwords.words('english')):
-                continue
-
-            # Get the top_k most common words by using heap, which is faster than 'sort and select'.
-            # time complexity: O(nlogk) where n is the total word number and k is the number of required common words
-            # space complexity: O(k)
-            if len(res) < top_k:
-                heapq.heappush(res, (count, word))
-            else:
-                heapq.heappushpop(res, (count, word))
-        return [word for _, word in sorted(res, reverse=True)]
+        # Ignore words shorter than the threshold and stopwords. The stopwords are a set built once.
+        word_filter = WordFilter.build(min_letters=min_letters,
+                                       ignore_stopping_words=ignore_stopping_words,
+                                       languages=languages,
+                                       extra_stopwords=extra_stopwords)
+
+        # Get the top_k most common words by using heap, which is faster than 'sort and select'.
+        # time complexity: O(nlogk) where n is the total word number and k is the number of required common words
+        # space complexity: O(k)
+        if isinstance(self.table, CompactTable):
+            return self.table.top_k(top_k, word_filter)
+        res = heapq.nlargest(top_k, ((count, word) for word, count in self.table.items() if word in word_filter))
+        return [word for _, word in res]
@@ -0,0 +1,49 @@
+import pytest
+from benchmarks.corpus import CorpusGenerator
+from benchmarks.run import compare
+from preprocessing.text_process import TextPreprocessing
+
+
+class TestCorpusGenerator:
+    def test_layout(self):
+        records = CorpusGenerator(vocabulary_size=100, seed=1).generate(50)
+        assert len(records) == 50
+        for record in records:
+            assert set(record) == {'abstract', 'label', 'numberOfSignatures'}
+            assert isinstance(record['label']['_value'], str)
+            assert isinstance(record['abstract']['_value'], str)
+            assert record['numberOfSignatures'] >= 1
+
+    def test_deterministic(self):
+        assert CorpusGenerator(vocabulary_size=100, seed=1).generate(20) == \
+               CorpusGenerator(vocabulary_size=100, seed=1).generate(20)
+        assert CorpusGenerator(vocabulary_size=100, seed=1).generate(20) != \
+               CorpusGenerator(vocabulary_size=100, seed=2).generate(20)
+
+    def test_duplicates(self):
+        records = CorpusGenerator(vocabulary_size=1000, duplicate_rate=0.3, same_label_rate=0.2).generate(2000)
+        texts = {(record['label']['_value'], record['abstract']['_value']) for record in records}
+        labels = {record['label']['_value'] for record in records}
+        assert 0.6 * 2000 < len(texts) < 0.8 * 2000
+        assert 0.4 * 2000 < len(labels) < 0.6 * 2000
+
+    def test_zipf(self):
+        generator = CorpusGenerator(vocabulary_size=500)
+        records = generator.generate(500)
+        text_preprocessor = TextPreprocessing()
+        words = ' '.join(text_preprocessor.transform(record['abstract']['_value']) for record in records).split()
+        most_common = max(set(words), key=words.count)
+        assert most_common == generator.vocabulary[0]
+
+    def test_invalid_rates(self):
+        with pytest.raises(ValueError):
+            CorpusGenerator(duplicate_rate=0.8, same_label_rate=0.3)
+
+
+def test_compare():
+    baseline = {'results': [{'benchmark': 'transform', 'n_records': 10, 'seconds': 2.0},
+                            {'benchmark': 'get_top_k', 'n_records': 10, 'seconds': 1.0}]}
+    current = {'results': [{'benchmark': 'transform', 'n_records': 10, 'seconds': 1.0}]}
+    res = compare(baseline, current)
+    assert res['benchmark'].tolist() == ['transform']
+    assert res['speedup'].tolist() == [2.0]
@@ -0,0 +1,50 @@
+import os
+import pandas as pd
+from preprocessing.checkpoint import CheckpointStore, stage_key, file_hash
+
+
+def test_stage_key():
+    key = stage_key('clean', 'input', {'ENABLE_LEMMATISATION': True, 'TEXT_COLUMNS': ['abstract', 'label']})
+    assert key == stage_key('clean', 'input', {'TEXT_COLUMNS': ['abstract', 'label'], 'ENABLE_LEMMATISATION': True})
+    assert key != stage_key('clean', 'input', {'ENABLE_LEMMATISATION': False, 'TEXT_COLUMNS': ['abstract', 'label']})
+    assert key != stage_key('clean', 'other input', {'ENABLE_LEMMATISATION': True,
+                                                      'TEXT_COLUMNS': ['abstract', 'label']})
+    assert key != stage_key('dedup', 'input', {'ENABLE_LEMMATISATION': True, 'TEXT_COLUMNS': ['abstract', 'label']})
+    assert key != stage_key('clean', 'input', {'ENABLE_LEMMATISATION': True, 'TEXT_COLUMNS': ['abstract', 'label']},
+                            version=2)
+    assert key == stage_key('clean', 'input', {'ENABLE_LEMMATISATION': True, 'TEXT_COLUMNS': ['abstract', 'label']},
+                            version=1)
+
+
+class TestCheckpointStore:
+    def test_save_load(self, tmp_path):
+        df = pd.DataFrame({'label': ['a b', 'c'], 'numberOfSignatures': [1, 2]})
+        store = CheckpointStore(str(tmp_path))
+        assert store.load('dedup', 'key') is None
+        store.save('dedup', 'key', df)
+        assert store.has('dedup', 'key')
+        assert not store.has('clean', 'key')
+
+        # a new store reads the manifest of the previous run
+        store = CheckpointStore(str(tmp_path))
+        pd.testing.assert_frame_equal(store.load('dedup', 'key'), df)
+        assert store.load('dedup', 'other key') is None
+
+    def test_missing_file(self, tmp_path):
+        store = CheckpointStore(str(tmp_path))
+        store.save('dedup', 'key', [1, 2])
+        os.remove(os.path.join(tmp_path, 'dedup-key.pkl'))
+        assert store.load('dedup', 'key') is None
+
+    def test_input_key(self, tmp_path):
+        fpath = os.path.join(tmp_path, 'input.json')
+        with open(fpath, 'w') as raw:
+            raw.write('[{"label": "a"}]')
+        store = CheckpointStore(os.path.join(tmp_path, 'checkpoints'))
+        key = store.input_key(fpath)
+        assert key == file_hash(fpath)
+        assert CheckpointStore(os.path.join(tmp_path, 'checkpoints')).input_key(fpath) == key
+
+        with open(fpath, 'w') as raw:
+            raw.write('[{"label": "bb"}]')
+        assert store.input_key(fpath) != key
@@ -0,0 +1,69 @@
+import json
+import pytest
+from preprocessing.data_loader import flatten_record, iter_json_objects, iter_records
+
+
+RECORDS = [{'abstract': {'_value': 'this is an abstract text'},
+            'label': {'_value': 'this is a label, with [brackets] and {braces}'},
+            'numberOfSignatures': n} for n in range(5)]
+
+
+@pytest.fixture(params=['array', 'lines'])
+def input_fpath(request, tmp_path):
+    fpath = tmp_path / 'input.json'
+    if request.param == 'array':
+        fpath.write_text('\n ' + json.dumps(RECORDS, indent=2))
+    else:
+        fpath.write_text('\n'.join(json.dumps(record) for record in RECORDS) + '\n')
+    return str(fpath)
+
+
+class TestDataLoader:
+    @pytest.mark.parametrize(
+        ('record', 'columns', 'expected'),
+        [
+            ({'label': {'_value': 'a label'}, 'numberOfSignatures': 1},
+             None,
+             {'label': 'a label', 'numberOfSignatures': 1}),
+            ({'label': {'_value': 'a label'}, 'abstract': {'_value': 'an abstract'}},
+             ['label'],
+             {'label': 'a label', 'abstract': {'_value': 'an abstract'}}),
+        ]
+    )
+    def test_flatten_record(self, record, columns, expected):
+        assert flatten_record(record, columns) == expected
+
+    @pytest.mark.parametrize('block_size', [1, 7, 1 << 20])
+    def test_iter_json_objects(self, input_fpath, block_size):
+        assert list(iter_json_objects(input_fpath, block_size=block_size)) == RECORDS
+
+    @pytest.mark.parametrize(('chunk_size', 'expected'), [(2, [2, 2, 1]), (5, [5]), (10, [5])])
+    def test_iter_records(self, input_fpath, chunk_size, expected):
+        chunks = list(iter_records(input_fpath, chunk_size=chunk_size, block_size=16))
+        assert [len(chunk) for chunk in chunks] == expected
+        assert chunks[0][0] == {'abstract': 'this is an abstract text',
+                                'label': 'this is a label, with [brackets] and {braces}',
+                                'numberOfSignatures': 0}
+
+    def test_iter_records_error(self, input_fpath):
+        with pytest.raises(ValueError):
+            next(iter_records(input_fpath, chunk_size=0))
+
+    def test_truncated_array(self, tmp_path):
+        fpath = tmp_path / 'input.json'
+        fpath.write_text(json.dumps(RECORDS)[:-1])
+        with pytest.raises(ValueError):
+            list(iter_json_objects(str(fpath), block_size=8))
+
+    def test_max_record_size(self, input_fpath):
+        with pytest.raises(ValueError):
+            list(iter_json_objects(input_fpath, block_size=8, max_record_size=32))
+
+    def test_invalid_line(self, tmp_path):
+        fpath = tmp_path / 'input.json'
+        fpath.write_text(json.dumps(RECORDS[0]) + '\n{"label": \n' + json.dumps(RECORDS[1]) * 1000)
+        records = iter_json_objects(str(fpath), block_size=8, max_record_size=1024)
+        assert next(records) == RECORDS[0]
+        # the line is complete, nothing more is read
+        with pytest.raises(json.JSONDecodeError):
+            next(records)
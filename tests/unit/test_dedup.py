@@ -0,0 +1,53 @@
+import pytest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from preprocessing.dedup import Deduplicator, fingerprint
+
+
+class TestDeduplicator:
+    @pytest.fixture(autouse=True)
+    def initialise_records(self):
+        self.df = pd.DataFrame({'abstract': ['ban x now', 'more money', 'ban x now', 'ban x now', 'more money'],
+                                'label': ['ban x', 'fund schools', 'ban x', 'ban y', 'fund schools'],
+                                'numberOfSignatures': [10, 7, 5, 1, 2],
+                                'rank': [3, 1, 2, 9, 4]})
+        self.columns = ['abstract', 'label']
+
+    def test_fingerprint(self):
+        keys = fingerprint(self.df, self.columns)
+        assert keys.dtypes.astype(str).tolist() == ['uint64', 'uint64']
+        assert keys.iloc[0].tolist() == keys.iloc[2].tolist()
+        assert (keys.iloc[0] != keys.iloc[3]).all()
+        # the two halves are independent hashes
+        assert (keys.iloc[:, 0] != keys.iloc[:, 1]).all()
+
+    def test_fingerprint_missing(self):
+        df = pd.DataFrame({'abstract': ['ban x now', None, float('nan'), 'ban x now'],
+                           'label': ['ban x', 'ban x', 'ban x', None]})
+        keys = fingerprint(df, self.columns)
+        # missing texts have the same fingerprint, different from any text
+        assert keys.iloc[1].tolist() == keys.iloc[2].tolist()
+        assert len(keys.drop_duplicates()) == 3
+
+    @pytest.mark.parametrize('aggregations', [{'numberOfSignatures': 'sum'},
+                                              {'numberOfSignatures': 'sum', 'rank': 'min'}])
+    def test_matches_groupby(self, aggregations):
+        deduplicator = Deduplicator(self.columns, aggregations)
+        deduplicator.add(self.df)
+        expected = self.df.groupby(self.columns).agg(aggregations).reset_index()
+        assert_frame_equal(deduplicator.get_result(), expected)
+
+    @pytest.mark.parametrize('compact_size', [0, 100])
+    def test_chunks_and_merge(self, compact_size):
+        aggregations = {'numberOfSignatures': 'sum'}
+        left = Deduplicator(self.columns, aggregations, compact_size=compact_size)
+        right = Deduplicator(self.columns, aggregations, compact_size=compact_size)
+        left.add(self.df.iloc[:2])
+        left.add(self.df.iloc[2:3])
+        right.add(self.df.iloc[3:])
+        expected = self.df.groupby(self.columns).agg(aggregations).reset_index()
+        assert_frame_equal(left.merge(right).get_result(), expected)
+
+    def test_empty(self):
+        deduplicator = Deduplicator(self.columns, {'numberOfSignatures': 'sum'})
+        assert list(deduplicator.get_result().columns) == ['abstract', 'label', 'numberOfSignatures']
@@ -0,0 +1,46 @@
+import pytest
+import numpy as np
+from collections import Counter
+from preprocessing.document_term import DocumentTermMatrix
+
+
+class TestDocumentTermMatrix:
+    @pytest.fixture(autouse=True)
+    def initialise_matrix(self):
+        self.documents = ['government government come people law', '', 'law news law']
+        self.matrix = DocumentTermMatrix()
+        for document in self.documents:
+            self.matrix.add_document(Counter(document.split()))
+
+    @pytest.mark.parametrize('target_words', [['law', 'government'], ['missing', 'law'], []])
+    def test_get_counts(self, target_words):
+        expected = [[Counter(document.split())[word] for word in target_words] for document in self.documents]
+        assert self.matrix.get_counts(target_words).tolist() == expected
+
+    @pytest.mark.parametrize('rows', [[2, 0], [1], [], [0, 1, 2]])
+    def test_get_counts_rows(self, rows):
+        target_words = ['law', 'government', 'people']
+        assert np.array_equal(self.matrix.get_counts(target_words, rows=np.array(rows, dtype=np.int64)),
+                              self.matrix.get_counts(target_words)[rows])
+
+    def test_get_target_counts(self):
+        df = self.matrix.get_target_counts(['law'], index=[10, 11, 12])
+        assert df['law'].to_dict() == {10: 1, 11: 0, 12: 2}
+
+    def test_get_word_frequency(self):
+        assert self.matrix.get_word_frequency() == Counter(' '.join(self.documents).split())
+
+    def test_add_after_get(self):
+        self.matrix.get_counts(['law'])
+        self.matrix.add_document({'law': 3})
+        assert self.matrix.get_counts(['law'])[:, 0].tolist() == [1, 0, 2, 3]
+
+    def test_save_load(self, tmp_path):
+        fpath = str(tmp_path / 'matrix.npz')
+        self.matrix.save(fpath)
+        loaded = DocumentTermMatrix.load(fpath)
+        assert loaded.n_documents == 3
+        assert np.array_equal(loaded.get_counts(['law', 'people']), self.matrix.get_counts(['law', 'people']))
+
+    def test_empty(self):
+        assert DocumentTermMatrix().get_counts(['law']).shape == (0, 1)
@@ -0,0 +1,62 @@
+import pytest
+import numpy as np
+from preprocessing.frequency_table import CompactTable, is_compact_table
+from preprocessing.word_process import WordFrequency, WordFilter
+
+
+class TestCompactTable:
+    @pytest.fixture(autouse=True)
+    def initialise_table(self):
+        self.lookup_table = {'government': 8, 'law': 4, 'people': 2, 'news': 2, 'café': 3, 'come': 2}
+        self.table = CompactTable.from_dict(self.lookup_table)
+
+    def test_lookup(self):
+        assert self.table == self.lookup_table
+        assert self.table['café'] == 3
+        assert 'policy' not in self.table
+        assert self.table.get('policy', 0) == 0
+        assert [self.table.get_word(self.table.get_id(word)) for word in ['law', 'come']] == ['law', 'come']
+
+    @pytest.mark.parametrize(('top_k', 'min_letters'), [(0, 1), (2, 1), (3, 4), (10, 5)])
+    def test_top_k(self, top_k, min_letters):
+        word_frequency = WordFrequency()
+        word_frequency.table = self.lookup_table
+        expected = word_frequency.get_top_k(top_k, min_letters)
+        assert self.table.top_k(top_k, WordFilter(min_letters=min_letters)) == expected
+
+    def test_get_ranking(self):
+        words = [self.table.get_word(word_id) for word_id in self.table.get_ranking()]
+        assert words == ['government', 'law', 'café', 'people', 'news', 'come']
+        # café has 4 letters and 5 bytes
+        assert [self.table.get_word(word_id) for word_id in self.table.get_ranking(5)] == ['government', 'café',
+                                                                                            'people']
+
+    @pytest.mark.parametrize('mmap', [True, False])
+    def test_save_load(self, tmp_path, mmap):
+        fpath = str(tmp_path / 'table.bin')
+        self.table.save(fpath)
+        assert is_compact_table(fpath)
+        table = CompactTable.load(fpath, mmap=mmap)
+        assert table == self.lookup_table
+        assert isinstance(table.counts, np.memmap) == mmap
+
+    def test_empty(self, tmp_path):
+        fpath = str(tmp_path / 'table.bin')
+        CompactTable.from_dict({}).save(fpath)
+        assert len(CompactTable.load(fpath)) == 0
+
+
+class TestWordFrequencyCompact:
+    def test_save_load_compact(self, tmp_path):
+        word_frequency = WordFrequency()
+        word_frequency.get_word_frequency({'label': 'government law government'}, ['label'])
+        fpath = str(tmp_path / 'table.bin')
+        word_frequency.save_table(fpath, compact=True)
+
+        loaded = WordFrequency()
+        loaded.load_table(fpath)
+        assert isinstance(loaded.get_table(), CompactTable)
+        assert loaded.get_top_k(1, 3) == ['government']
+        # counting again switches back to a mutable table
+        loaded.get_word_frequency({'label': 'law'}, ['label'])
+        assert loaded.get_table() == {'government': 2, 'law': 2}
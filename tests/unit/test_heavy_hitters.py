@@ -0,0 +1,53 @@
+import random
+import pytest
+from collections import Counter
+from preprocessing.heavy_hitters import SpaceSavingFrequency
+from preprocessing.word_process import WordFrequency, WordFilter
+
+
+def zipf_stream(n_tokens, n_words, seed=0):
+    rng = random.Random(seed)
+    words = [f'word{i:04d}' for i in range(n_words)]
+    weights = [1 / (rank + 1) for rank in range(n_words)]
+    return rng.choices(words, weights=weights, k=n_tokens)
+
+
+class TestSpaceSavingFrequency:
+    def test_exact_when_capacity_is_large(self):
+        records = [{'label': 'government government come people law', 'abstract': 'government news law'},
+                   {'label': 'people people', 'abstract': 'law'}]
+        exact = WordFrequency()
+        approximate = SpaceSavingFrequency(capacity=100)
+        for record in records:
+            exact.get_word_frequency(record, ['label', 'abstract'])
+            approximate.get_word_frequency(record, ['label', 'abstract'])
+        for top_k, min_letters in [(2, 1), (3, 4), (10, 0)]:
+            assert approximate.get_top_k(top_k, min_letters) == exact.get_top_k(top_k, min_letters)
+
+    def test_error_bounds(self):
+        stream = zipf_stream(20000, 2000)
+        true_counts = Counter(stream)
+        approximate = SpaceSavingFrequency(capacity=200)
+        for i in range(0, len(stream), 50):
+            approximate.update(Counter(stream[i:i + 50]))
+
+        bound = approximate.get_error_bound()
+        assert len(approximate.counters) == 200
+        assert bound == len(stream) / 200
+        for word, count, error in approximate.get_estimates(200):
+            assert count - error <= true_counts[word] <= count
+            assert error <= bound
+        # every word more frequent than the bound is monitored
+        assert all(word in approximate.counters for word, count in true_counts.items() if count > bound)
+        assert approximate.get_top_k(5, 0) == [word for word, _ in true_counts.most_common(5)]
+
+    def test_word_filter(self):
+        approximate = SpaceSavingFrequency(capacity=2, word_filter=WordFilter(min_letters=4, stop_words=['petition']))
+        approximate.update({'law': 10, 'petition': 8, 'government': 3, 'people': 2})
+        assert approximate.n_tokens == 5
+        assert approximate.get_top_k(2, 4) == ['government', 'people']
+
+    @pytest.mark.parametrize(('capacity', 'top_k', 'min_letters'), [(0, 1, 1), (10, -1, 1), (10, 1, -1)])
+    def test_errors(self, capacity, top_k, min_letters):
+        with pytest.raises(ValueError):
+            SpaceSavingFrequency(capacity=capacity).get_top_k(top_k, min_letters)
@@ -0,0 +1,52 @@
+import pytest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from preprocessing.incremental import IncrementalState
+from preprocessing.text_process import ParallelTextPreprocessing
+
+
+def make_record(label, abstract, signatures):
+    return {'label': label, 'abstract': abstract, 'numberOfSignatures': signatures}
+
+
+class TestIncrementalState:
+    @pytest.fixture(autouse=True)
+    def initialise_state(self):
+        self.state = IncrementalState(columns=['abstract', 'label'], order_key='numberOfSignatures')
+        self.base = [make_record('Ban X', 'Ban x now.', 10),
+                     make_record('Ban X', 'Ban x now.', 5),
+                     make_record('ban x!', 'ban X now', 1),
+                     make_record('Fund schools', 'More money for schools', 7)]
+
+    def apply(self, records):
+        self.state.start_run()
+        with ParallelTextPreprocessing(n_workers=1) as text_preprocessor:
+            return self.state.update(records, text_preprocessor)
+
+    def test_full_run(self):
+        assert self.apply(self.base) == (3, 0)
+        expected = pd.DataFrame({'abstract': ['ban x now', 'more money for schools'],
+                                 'label': ['ban x', 'fund schools'],
+                                 'numberOfSignatures': [16, 7]})
+        assert_frame_equal(self.state.to_dataframe(), expected)
+        assert self.state.word_frequency.get_table() == {'ban': 2, 'x': 2, 'now': 1, 'more': 1, 'money': 1,
+                                                         'for': 1, 'schools': 2, 'fund': 1}
+
+    def test_delta_run(self, tmp_path):
+        self.apply(self.base)
+        fpath = str(tmp_path / 'state.pkl')
+        self.state.save(fpath)
+        self.state = IncrementalState.load(fpath, columns=['abstract', 'label'], order_key='numberOfSignatures')
+        assert self.apply([make_record('Fund schools', 'More money for schools', 20),
+                           make_record('Plant trees', 'Plant more trees', 3)]) == (1, 1)
+        df = self.state.to_dataframe().set_index('label')
+        assert df['numberOfSignatures'].to_dict() == {'ban x': 16, 'fund schools': 20, 'plant trees': 3}
+        assert self.state.word_frequency.get_table()['trees'] == 2
+        assert self.state.word_frequency.get_table()['more'] == 2
+
+    def test_load_mismatch(self, tmp_path):
+        fpath = str(tmp_path / 'state.pkl')
+        self.state.save(fpath)
+        with pytest.raises(ValueError):
+            IncrementalState.load(fpath, columns=['abstract', 'label'], order_key='numberOfSignatures',
+                                  enable_lemmatisation=True)
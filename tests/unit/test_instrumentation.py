@@ -0,0 +1,52 @@
+import os
+import json
+import pytest
+from preprocessing.instrumentation import RunReport
+
+
+class TestRunReport:
+    def test_stage_metrics(self):
+        report = RunReport(input_fpath='data.json')
+        with report.stage('load') as stage:
+            stage.n_records = 10
+        with report.stage('save'):
+            pass
+
+        res = report.to_dict()
+        assert res['metadata'] == {'input_fpath': 'data.json'}
+        assert [stage['name'] for stage in res['stages']] == ['load', 'save']
+        load, save = res['stages']
+        assert load['status'] == 'ok'
+        assert load['n_records'] == 10
+        assert load['wall_time_s'] >= 0
+        assert load['records_per_s'] is None or load['records_per_s'] > 0
+        assert save['n_records'] is None
+        assert save['records_per_s'] is None
+
+    def test_failed_stage(self):
+        report = RunReport()
+        with pytest.raises(KeyError):
+            with report.stage('load'):
+                raise KeyError('missing')
+        assert report.to_dict()['stages'][0]['status'] == 'failed'
+
+    def test_save(self, tmp_path):
+        report = RunReport(params={'TOP_K': 20})
+        with report.stage('load') as stage:
+            stage.n_records = 1
+        fpath = os.path.join(tmp_path, 'run_report.json')
+        report.save(fpath)
+        with open(fpath) as raw:
+            res = json.load(raw)
+        assert res['metadata']['params'] == {'TOP_K': 20}
+        assert res['stages'][0]['name'] == 'load'
+
+    def test_cprofile(self, tmp_path):
+        report = RunReport(profile='cprofile', profile_path=str(tmp_path))
+        with report.stage('load'):
+            sum(range(1000))
+        assert os.path.exists(os.path.join(tmp_path, 'load.prof'))
+
+    def test_invalid_profile(self):
+        with pytest.raises(ValueError):
+            RunReport(profile='perf')
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import threading
+import subprocess
+import http.client
+import pytest
+from preprocessing.lookup import LookupService, make_server
+from preprocessing.frequency_table import CompactTable
+from preprocessing.word_process import WordFrequency
+
+TABLE = {'government': 7, 'govern': 2, 'governor': 2, 'people': 12, 'petition': 3, 'law': 20, 'peoples': 1}
+
+
+@pytest.fixture
+def service():
+    return LookupService(CompactTable.from_dict(TABLE), cache_size=8)
+
+
+class TestLookupService:
+    def test_counts(self, service):
+        assert service.get_count('people') == 12
+        assert service.get_count('unknown') == 0
+        assert service.get_counts(['law', 'unknown']) == {'law': 20, 'unknown': 0}
+
+    def test_prefix(self, service):
+        assert service.prefix('gov') == [('government', 7), ('governor', 2), ('govern', 2)]
+        assert service.prefix('gov', limit=1) == [('government', 7)]
+        assert service.prefix('people', limit=None) == [('people', 12), ('peoples', 1)]
+        assert service.prefix('x') == []
+        assert service.prefix('') == service.prefix('', limit=10)
+        with pytest.raises(ValueError):
+            service.prefix('gov', limit=-1)
+
+    @pytest.mark.parametrize('top_k,min_letters,extra_stopwords', [(3, 0, ()), (10, 6, ()), (2, 5, ('people',)),
+                                                                   (0, 1, ())])
+    def test_top_k(self, service, top_k, min_letters, extra_stopwords):
+        word_frequency = WordFrequency()
+        word_frequency.update(TABLE)
+        expected = word_frequency.get_top_k(top_k, min_letters, extra_stopwords=extra_stopwords)
+        assert service.top_k(top_k, min_letters, extra_stopwords=extra_stopwords) == expected
+
+    def test_cache(self, service):
+        service.top_k(3, 5)
+        service.top_k(3, 5)
+        assert service.get_stats()['top_k']['hits'] == 1
+
+    def test_from_file(self, tmp_path):
+        word_frequency = WordFrequency()
+        word_frequency.update(TABLE)
+        for compact in [False, True]:
+            fpath = os.path.join(tmp_path, f'table_{compact}')
+            word_frequency.save_table(fpath, compact=compact)
+            assert LookupService.from_file(fpath).get_counts(TABLE) == TABLE
+
+
+def test_no_pandas():
+    code = 'import sys, preprocessing.lookup; print("pandas" in sys.modules)'
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    assert res.stdout.strip() == 'False'
+
+
+def test_no_logging_config():
+    code = 'import logging, preprocessing.lookup; print(logging.getLogger().handlers)'
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    assert res.stdout.strip() == '[]'
+
+
+def test_http(service):
+    server = make_server(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        def get(path, method='GET', body=None):
+            connection = http.client.HTTPConnection(*server.server_address)
+            connection.request(method, path, body=body)
+            response = connection.getresponse()
+            return response.status, json.loads(response.read())
+
+        assert get('/count?word=people') == (200, {'word': 'people', 'count': 12})
+        assert get('/counts?words=law,unknown') == (200, {'counts': {'law': 20, 'unknown': 0}})
+        assert get('/counts', 'POST', json.dumps(['law'])) == (200, {'counts': {'law': 20}})
+        assert get('/prefix?prefix=gov&limit=2') == (200, {'words': [['government', 7], ['governor', 2]]})
+        assert get('/top_k?top_k=2&min_letters=6&extra_stopwords=people') == (200, {'words': ['government', 'petition']})
+        for body in ['5', '[1]', '{}', '{"law": 1}', '["law", null]', 'not json']:
+            assert get('/counts', 'POST', body) == (400, {'error': 'body must be a JSON list of words'})
+        assert get('/count')[0] == 400
+        assert get('/top_k?top_k=-1')[0] == 400
+        assert get('/top_k?ignore_stopping_words=true&languages=klingon')[0] == 400
+        assert get('/unknown')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
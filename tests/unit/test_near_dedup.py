@@ -0,0 +1,79 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from preprocessing.near_dedup import (NearDeduplicator, MinHash, get_shingles, jaccard, get_lsh_params,
+                                      get_candidate_pairs)
+
+COLUMNS = ['abstract', 'label']
+AGGREGATIONS = {'numberOfSignatures': 'sum'}
+DF = pd.DataFrame({'abstract': ['the government should fund more schools in rural areas now',
+                                'ban plastic bags in supermarkets',
+                                'the government should fund more schools in rural areas today',
+                                '',
+                                'the government should fund more schools in rural areas now please'],
+                   'label': ['fund schools', 'ban bags', 'fund schools', 'empty', 'fund schools'],
+                   'numberOfSignatures': [5, 3, 10, 1, 2]})
+
+
+def test_get_shingles():
+    assert len(get_shingles(['a b a', 'a'])) == 3
+    assert len(get_shingles(['a b c', ''], shingle_size=2)) == 2
+    assert len(get_shingles(['a', ''], shingle_size=2)) == 1
+    assert len(get_shingles(['', ''])) == 0
+    assert jaccard(get_shingles(['a b c d']), get_shingles(['a b c e'])) == pytest.approx(3 / 5)
+
+
+def test_min_hash():
+    shingles = [get_shingles([' '.join(map(str, range(start, start + 100)))]) for start in [0, 10, 500]]
+    signatures = MinHash(num_perm=256).get_signatures(shingles + [get_shingles([''])])
+    assert signatures.shape == (4, 256)
+    # the fraction of equal values estimates the Jaccard similarity (90 / 110)
+    assert np.mean(signatures[0] == signatures[1]) == pytest.approx(jaccard(shingles[0], shingles[1]), abs=0.1)
+    assert np.mean(signatures[0] == signatures[2]) < 0.05
+
+
+def test_lsh():
+    bands, rows = get_lsh_params(0.8, 128)
+    assert bands * rows <= 128
+    signatures = np.array([[1, 2, 3, 4], [1, 2, 9, 9], [0, 0, 3, 4], [5, 6, 7, 8]])
+    assert get_candidate_pairs(signatures, bands=2, rows=2).tolist() == [[0, 1], [0, 2]]
+
+
+class TestNearDeduplicator:
+    def test_deduplicate(self):
+        deduplicator = NearDeduplicator(COLUMNS, AGGREGATIONS, threshold=0.8, order_key='numberOfSignatures')
+        res, membership = deduplicator.deduplicate(DF)
+        # the last record is similar to the first one only (0.92), not to the representative (0.79)
+        assert res['abstract'].tolist() == [DF['abstract'][1], DF['abstract'][2], '', DF['abstract'][4]]
+        assert res['numberOfSignatures'].tolist() == [3, 15, 1, 2]
+        assert membership['cluster'].tolist() == [0, 0]
+        assert membership['representative'].tolist() == [False, True]
+        assert membership['jaccard'].tolist()[1] == 1.0
+        assert (membership['jaccard'] >= 0.8).all()
+
+    def test_no_chaining(self):
+        random_state = np.random.RandomState(0)
+        words = [f'w{i}' for i in range(30)]
+        base = [' '.join(random_state.choice(words, 20)) for _ in range(20)]
+        abstracts = base + [text.replace(text.split()[0], 'x', 1) for text in base]
+        df = pd.DataFrame({'abstract': abstracts, 'label': [''] * len(abstracts),
+                           'numberOfSignatures': np.ones(len(abstracts), dtype=int)})
+        deduplicator = NearDeduplicator(COLUMNS, AGGREGATIONS, threshold=0.7)
+        clusters, shingles, _ = deduplicator.get_clusters(df)
+        representatives = np.flatnonzero(clusters == np.arange(len(df)))
+        assert len(representatives) < len(df)
+        for i in range(len(df)):
+            assert jaccard(shingles[i], shingles[clusters[i]]) >= 0.7
+        # a representative is not similar to another one, it would have been merged
+        for i, j in itertools.combinations(representatives, 2):
+            assert jaccard(shingles[i], shingles[j]) < 0.7
+
+    def test_no_duplicates(self):
+        res, membership = NearDeduplicator(COLUMNS, AGGREGATIONS, threshold=1.0).deduplicate(DF)
+        pd.testing.assert_frame_equal(res, DF)
+        assert len(membership) == 0
+
+    def test_invalid_threshold(self):
+        with pytest.raises(ValueError):
+            NearDeduplicator(COLUMNS, AGGREGATIONS, threshold=0)
@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+from preprocessing.pipeline import ThreadedIterator, BackgroundWriter
+
+
+class TestThreadedIterator:
+    def test_order(self):
+        assert list(ThreadedIterator(range(100), maxsize=3)) == list(range(100))
+
+    def test_backpressure(self):
+        produced = []
+
+        def produce():
+            for i in range(10):
+                produced.append(i)
+                yield i
+
+        iterator = iter(ThreadedIterator(produce(), maxsize=2))
+        assert next(iterator) == 0
+        time.sleep(0.2)
+        # one item consumed, at most 2 waiting in the queue and 1 blocked in the producer
+        assert len(produced) <= 4
+        iterator.close()
+
+    def test_failure(self):
+        def produce():
+            yield 1
+            raise KeyError('missing')
+
+        with pytest.raises(KeyError):
+            list(ThreadedIterator(produce()))
+
+    def test_invalid_maxsize(self):
+        with pytest.raises(ValueError):
+            ThreadedIterator([], maxsize=0)
+
+
+class TestBackgroundWriter:
+    def test_order(self):
+        res = []
+        with BackgroundWriter(maxsize=2) as writer:
+            for i in range(20):
+                writer.submit(res.append, i)
+        assert res == list(range(20))
+
+    def test_failure(self):
+        def fail():
+            raise OSError('disk full')
+
+        writer = BackgroundWriter()
+        writer.submit(fail)
+        with pytest.raises(OSError):
+            writer.close()
+
+    def test_caller_failure(self):
+        res = []
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        with pytest.raises(ValueError):
+            with BackgroundWriter(maxsize=4) as writer:
+                writer.submit(block)
+                started.wait()
+                writer.submit(res.append, 1)
+                # the running task ends once the context is left
+                threading.Timer(0.1, release.set).start()
+                raise ValueError('caller failed')
+        # the queued task is not run after the caller failed
+        assert res == []
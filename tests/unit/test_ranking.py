@@ -0,0 +1,63 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from preprocessing.ranking import ExternalSorter, top_n, rank
+
+COUNTS = np.random.RandomState(0).randint(0, 50, size=20000)
+
+
+def _stable_order(counts):
+    return pd.Series(counts).sort_values(ascending=False, kind='stable').index.to_numpy()
+
+
+class TestExternalSorter:
+    def test_in_memory(self):
+        with ExternalSorter() as sorter:
+            sorter.add([3, 5, 3, 1], keys=[0, 1, 2, 3])
+            assert list(sorter) == [(5, 1), (3, 0), (3, 2), (1, 3)]
+            assert sorter.runs == []
+
+    @pytest.mark.parametrize('memory_budget', [16 * 1000, 16 * 7919])
+    def test_spilled_runs(self, tmp_path, memory_budget):
+        sorter = ExternalSorter(memory_budget=memory_budget, tmp_path=str(tmp_path))
+        for start in range(0, len(COUNTS), 3000):
+            sorter.add(COUNTS[start:start + 3000])
+        assert len(sorter.runs) > 1
+        assert np.array_equal(sorter.get_keys(), _stable_order(COUNTS))
+        # the runs are deleted once merged
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_keys(self):
+        sorter = ExternalSorter(memory_budget=16 * 2)
+        sorter.add([1, 2, 2, 1], keys=[9, 7, 3, 1])
+        assert list(sorter) == [(2, 3), (2, 7), (1, 1), (1, 9)]
+
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            ExternalSorter(memory_budget=8)
+
+
+def test_top_n():
+    assert top_n([(3, 0), (5, 1), (3, 2), (1, 3)], 3) == [(5, 1), (3, 0), (3, 2)]
+    assert top_n([(3, 0)], 0) == []
+    with pytest.raises(ValueError):
+        top_n([(3, 0)], -1)
+
+
+@pytest.mark.parametrize('top', [None, 0, 1, 10, 1000, 50000])
+def test_rank(top):
+    order = rank(COUNTS, top=top, memory_budget=16 * 4096)
+    expected = _stable_order(COUNTS)
+    assert np.array_equal(order, expected[:top])
+
+
+@pytest.mark.parametrize('top', [None, 10])
+def test_rank_chunks(top):
+    chunks = (COUNTS[start:start + 3000] for start in range(0, len(COUNTS), 3000))
+    assert np.array_equal(rank(chunks, top=top, memory_budget=16 * 4096), _stable_order(COUNTS)[:top])
+
+
+def test_rank_empty():
+    assert len(rank(np.zeros(0, dtype=np.int64))) == 0
+    assert len(rank(np.zeros(0, dtype=np.int64), top=5)) == 0
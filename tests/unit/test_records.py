@@ -0,0 +1,54 @@
+import pickle
+import pytest
+import pandas as pd
+from pandas.testing import assert_frame_equal
+from preprocessing.records import RecordSchema
+from preprocessing.word_process import WordCount, WordFrequency
+
+COLUMNS = ['label', 'abstract']
+
+
+@pytest.fixture
+def schema():
+    return RecordSchema(COLUMNS + ['numberOfSignatures', 'label_length', 'abstract_length'])
+
+
+class TestRecord:
+    def test_access(self, schema):
+        record = schema.from_dict({'label': 'a label', 'abstract': 'an abstract', 'numberOfSignatures': 3,
+                                   'other': 'ignored'})
+        assert record['label'] == 'a label'
+        assert record['label_length'] is None
+        assert record.get('other') is None
+        record['label_length'] = 2
+        assert record.to_dict() == {'label': 'a label', 'abstract': 'an abstract', 'numberOfSignatures': 3,
+                                    'label_length': 2, 'abstract_length': None}
+        with pytest.raises(KeyError):
+            record['other'] = 1
+        assert not hasattr(record, '__dict__')
+
+    def test_pickle(self, schema):
+        records = [schema.new(['a', 'b', 1]), schema.new(['c', 'd', 2])]
+        assert pickle.loads(pickle.dumps(records)) == records
+
+    def test_dataframe(self, schema):
+        df = pd.DataFrame({'label': ['a', 'b'], 'abstract': ['c', 'd'], 'numberOfSignatures': [1, 2]})
+        records = schema.from_dataframe(df)
+        assert records[1].to_dict() == {'label': 'b', 'abstract': 'd', 'numberOfSignatures': 2,
+                                        'label_length': None, 'abstract_length': None}
+        res = schema.to_dataframe(records, fields=['label', 'abstract', 'numberOfSignatures'])
+        assert_frame_equal(res, df)
+
+    def test_processing_functions(self, schema):
+        record = schema.from_dict({'label': 'government government come people law',
+                                   'abstract': 'government news law', 'numberOfSignatures': 1})
+        WordCount.get_word_counts(record, COLUMNS)
+        assert (record['label_length'], record['abstract_length']) == (5, 3)
+        assert WordCount.get_target_count(record, COLUMNS, ['government', 'law', 'unknown']) == \
+               {'government': 3, 'law': 2, 'unknown': 0}
+
+        word_frequency = WordFrequency()
+        word_frequency.get_word_frequency(record, COLUMNS)
+        expected = WordFrequency()
+        expected.get_word_frequency(record.to_dict(), COLUMNS)
+        assert word_frequency.get_table() == expected.get_table()
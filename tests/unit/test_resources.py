@@ -0,0 +1,44 @@
+import nltk
+import pytest
+from preprocessing import resources
+
+
+class TestResources:
+    @pytest.fixture(autouse=True)
+    def isolate_config(self, tmp_path):
+        # find_resource inserts the configured data path into the global NLTK search path
+        config = dict(resources._config)
+        data_path = list(nltk.data.path)
+        resources.configure(data_path=str(tmp_path), allow_download=False)
+        yield
+        resources._config.clear()
+        resources._config.update(config)
+        nltk.data.path[:] = data_path
+
+    def test_find_resource_missing(self):
+        with pytest.raises(LookupError) as e_info:
+            resources.find_resource('corpora/not_a_resource')
+        assert 'python -m nltk.downloader' in str(e_info.value)
+
+    def test_find_resource_local_path(self, tmp_path):
+        (tmp_path / 'corpora' / 'my_stopwords').mkdir(parents=True)
+        assert resources.find_resource('corpora/my_stopwords') == str(tmp_path / 'corpora' / 'my_stopwords')
+
+    def test_check_resources_nothing_required(self):
+        resources.check_resources(enable_lemmatisation=False, ignore_stopping_words=False)
+
+    def test_get_stopwords_unknown_language(self, monkeypatch):
+        class Stopwords:
+            @staticmethod
+            def fileids():
+                return ['english']
+
+            @staticmethod
+            def words(language):
+                return ['the']
+
+        monkeypatch.setattr(resources, 'find_resource', lambda resource: resource)
+        monkeypatch.setattr(nltk.corpus, 'stopwords', Stopwords)
+        assert resources.get_stopwords('english') == ['the']
+        with pytest.raises(ValueError):
+            resources.get_stopwords('klingon')
@@ -0,0 +1,105 @@
+import os
+import json
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.corpus import CorpusGenerator
+from preprocessing import run
+from preprocessing.text_process import TextPreprocessing
+
+ARTEFACTS = ['output1.csv', 'output2.csv', 'near_duplicates.csv']
+
+
+@pytest.fixture
+def input_fpath(tmp_path, monkeypatch):
+    # the NLTK data is not needed without lemmatisation and stopwords
+    monkeypatch.setattr(run, 'ENABLE_LEMMATISATION', False)
+    monkeypatch.setattr(run, 'IGNORE_STOPPING_WORDS', False)
+    records = CorpusGenerator(vocabulary_size=50, same_label_rate=0.3, seed=3).generate(650)
+    fpath = str(tmp_path / 'input.json')
+    with open(fpath, 'w') as raw:
+        json.dump(records, raw)
+    return fpath
+
+
+def _load_table(artefacts_path):
+    with open(os.path.join(artefacts_path, 'table.pkl'), 'rb') as raw:
+        return dict(pickle.load(raw))
+
+
+def test_near_dedup_batch_same_as_incremental(input_fpath, tmp_path):
+    batch_path, incremental_path = str(tmp_path / 'batch'), str(tmp_path / 'incremental')
+    for path in [batch_path, incremental_path]:
+        os.makedirs(path)
+    run.run_etl(input_fpath, batch_path, near_dedup_threshold=0.5)
+    run.run_etl(input_fpath, incremental_path, near_dedup_threshold=0.5,
+                state_path=str(tmp_path / 'state.pkl'))
+    assert len(pd.read_csv(os.path.join(batch_path, 'near_duplicates.csv'))) > 0
+    for name in ARTEFACTS:
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(batch_path, name)),
+                                      pd.read_csv(os.path.join(incremental_path, name)))
+    assert _load_table(batch_path) == _load_table(incremental_path)
+
+
+@pytest.mark.parametrize('memory_budget', [None, 16 * 64])
+def test_rank(monkeypatch, memory_budget):
+    monkeypatch.setattr(run, 'RANK_MEMORY_BUDGET', memory_budget)
+    df = pd.DataFrame({'numberOfSignatures': [3, 7, 3, 1, 7] * 100})
+    stage = run.StageMetrics('rank')
+    order = run._rank(df, None, stage)
+    assert sorted(order.tolist()) == list(range(len(df)))
+    if memory_budget is None:
+        assert np.array_equal(order, df['numberOfSignatures'].sort_values(ascending=False).index)
+    else:
+        # stable: ties keep their order in df
+        assert np.array_equal(order, df['numberOfSignatures'].sort_values(ascending=False, kind='stable').index)
+    assert np.array_equal(run._rank(df, 3, stage), [1, 4, 6])
+
+
+def test_report_save_error(input_fpath, tmp_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError('stage failed')
+
+    def fail_save(*args, **kwargs):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(run, '_run_batch', fail)
+    monkeypatch.setattr(run.RunReport, 'save', fail_save)
+    with pytest.raises(RuntimeError, match='stage failed'):
+        run.run_etl(input_fpath, str(tmp_path))
+
+
+def test_pipeline_single_worker(input_fpath, tmp_path):
+    with pytest.raises(ValueError):
+        run.run_etl(input_fpath, str(tmp_path), pipeline=True, n_workers=1)
+
+
+def test_load_and_clean_serial(input_fpath):
+    # the serial path cleans whole columns in batches, with the same result as cleaning record by record
+    records = run._load_and_clean(input_fpath, None, 7, None, run.RunReport())
+    text_preprocessor = TextPreprocessing()
+    with open(input_fpath) as raw:
+        expected = [text_preprocessor.extract_text(run._get_record_schema().from_dict(record), run.TEXT_COLUMNS)
+                    for record in json.load(raw)]
+    assert records == expected
+
+
+def test_approximate_top_k(input_fpath, tmp_path):
+    exact_path, approximate_path, small_path = [str(tmp_path / name) for name in ['exact', 'approximate', 'small']]
+    for path in [exact_path, approximate_path, small_path]:
+        os.makedirs(path)
+    run.run_etl(input_fpath, exact_path, streaming=True)
+    # with more counters than words, the Space-Saving counts are exact
+    run.run_etl(input_fpath, approximate_path, streaming=True, approximate_top_k_capacity=10000)
+    for name in ARTEFACTS[:2]:
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(exact_path, name)),
+                                      pd.read_csv(os.path.join(approximate_path, name)))
+    assert _load_table(approximate_path) == _load_table(exact_path)
+    run.run_etl(input_fpath, small_path, pipeline=True, n_workers=2, approximate_top_k_capacity=20)
+    assert len(_load_table(small_path)) == 20
+    with open(os.path.join(small_path, 'run_report.json')) as raw:
+        stages = {stage['name']: stage for stage in json.load(raw)['stages']}
+    assert stages['top_k']['error_bound'] > 0
+    with pytest.raises(ValueError):
+        run.run_etl(input_fpath, exact_path, approximate_top_k_capacity=20)
@@ -0,0 +1,86 @@
+import os
+import pytest
+import pandas as pd
+from preprocessing.sinks import (OutputSink, TableWriter, CsvWriter, cast_integers, to_sparse,
+                                 check_output_formats)
+
+
+@pytest.fixture
+def output2():
+    df = pd.DataFrame({'people': [0, 2, 0, 1], 'government': [3, 0, 0, 300]})
+    df.index.name = 'petition_id'
+    return df
+
+
+def test_cast_integers():
+    df = cast_integers(pd.DataFrame({'a': [0, 255], 'c': [0, 70000], 'd': ['x', 'y']}))
+    assert df.dtypes.astype(str).tolist() == ['uint32', 'uint32', 'object']
+    assert df['c'].tolist() == [0, 70000]
+    with pytest.raises(ValueError):
+        cast_integers(pd.DataFrame({'b': [-1, 1]}))
+
+
+def test_abstract_writer(tmp_path):
+    with pytest.raises(TypeError):
+        TableWriter(os.path.join(tmp_path, 'output.csv'))
+
+
+def test_to_sparse(output2):
+    res = to_sparse(output2)
+    assert res.index.name == 'petition_id'
+    assert res.index.tolist() == [0, 1, 3, 3]
+    assert res['word'].astype(str).tolist() == ['government', 'people', 'people', 'government']
+    assert res['count'].tolist() == [3, 2, 1, 300]
+
+
+def test_chunked_csv(tmp_path, output2):
+    fpath = os.path.join(tmp_path, 'chunked.csv')
+    with CsvWriter(fpath) as writer:
+        for start in range(0, len(output2), 3):
+            writer.write(output2.iloc[start:start + 3])
+    expected_fpath = os.path.join(tmp_path, 'expected.csv')
+    output2.to_csv(expected_fpath)
+    with open(fpath) as raw, open(expected_fpath) as expected:
+        assert raw.read() == expected.read()
+
+
+def test_sink_columnar(tmp_path, output2):
+    pytest.importorskip('pyarrow')
+    sink = OutputSink(str(tmp_path), 'output2', formats=['csv', 'parquet', 'feather'], sparse=True)
+    sink.write_all(output2, chunk_size=3)
+    assert sorted(os.listdir(tmp_path)) == ['output2.csv', 'output2.feather', 'output2.parquet',
+                                            'output2_sparse.csv', 'output2_sparse.feather', 'output2_sparse.parquet']
+
+    res = pd.read_parquet(os.path.join(tmp_path, 'output2.parquet'))
+    assert res.columns.tolist() == ['petition_id', 'people', 'government']
+    # the dtypes do not depend on the values
+    assert res.dtypes.astype(str).tolist() == ['uint32', 'uint32', 'uint32']
+    pd.testing.assert_frame_equal(res.astype('int64').set_index('petition_id'), output2)
+
+    sparse = pd.read_feather(os.path.join(tmp_path, 'output2_sparse.feather'))
+    assert sparse['petition_id'].tolist() == [0, 1, 3, 3]
+    assert sparse['count'].tolist() == [3, 2, 1, 300]
+
+
+def test_invalid_format():
+    with pytest.raises(ValueError):
+        check_output_formats(['xlsx'])
+
+
+def test_write_chunks(tmp_path, output2):
+    pytest.importorskip('pyarrow')
+    sink = OutputSink(str(tmp_path), 'output2', formats=['csv', 'parquet'])
+    written = []
+
+    def chunks():
+        for start in range(0, len(output2), 3):
+            yield output2.iloc[start:start + 3]
+            # the previous chunks are already in the files
+            written.append(os.path.getsize(os.path.join(tmp_path, 'output2.csv')) > 0)
+
+    sink.write_chunks(chunks())
+    assert written == [True, True]
+    pd.testing.assert_frame_equal(pd.read_csv(os.path.join(tmp_path, 'output2.csv'), index_col='petition_id'),
+                                  output2)
+    res = pd.read_parquet(os.path.join(tmp_path, 'output2.parquet'))
+    pd.testing.assert_frame_equal(res.astype('int64').set_index('petition_id'), output2)
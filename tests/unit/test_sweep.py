@@ -0,0 +1,56 @@
+import pytest
+import pandas as pd
+from preprocessing.sweep import Sweep, parse_configs, config_name
+from preprocessing.word_process import WordCount, WordFrequency, TokenizedCorpus
+from preprocessing.params import TOP_K, MIN_LETTERS, IGNORE_STOPPING_WORDS
+
+COLUMNS = ['abstract', 'label']
+DF = pd.DataFrame({'abstract': ['the government people law law', 'people petition governor the', 'the law'],
+                   'label': ['government law', 'peoples petition', 'govern people']})
+
+
+def test_parse_configs():
+    configs = parse_configs(['top_k=20|50,min_letters=3|5,ignore_stopping_words=false', 'top_k=20,min_letters=3'])
+    assert len(configs) == 5
+    assert configs[0] == {'top_k': 20, 'min_letters': 3, 'ignore_stopping_words': False}
+    assert configs[-1] == {'top_k': 20, 'min_letters': 3, 'ignore_stopping_words': IGNORE_STOPPING_WORDS}
+    assert parse_configs(['']) == [{'top_k': TOP_K, 'min_letters': MIN_LETTERS,
+                                    'ignore_stopping_words': IGNORE_STOPPING_WORDS}]
+    assert config_name(configs[0]) == 'top20_min3_stop'
+    with pytest.raises(ValueError):
+        parse_configs(['top=20'])
+    with pytest.raises(ValueError):
+        parse_configs(['ignore_stopping_words=maybe'])
+
+
+class TestSweep:
+    configs = [{'top_k': top_k, 'min_letters': min_letters, 'ignore_stopping_words': False}
+               for top_k in [0, 2, 10] for min_letters in [0, 4, 7]]
+    extra_stopwords = ('petition',)
+
+    @pytest.fixture
+    def corpus(self):
+        corpus = TokenizedCorpus(columns=COLUMNS)
+        corpus.add_dataframe(DF)
+        return corpus
+
+    def test_get_target_words(self, corpus):
+        sweep = Sweep(corpus.word_frequency.get_table(), extra_stopwords=self.extra_stopwords)
+        target_words = sweep.get_target_words(self.configs)
+        for config in self.configs:
+            expected = corpus.word_frequency.get_top_k(config['top_k'], config['min_letters'],
+                                                       extra_stopwords=self.extra_stopwords)
+            assert target_words[config_name(config)] == expected
+        with pytest.raises(ValueError):
+            sweep.get_target_words([{'top_k': -1, 'min_letters': 5, 'ignore_stopping_words': False}])
+
+    def test_get_target_counts(self, corpus):
+        word_frequency = WordFrequency()
+        word_frequency.update(corpus.word_frequency.get_table())
+        sweep = Sweep(word_frequency.to_compact())
+        outputs = sweep.get_target_counts(corpus.matrix, sweep.get_target_words(self.configs), index=DF.index)
+        for config in self.configs:
+            target_words = word_frequency.get_top_k(config['top_k'], config['min_letters'])
+            expected = pd.DataFrame([WordCount.get_target_count(row, columns=COLUMNS, target_words=target_words)
+                                     for _, row in DF.iterrows()], columns=target_words, index=DF.index)
+            pd.testing.assert_frame_equal(outputs[config_name(config)], expected, check_dtype=False)
@@ -1,7 +1,9 @@
 import pytest
 import pandas as pd
-from pandas.testing import assert_series_equal
-from preprocessing.text_process import TextPreprocessing
+from pandas.testing import assert_series_equal, assert_frame_equal
+from preprocessing.text_process import TextPreprocessing, ParallelTextPreprocessing, LemmaCache
+from preprocessing.records import RecordSchema
+from preprocessing import resources
 
 
 class TestTextProcess:
@@ -21,6 +23,23 @@ class TestTextProcess:
     def test_transform(self, text, enable_lemmatisation, expected):
         assert self.text_preprocessor.transform(text, enable_lemmatisation=enable_lemmatisation) == expected
 
+    @pytest.mark.parametrize(
+        'texts',
+        [
+            [],
+            ['  This   is A 2349 test ', ' This IS another test, we have two tests', '', '   ', '!?'],
+            ['a\x00b', ' C\nd  '],
+        ]
+    )
+    def test_transform_batch(self, texts):
+        expected = [self.text_preprocessor.transform(text) for text in texts]
+        assert self.text_preprocessor.transform_batch(texts) == expected
+
+    def test_transform_series(self):
+        series = pd.Series([' This IS A test! ', 'Another   test'], index=[3, 7], name='label')
+        expected = series.apply(self.text_preprocessor.transform)
+        assert_series_equal(self.text_preprocessor.transform_series(series), expected)
+
     @pytest.mark.parametrize(
         ('record',
          'columns',
@@ -49,3 +68,118 @@ class TestTextProcess:
         elif isinstance(record, pd.Series):
             assert_series_equal(self.text_preprocessor.extract_text(record, columns, enable_lemmatisation),
                                        expected)
+
+
+class SuffixLemmatizer:
+    """A deterministic stand-in for WordNetLemmatizer which strips a trailing 's' and counts its calls."""
+    def __init__(self):
+        self.calls = 0
+
+    def lemmatize(self, word):
+        self.calls += 1
+        return word[:-1] if word.endswith('s') else word
+
+
+class TestLemmaCache:
+    @pytest.fixture(autouse=True)
+    def initialise_lemma_cache(self):
+        self.lemmatizer = SuffixLemmatizer()
+        self.lemma_cache = LemmaCache(self.lemmatizer, max_size=2)
+
+    def test_lemmatize(self):
+        assert [self.lemma_cache.lemmatize(word) for word in ['tests', 'tests', 'laws', 'tests']] == \
+               ['test', 'test', 'law', 'test']
+        assert self.lemmatizer.calls == 2
+        assert self.lemma_cache.get_stats() == {'hits': 2, 'misses': 2, 'size': 2, 'hit_rate': 0.5}
+
+    def test_eviction(self):
+        for word in ['tests', 'laws', 'tests', 'cats']:
+            self.lemma_cache.lemmatize(word)
+        # 'laws' is the least recently used word
+        assert list(self.lemma_cache.cache) == ['tests', 'cats']
+
+    def test_save_load(self, tmp_path):
+        self.lemma_cache.lemmatize('tests')
+        fpath = str(tmp_path / 'lemma_cache.json')
+        self.lemma_cache.save(fpath)
+        text_preprocessor = TextPreprocessing(lemma_cache_fpath=fpath)
+        assert text_preprocessor.lemma_cache.cache == {'tests': 'test'}
+
+    def test_merge(self):
+        self.lemma_cache.new_lemmas = {}
+        for word in ['tests', 'tests', 'laws']:
+            self.lemma_cache.lemmatize(word)
+        assert self.lemma_cache.pop_new_lemmas() == {'tests': 'test', 'laws': 'law'}
+        assert self.lemma_cache.pop_new_lemmas() == {}
+        merged = LemmaCache(self.lemmatizer, max_size=2)
+        merged.merge({'cats': 'cat', 'tests': 'test', 'laws': 'law'}, hits=1, misses=3)
+        assert list(merged.cache) == ['tests', 'laws']
+        assert merged.get_stats() == {'hits': 1, 'misses': 3, 'size': 2, 'hit_rate': 0.25}
+
+    def test_lemmatize_batch(self):
+        text_preprocessor = TextPreprocessing()
+        text_preprocessor.lemma_cache.lemmatizer = self.lemmatizer
+        texts = ['we have tests', 'tests and laws', '']
+        expected = [text_preprocessor.transform(text, enable_lemmatisation=True) for text in texts]
+        assert text_preprocessor.lemmatize_batch(texts) == expected == ['we have test', 'test and law', '']
+
+
+class TestParallelTextProcess:
+    texts = ['  This   is A 2349 test ', ' This IS another test, we have two tests', 'We (have) 3^&!     tests '] * 5
+
+    @pytest.mark.parametrize(('n_workers', 'chunk_size'), [(1, 4), (2, 1), (3, 4)])
+    def test_transform_texts(self, n_workers, chunk_size):
+        text_preprocessor = TextPreprocessing()
+        expected = [text_preprocessor.transform(text) for text in self.texts]
+        with ParallelTextPreprocessing(n_workers=n_workers, chunk_size=chunk_size) as parallel_preprocessor:
+            assert parallel_preprocessor.transform_texts(self.texts) == expected
+
+    def test_extract_text(self):
+        df = pd.DataFrame({'label': [{'_value': text} for text in self.texts],
+                           'abstract': [{'_value': text.upper()} for text in self.texts],
+                           'numberOfSignatures': range(len(self.texts))})
+        text_preprocessor = TextPreprocessing()
+        expected = df.apply(lambda record: text_preprocessor.extract_text(record.copy(), ['label', 'abstract']),
+                            axis=1)
+        with ParallelTextPreprocessing(n_workers=2, chunk_size=4) as parallel_preprocessor:
+            assert_frame_equal(parallel_preprocessor.extract_text(df, ['label', 'abstract']), expected)
+
+    @pytest.mark.parametrize(('n_workers', 'max_pending'), [(1, None), (2, 1), (3, 2)])
+    def test_imap_texts(self, n_workers, max_pending):
+        text_preprocessor = TextPreprocessing()
+        batches = [self.texts[i:i + 4] for i in range(0, len(self.texts), 4)]
+        expected = [[text_preprocessor.transform(text) for text in batch] for batch in batches]
+        with ParallelTextPreprocessing(n_workers=n_workers, chunk_size=3) as parallel_preprocessor:
+            assert list(parallel_preprocessor.imap_texts(iter(batches), max_pending=max_pending)) == expected
+
+    def test_extract_records(self):
+        schema = RecordSchema(['label', 'abstract', 'numberOfSignatures'])
+        raw = [{'label': {'_value': text}, 'abstract': {'_value': text.upper()}, 'numberOfSignatures': i}
+               for i, text in enumerate(self.texts)]
+        text_preprocessor = TextPreprocessing()
+        expected = [text_preprocessor.extract_text(schema.from_dict(record), ['label', 'abstract']) for record in raw]
+        with ParallelTextPreprocessing(n_workers=2, chunk_size=4) as parallel_preprocessor:
+            records = parallel_preprocessor.extract_records([schema.from_dict(record) for record in raw],
+                                                            ['label', 'abstract'])
+        assert records == expected
+
+    @pytest.mark.parametrize(('n_workers', 'chunk_size'), [(0, 4), (2, 0)])
+    def test_invalid_arguments(self, n_workers, chunk_size):
+        with pytest.raises(ValueError):
+            ParallelTextPreprocessing(n_workers=n_workers, chunk_size=chunk_size)
+
+    @pytest.mark.parametrize('n_workers', [1, 2])
+    def test_lemma_cache(self, monkeypatch, n_workers):
+        # the workers are forked with the stand-in lemmatizer
+        monkeypatch.setattr(resources, 'get_lemmatizer', SuffixLemmatizer)
+        with ParallelTextPreprocessing(n_workers=n_workers, chunk_size=4,
+                                       enable_lemmatisation=True) as parallel_preprocessor:
+            parallel_preprocessor.transform_texts(self.texts)
+            lemma_cache = parallel_preprocessor.get_lemma_cache()
+        assert dict(lemma_cache.cache) == {'this': 'thi', 'is': 'i', 'a': 'a', '2349': '2349', 'test': 'test',
+                                           'another': 'another', 'we': 'we', 'have': 'have', 'two': 'two',
+                                           'tests': 'test', '3': '3'}
+        # the statistics of the workers are merged: every batch looks up its unique words once
+        texts = [TextPreprocessing().transform(text) for text in self.texts]
+        assert lemma_cache.hits + lemma_cache.misses == sum(len(set(' '.join(texts[i:i + 4]).split()))
+                                                            for i in range(0, len(texts), 4))
@@ -0,0 +1,79 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from preprocessing.token_store import TokenStore
+from preprocessing.word_process import TokenizedCorpus
+
+COLUMNS = ['abstract', 'label']
+DF = pd.DataFrame({'abstract': ['the government people law law', '', 'the law'],
+                   'label': ['government law', 'peoples petition', 'govern people'],
+                   'numberOfSignatures': [30, 20, 10]})
+
+
+@pytest.fixture
+def corpus():
+    corpus = TokenizedCorpus(columns=COLUMNS)
+    corpus.add_dataframe(DF)
+    return corpus
+
+
+@pytest.fixture
+def store():
+    return TokenStore.from_dataframe(DF, columns=COLUMNS, value_columns=['numberOfSignatures'])
+
+
+class TestTokenStore:
+    def test_build(self, store):
+        assert store.n_documents == 3
+        assert list(store.vocabulary) == sorted(store.vocabulary)
+        assert store.get_tokens(0, 'abstract') == ['the', 'government', 'people', 'law', 'law']
+        assert store.get_tokens(1, 'abstract') == []
+        assert store.tokens.dtype == np.uint32
+
+    def test_same_as_corpus(self, store, corpus):
+        for column, lengths in corpus.get_lengths().items():
+            assert store.get_lengths()[column].tolist() == lengths
+        assert store.get_word_frequency().to_dict() == corpus.word_frequency.get_table()
+        target_words = ['law', 'people', 'unknown', 'government']
+        pd.testing.assert_frame_equal(store.get_target_counts(target_words, index=DF.index),
+                                      corpus.get_target_counts(target_words, index=DF.index))
+
+    def test_columns(self, store):
+        assert store.get_word_frequency(columns=['label']).to_dict() == {'government': 1, 'law': 1, 'peoples': 1,
+                                                                          'petition': 1, 'govern': 1, 'people': 1}
+        assert store.get_counts(['law'], columns=['abstract']).ravel().tolist() == [2, 0, 1]
+        with pytest.raises(ValueError):
+            store.get_counts(['law'], columns=['title'])
+
+    @pytest.mark.parametrize('mmap', [True, False])
+    def test_save_load(self, store, tmp_path, mmap):
+        store.save(str(tmp_path))
+        loaded = TokenStore.load(str(tmp_path), mmap=mmap)
+        assert loaded.columns == COLUMNS
+        assert loaded.values['numberOfSignatures'].tolist() == [30, 20, 10]
+        assert np.array_equal(loaded.tokens, store.tokens)
+        assert np.array_equal(loaded.offsets, store.offsets)
+        assert loaded.get_word_frequency().to_dict() == store.get_word_frequency().to_dict()
+
+    def test_save_replace(self, store, tmp_path):
+        path = str(tmp_path / 'store')
+        store.save(path)
+        loaded = TokenStore.load(path)
+        TokenStore.build([['law', 'news']], columns=COLUMNS).save(path)
+        # the previous store is replaced as a whole, its memory-mapped arrays stay valid
+        assert sorted(os.listdir(path)) == ['meta.json', 'offsets.npy', 'tokens.npy', 'vocabulary.bin']
+        assert TokenStore.load(path).n_documents == 1
+        assert loaded.values['numberOfSignatures'].tolist() == [30, 20, 10]
+        assert os.listdir(str(tmp_path)) == ['store']
+
+    def test_load_invalid(self, tmp_path):
+        with pytest.raises(ValueError):
+            TokenStore.load(str(tmp_path))
+
+    def test_empty(self, tmp_path):
+        store = TokenStore.build([], columns=COLUMNS)
+        store.save(str(tmp_path))
+        loaded = TokenStore.load(str(tmp_path))
+        assert loaded.n_documents == 0
+        assert loaded.get_counts(['law']).shape == (0, 1)
@@ -1,7 +1,8 @@
 import pytest
 import pandas as pd
-from pandas.testing import assert_series_equal
-from preprocessing.word_process import WordCount, WordFrequency
+from pandas.testing import assert_series_equal, assert_frame_equal
+from preprocessing.word_filter import load_stopwords
+from preprocessing.word_process import WordCount, WordFrequency, TokenizedCorpus, WordFilter
 
 
 class TestWordCount:
@@ -163,6 +164,34 @@ class TestWordFrequency:
         self.word_frequency.table = lookup_table
         assert self.word_frequency.get_top_k(top_k, min_letters, ignore_stopping_words) == expected
 
+    def test_merge(self):
+        shards = []
+        for record in [{'label': 'government law'}, {'label': 'law'}, {'label': 'news law'}]:
+            shard = WordFrequency()
+            shard.get_word_frequency(record, ['label'])
+            shards.append(shard)
+        expected = {'government': 1, 'law': 3, 'news': 1}
+        assert (shards[0] + shards[1] + shards[2]).get_table() == expected
+        assert WordFrequency.reduce(shards).get_table() == expected
+        assert WordFrequency.reduce([]).get_table() == {}
+        # shards are left untouched
+        assert shards[0].get_table() == {'government': 1, 'law': 1}
+
+    @pytest.mark.parametrize('compact', [True, False])
+    def test_shard_files(self, tmp_path, compact):
+        df = pd.DataFrame({'label': ['government law', 'law'], 'abstract': ['news', 'law law']})
+        fpaths = []
+        for i in range(len(df)):
+            fpath = str(tmp_path / f'shard{i}')
+            WordFrequency.from_dataframe(df.iloc[i:i + 1], ['label', 'abstract']).save_table(fpath, compact=compact)
+            fpaths.append(fpath)
+        merged = WordFrequency.reduce([WordFrequency.from_file(fpath) for fpath in fpaths])
+        assert merged.get_table() == WordFrequency.from_dataframe(df, ['label', 'abstract']).get_table()
+
+    def test_get_top_k_extra_stopwords(self):
+        self.word_frequency.table = {'aaaa': 15, 'bbb': 13, 'petition': 43, 'cc': 50}
+        assert self.word_frequency.get_top_k(3, 3, False, extra_stopwords=['petition']) == ['aaaa', 'bbb']
+
     @pytest.mark.parametrize(
         ('lookup_table', 'top_k', 'min_letters', 'ignore_stopping_words', 'expected'),
         [
@@ -198,3 +227,51 @@ class TestWordFrequency:
         with pytest.raises(ValueError) as e_info:
             self.word_frequency.get_top_k(top_k, min_letters, ignore_stopping_words)
             assert e_info == expected
+
+
+class TestWordFilter:
+    @pytest.mark.parametrize(
+        ('word', 'expected'),
+        [('government', True), ('law', False), ('petition', False), ('british', True)]
+    )
+    def test_contains(self, word, expected):
+        assert (word in WordFilter(min_letters=4, stop_words=['petition'])) == expected
+
+    def test_build_without_stopping_words(self):
+        word_filter = WordFilter.build(min_letters=2, ignore_stopping_words=False, extra_stopwords=['law'])
+        assert word_filter.stop_words == frozenset(['law'])
+
+    def test_load_stopwords(self, tmp_path):
+        fpath = tmp_path / 'stopwords.txt'
+        fpath.write_text('# domain stopwords\npetition\n\n government \n')
+        assert load_stopwords(str(fpath)) == frozenset(['petition', 'government'])
+
+
+class TestTokenizedCorpus:
+    @pytest.fixture(autouse=True)
+    def initialise_corpus(self):
+        self.corpus = TokenizedCorpus(columns=['label', 'abstract'])
+        self.records = [{'label': 'government government come people law',
+                         'abstract': 'government government news law'},
+                        {'label': '',
+                         'abstract': 'law'}]
+
+    def test_lengths_match_word_count(self):
+        for record in self.records:
+            self.corpus.add_record(record)
+        expected = {feature + '_length': [WordCount.word_count(record[feature]) for record in self.records]
+                    for feature in ['label', 'abstract']}
+        assert self.corpus.get_lengths() == expected
+
+    def test_table_matches_word_frequency(self):
+        word_frequency = WordFrequency()
+        for record in self.records:
+            self.corpus.add_record(record)
+            word_frequency.get_word_frequency(record, ['label', 'abstract'])
+        assert self.corpus.word_frequency.get_table() == word_frequency.get_table()
+
+    def test_get_target_counts(self):
+        self.corpus.add_dataframe(pd.DataFrame(self.records))
+        expected = pd.DataFrame([WordCount.get_target_count(record, ['label', 'abstract'], ['government', 'law'])
+                                 for record in self.records])
+        assert_frame_equal(self.corpus.get_target_counts(['government', 'law']), expected)